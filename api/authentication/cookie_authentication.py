@@ -2,8 +2,9 @@
 
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
-from rest_framework_simplejwt.tokens import AccessToken, TokenError
+from rest_framework_simplejwt.tokens import TokenError
 from api.models import User
+from api.authentication.jwt_auth import JWTAuthHandler
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,21 +19,16 @@ class CookieJWTAuthentication(BaseAuthentication):
         Intenta autenticar usando el token de la cookie
         IMPORTANTE: NO acceder a request.user aquí - causaría recursión infinita
         """
-        # Obtener token de la cookie
-        token = request.COOKIES.get('access_token')
-        
-        if not token:
-            # No hay token, retornar None (permite autenticación anónima)
-            logger.debug("[DRF-AUTH] No hay token en cookies")
-            return None
-        
         try:
-            # Validar token
-            access_token = AccessToken(token)
-            user_id = access_token['user_id']
+            # Validar token y obtener usuario (reutiliza lo resuelto por el middleware)
+            auth = JWTAuthHandler.authenticate_request(request)
             
-            # Obtener usuario
-            user = User.objects.select_related('company', 'role').get(id=user_id)
+            if auth is None:
+                # No hay token, retornar None (permite autenticación anónima)
+                logger.debug("[DRF-AUTH] No hay token en el request")
+                return None
+            
+            user = auth[0]
             
             if not user.is_active:
                 logger.warning(f"[DRF-AUTH] Usuario inactivo: {user.email}")
@@ -45,7 +41,7 @@ class CookieJWTAuthentication(BaseAuthentication):
             logger.error(f"[DRF-AUTH] Token inválido: {str(e)}")
             raise AuthenticationFailed('Token inválido o expirado')
         except User.DoesNotExist:
-            logger.error(f"[DRF-AUTH] Usuario no encontrado: {user_id}")
+            logger.error("[DRF-AUTH] Usuario no encontrado para el token")
             raise AuthenticationFailed('Usuario no encontrado')
         except Exception as e:
             logger.error(f"[DRF-AUTH] Error inesperado: {str(e)}")
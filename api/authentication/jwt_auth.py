@@ -1,6 +1,7 @@
 # api/authentication/jwt_auth.py
 
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
+from api.utils.user_cache import UserCache
 from datetime import datetime, timezone, timedelta
 from django.conf import settings
 import logging
@@ -106,4 +107,45 @@ class JWTAuthHandler:
             return current_time
         except Exception as e:
             logger.error(f"[JWT] Error actualizando actividad: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+    
+    @staticmethod
+    def get_request_token(request):
+        """
+        Obtener el access token del request: cookie primero, luego header Authorization
+        """
+        token = request.COOKIES.get('access_token')
+        
+        if not token:
+            auth_header = request.headers.get('Authorization', '')
+            if auth_header.startswith('Bearer '):
+                token = auth_header.split(' ')[1]
+        
+        return token
+    
+    @staticmethod
+    def authenticate_request(request):
+        """
+        Validar el token del request y obtener su usuario
+        
+        El resultado se guarda en el request, así el middleware y DRF comparten
+        el mismo usuario y el token se decodifica una sola vez por request.
+        Retorna (user, access_token) o None si no hay token.
+        Lanza TokenError si el token es inválido y User.DoesNotExist si el usuario no existe.
+        """
+        # DRF envuelve el HttpRequest original
+        http_request = getattr(request, '_request', request)
+        
+        cached = getattr(http_request, '_jwt_auth', None)
+        if cached is not None:
+            return cached
+        
+        token = JWTAuthHandler.get_request_token(http_request)
+        if not token:
+            return None
+        
+        access_token = AccessToken(token)
+        user = UserCache.get_user(access_token['user_id'])
+        
+        http_request._jwt_auth = (user, access_token)
+        return http_request._jwt_auth
@@ -0,0 +1,49 @@
+# api/management/commands/archive_stock_audits.py
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from api.models import StockAudit
+from api.utils.stock_audit import StockAuditLog
+from datetime import timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Comprime el detalle de las auditorías de stock antiguas y elimina sus líneas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=90,
+            help='Archivar auditorías con más de N días (default: 90)',
+        )
+        parser.add_argument(
+            '--company',
+            type=str,
+            help='Archivar solo una empresa (id)',
+        )
+
+    def handle(self, *args, **options):
+        limit = timezone.now() - timedelta(days=options['days'])
+
+        audits = StockAudit.objects.filter(
+            performed_at__lt=limit,
+            archived_at__isnull=True
+        ).only('id', 'archived_at').order_by('performed_at')
+
+        if options.get('company'):
+            audits = audits.filter(company_id=options['company'])
+
+        total_audits = 0
+        total_lines = 0
+
+        for audit in audits.iterator():
+            total_lines += StockAuditLog.archive(audit)
+            total_audits += 1
+
+        logger.info(f"[AUDIT] Auditorías archivadas: {total_audits} ({total_lines} líneas)")
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Auditorías archivadas: {total_audits} ({total_lines} líneas)'
+        ))
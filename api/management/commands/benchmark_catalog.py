@@ -0,0 +1,299 @@
+# api/management/commands/benchmark_catalog.py
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from api.models import (
+    Company, Role, User, Department, Category, Product,
+    Shift, Sale, SaleItem, SalePayment, CashMovement
+)
+from api.serializers.product_serializers import ProductListSerializer, ProductListRows
+from api.utils.excel_handler import ExcelExporter, ExcelImporter
+from api.views.reports_views import sales_report, cash_flow_report
+from api.views.sale_views import daily_sales_report
+from datetime import timedelta
+from decimal import Decimal
+import io
+import json
+import time
+import tracemalloc
+import uuid
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide listados, exportación, importación y reportes sobre un catálogo '
+        'de prueba (se crea en una transacción que se revierte al terminar)'
+    )
+
+    SECTIONS = ['listing', 'export', 'import', 'reports']
+    PAYMENT_METHODS = ['cash', 'debit', 'transfer', 'credit_card']
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=20000,
+            help='Cantidad de productos del catálogo (default: 20000)',
+        )
+        parser.add_argument(
+            '--sales',
+            type=int,
+            default=300,
+            help='Cantidad de ventas para los reportes (default: 300)',
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=3,
+            help='Repeticiones por medición; se informa la mejor (default: 3)',
+        )
+        parser.add_argument(
+            '--only',
+            choices=self.SECTIONS,
+            action='append',
+            help='Medir solo estas secciones (se puede repetir)',
+        )
+
+    def handle(self, *args, **options):
+        self.runs = max(options['runs'], 1)
+        sections = options['only'] or self.SECTIONS
+
+        # Todo lo creado (catálogo, ventas, importaciones) se revierte
+        with transaction.atomic():
+            company, user = self.seed_company()
+            self.seed_catalog(company, options['products'])
+            self.stdout.write(f"Catálogo de prueba: {options['products']} productos\n")
+
+            if 'listing' in sections:
+                self.bench_listing(company)
+            if 'export' in sections:
+                self.bench_export(company)
+            if 'import' in sections:
+                self.bench_import(company)
+            if 'reports' in sections:
+                self.seed_sales(company, user, options['sales'])
+                self.bench_reports(user, options['sales'])
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Datos de prueba revertidos'))
+
+    # ===== Medición =====
+
+    def measure(self, label, fn):
+        """Ejecutar fn self.runs veces e informar consultas y el mejor tiempo"""
+        timings = []
+        for _ in range(self.runs):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                result = fn()
+                timings.append(time.perf_counter() - started)
+
+        self.stdout.write(
+            f'   {label}: {len(ctx.captured_queries)} consultas, {min(timings) * 1000:.0f} ms'
+        )
+        return result
+
+    # ===== Datos de prueba =====
+
+    def seed_company(self):
+        suffix = uuid.uuid4().hex[:8]
+        company = Company.objects.create(
+            name=f'Benchmark {suffix}',
+            rut=f'{suffix}-B',
+            address='-',
+            phone='-',
+            email=f'benchmark-{suffix}@example.com'
+        )
+        # master_admin: los reportes no dependen de la caché de permisos
+        role = Role.objects.create(
+            company=company,
+            name='master_admin',
+            display_name='Benchmark',
+            hierarchy_level=5
+        )
+        user = User.objects.create_user(
+            f'benchmark-{suffix}@example.com',
+            uuid.uuid4().hex,
+            company=company,
+            role=role,
+            username=f'benchmark-{suffix}',
+            first_name='Benchmark',
+            last_name='Catálogo',
+            rut=f'{suffix}-U'
+        )
+        self.prefix = f'BM{suffix}'
+        return company, user
+
+    def seed_catalog(self, company, count):
+        departments = Department.objects.bulk_create([
+            Department(company=company, name=f'Depto {i}', slug=f'depto-{i}')
+            for i in range(10)
+        ])
+        categories = Category.objects.bulk_create([
+            Category(company=company, department=departments[i % 10], name=f'Categoría {i}', slug=f'categoria-{i}')
+            for i in range(40)
+        ])
+        Product.objects.bulk_create([
+            Product(
+                company=company,
+                barcode=f'{self.prefix}{i:06d}',
+                name=f'Producto {i:06d}',
+                department=departments[i % 10],
+                category=categories[i % 40] if i % 7 else None,
+                unit_price=1000 + i % 500,
+                stock_units=i % 300,
+                min_stock=5,
+                is_package=(i % 3 == 0),
+                units_per_package=12 if i % 3 == 0 else None
+            )
+            for i in range(count)
+        ], batch_size=2000)
+
+    def seed_sales(self, company, user, count):
+        products = list(Product.objects.filter(company=company).order_by('barcode')[:50])
+        shift = Shift.objects.create(
+            company=company,
+            user=user,
+            shift_number=f'{self.prefix}-T1',
+            opening_cash=0
+        )
+        sales = Sale.objects.bulk_create([
+            Sale(
+                company=company,
+                sale_number=f'{self.prefix}-{i:06d}',
+                subtotal=1000,
+                tax_amount=190,
+                total=1190,
+                shift=shift,
+                status='completed',
+                created_by=user
+            )
+            for i in range(count)
+        ])
+        SaleItem.objects.bulk_create([
+            SaleItem(
+                sale=sale,
+                product=products[i % len(products)],
+                quantity=1,
+                unit_price=1000,
+                subtotal=1000,
+                tax_amount=190,
+                total=1190
+            )
+            for i, sale in enumerate(sales)
+        ])
+        SalePayment.objects.bulk_create([
+            SalePayment(sale=sale, payment_method=self.PAYMENT_METHODS[i % 4], amount=1190)
+            for i, sale in enumerate(sales)
+        ])
+        CashMovement.objects.bulk_create([
+            CashMovement(
+                shift=shift,
+                movement_type='income' if i % 2 else 'expense',
+                amount=100,
+                reason='Benchmark',
+                created_by=user
+            )
+            for i in range(50)
+        ])
+
+    # ===== Secciones =====
+
+    def bench_listing(self, company):
+        """Listado completo de productos (list_products sin paginar)"""
+        self.stdout.write(self.style.MIGRATE_HEADING('Listado de productos'))
+        products = Product.objects.filter(company=company, is_active=True).order_by('name')
+
+        serialized = self.measure(
+            'ProductListSerializer (department y category con select_related)',
+            lambda: ProductListSerializer(products.select_related('department', 'category'), many=True).data
+        )
+        rows = self.measure(
+            'ProductListRows',
+            lambda: ProductListRows.serialize(products)
+        )
+
+        equal = json.loads(json.dumps(serialized)) == rows
+        self.stdout.write(f"   Misma salida: {'sí' if equal else 'NO'}")
+
+    def bench_export(self, company):
+        """Exportación de productos: tiempo y memoria máxima"""
+        self.stdout.write(self.style.MIGRATE_HEADING('Exportación de productos'))
+        products = Product.objects.filter(company=company, is_active=True).select_related(
+            'department', 'category'
+        ).order_by('name')
+
+        def export():
+            response = ExcelExporter.export_products(products, company.name)
+            size = sum(len(block) for block in response.streaming_content)
+            # response.close() emite request_finished, que cerraría la conexión
+            response.file_to_stream.close()
+            return size
+
+        size = self.measure('export_products', export)
+
+        # La memoria se mide aparte: tracemalloc hace mucho más lento el export
+        tracemalloc.start()
+        export()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.stdout.write(f'   Memoria máxima {peak / 1e6:.1f} MB, archivo {size / 1e6:.1f} MB')
+
+    def bench_import(self, company):
+        """Importación: productos nuevos, sin cambios y con cambio de precio"""
+        self.stdout.write(self.style.MIGRATE_HEADING('Importación de productos'))
+
+        # Mismo formato que la exportación, con códigos y nombres nuevos
+        title, headers, rows, _ = ExcelExporter.products_sheet(
+            Product.objects.filter(company=company).select_related('department').order_by('barcode')
+        )
+        book = io.BytesIO()
+        ExcelExporter.write_streaming(book, title, headers, ([f'I{row[0]}', row[1], f'{row[2]} (importado)'] + row[3:] for row in rows))
+        department_map = {dept.name.lower(): dept for dept in Department.objects.filter(company=company)}
+        imported = Product.objects.filter(company=company, barcode__startswith=f'I{self.prefix}')
+
+        def run(label):
+            book.seek(0)
+            started = time.perf_counter()
+            result = ExcelImporter.import_products(book, company, department_map)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"   {label}: {elapsed:.1f} s ({result['created']} creados, {result['updated']} "
+                f"actualizados, {result['unchanged']} sin cambios, {len(result['errors'])} errores)"
+            )
+
+        run('Primera importación')
+        run('Sin cambios')
+        # El archivo restaura el precio original en todas las filas
+        imported.update(unit_price=F('unit_price') + Decimal('1'))
+        run('Cambio de precio en todas las filas')
+
+    def bench_reports(self, user, count):
+        """Reportes por el camino sin rollups (la empresa de prueba no tiene rollups)"""
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Reportes ({count} ventas)'))
+        factory = APIRequestFactory()
+        today = timezone.localdate()
+        params = {
+            'start_date': (today - timedelta(days=3)).isoformat(),
+            'end_date': today.isoformat(),
+        }
+
+        def call(view, path, data=None):
+            request = factory.get(path, data or {})
+            force_authenticate(request, user=user)
+            return view(request)
+
+        for label, view, path, data in [
+            ('sales_report', sales_report, '/api/reports/sales/', params),
+            ('cash_flow_report', cash_flow_report, '/api/reports/cash-flow/', params),
+            ('daily_sales_report', daily_sales_report, '/api/sales/daily-report/', None),
+        ]:
+            response = self.measure(label, lambda: call(view, path, data))
+            if response.status_code != 200:
+                self.stdout.write(self.style.WARNING(f'   {label}: respuesta {response.status_code}'))
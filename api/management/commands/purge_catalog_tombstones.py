@@ -0,0 +1,19 @@
+# api/management/commands/purge_catalog_tombstones.py
+
+from django.core.management.base import BaseCommand
+from api.utils.catalog_sync import CatalogSync
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Elimina los registros de eliminación del catálogo offline más antiguos que la retención'
+
+    def handle(self, *args, **options):
+        deleted = CatalogSync.purge_tombstones()
+
+        logger.info(f"[CATALOG] Registros de eliminación purgados: {deleted}")
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Registros de eliminación purgados: {deleted} '
+            f'(retención: {CatalogSync.TOMBSTONE_DAYS} días)'
+        ))
@@ -0,0 +1,77 @@
+# api/management/commands/rebuild_client_totals.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.models import Client
+from api.models.client import ClientTotals
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Recalcula el resumen de compras de los clientes y corrige las diferencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Solo mostrar las diferencias, sin guardar',
+        )
+        parser.add_argument(
+            '--company',
+            type=str,
+            help='Reconstruir solo una empresa (id)',
+        )
+        parser.add_argument(
+            '--client',
+            type=str,
+            help='Reconstruir solo un cliente por RUT (ej: 12.345.678-9)',
+        )
+
+    def handle(self, *args, **options):
+        fix = not options['check']
+
+        clients = Client.objects.select_related('totals').order_by('created_at')
+
+        if options.get('company'):
+            clients = clients.filter(company_id=options['company'])
+        if options.get('client'):
+            clients = clients.filter(rut=options['client'])
+
+        checked = 0
+        mismatched = 0
+
+        for client in clients.iterator(chunk_size=500):
+            checked += 1
+            expected = ClientTotals.compute(client)
+            totals = ClientTotals.of(client)
+
+            differences = [
+                (field, getattr(totals, field), value)
+                for field, value in expected.items()
+                if getattr(totals, field) != value
+            ]
+
+            if not differences:
+                continue
+
+            mismatched += 1
+            self.stdout.write(self.style.WARNING(f'⚠️  {client.rut} - {client.first_name} {client.last_name}'))
+            for field, stored, computed in differences:
+                self.stdout.write(f'   {field}: guardado {stored} / recalculado {computed}')
+
+            if fix:
+                with transaction.atomic():
+                    # Bloquear la fila y recalcular: las ventas en curso esperan al rebuild
+                    ClientTotals.objects.select_for_update().filter(client=client).first()
+                    expected = ClientTotals.compute(client)
+                    ClientTotals.objects.update_or_create(client=client, defaults=expected)
+                logger.info(f"[CLIENT-TOTALS] Totales reconstruidos: {client.rut}")
+
+        self.stdout.write(f'\nClientes verificados: {checked}')
+
+        if mismatched:
+            action = 'corregidos' if fix else 'con diferencias (sin --check se corrigen)'
+            self.stdout.write(self.style.WARNING(f'Clientes {action}: {mismatched}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ Todos los totales coinciden'))
@@ -0,0 +1,107 @@
+# api/management/commands/rebuild_sales_rollups.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Min
+from django.utils import timezone
+from api.models import Company, Sale
+from api.models.sale import SalesRollupDay
+from api.utils.sales_rollup import SalesRollup
+from datetime import timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Reconstruye los rollups diarios de ventas desde las tablas de ventas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company',
+            type=str,
+            help='Reconstruir solo una empresa (id)',
+        )
+        parser.add_argument(
+            '--start',
+            type=str,
+            help='Fecha inicial YYYY-MM-DD (default: primera venta de la empresa)',
+        )
+        parser.add_argument(
+            '--end',
+            type=str,
+            help='Fecha final YYYY-MM-DD (default: hoy)',
+        )
+        parser.add_argument(
+            '--dirty-only',
+            action='store_true',
+            help='Recalcular solo los días marcados como modificados, incluido hoy (tarea programada)',
+        )
+
+    def handle(self, *args, **options):
+        start = SalesRollup.parse_day(options['start']) if options.get('start') else None
+        end = SalesRollup.parse_day(options['end']) if options.get('end') else timezone.localdate()
+
+        if (options.get('start') and not start) or not end:
+            raise CommandError('Las fechas deben tener formato YYYY-MM-DD')
+
+        companies = Company.objects.order_by('name')
+        if options.get('company'):
+            companies = companies.filter(id=options['company'])
+
+        total_days = 0
+
+        for company in companies:
+            if options['dirty_only']:
+                # Incluye el día actual: una vez recalculado, los
+                # reportes lo leen de los rollups hasta la próxima venta
+                days = SalesRollupDay.objects.filter(
+                    company=company,
+                    refreshed_version__lt=F('version'),
+                    date__lte=end
+                )
+                if start:
+                    days = days.filter(date__gte=start)
+                days = list(days.order_by('date').values_list('date', flat=True))
+            else:
+                days = self._days_to_rebuild(company, start, end)
+
+            for day in days:
+                SalesRollup.refresh_day(company.id, day)
+
+            total_days += len(days)
+
+            if days:
+                self.stdout.write(f'{company.name}: {len(days)} días recalculados')
+                logger.info(f"[ROLLUP] {company.name}: {len(days)} días recalculados")
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Días recalculados: {total_days}'))
+
+    def _days_to_rebuild(self, company, start, end):
+        """Días del rango con ventas o con rollups existentes"""
+        if start is None:
+            first_sale = Sale.objects.filter(company=company).aggregate(
+                first=Min('sale_date')
+            )['first']
+            if first_sale is None:
+                return []
+            start = timezone.localdate(first_sale)
+
+        if start > end:
+            return []
+
+        sale_dates = Sale.objects.filter(
+            company=company,
+            **SalesRollup.sale_date_filters(start, end)
+        ).values_list('sale_date', flat=True)
+
+        days = {timezone.localdate(sale_date) for sale_date in sale_dates.iterator(chunk_size=2000)}
+
+        days.update(SalesRollupDay.objects.filter(
+            company=company,
+            date__gte=start,
+            date__lte=end
+        ).values_list('date', flat=True))
+
+        # El primer día del rango marca el inicio de la cobertura
+        days.add(start)
+
+        return sorted(days)
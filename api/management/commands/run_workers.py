@@ -0,0 +1,136 @@
+# api/management/commands/run_workers.py
+
+from django.core.management.base import BaseCommand
+from django.db import connections, close_old_connections
+from api.utils.background_jobs import JobQueue
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_INTERVAL = 60  # segundos entre revisiones de tareas caídas / antiguas
+
+
+def worker_loop(name, stop_event, poll_interval):
+    """Proceso worker: tomar y ejecutar tareas hasta recibir la señal de término"""
+    # El padre maneja las señales y avisa por stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    logger.info(f"[JOBS] Worker iniciado: {name}")
+
+    while not stop_event.is_set():
+        close_old_connections()
+
+        try:
+            worked = JobQueue.run_next(name)
+        except Exception:
+            logger.exception(f"[JOBS] Error en worker {name}")
+            worked = False
+
+        if not worked:
+            stop_event.wait(poll_interval)
+
+    connections.close_all()
+    logger.info(f"[JOBS] Worker detenido: {name}")
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta los workers de tareas en segundo plano (exportaciones, importaciones, reinicio de stock)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=2,
+            help='Cantidad de procesos worker (default: 2)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Segundos de espera cuando no hay tareas pendientes (default: 2)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Ejecutar las tareas pendientes en este proceso y terminar',
+        )
+
+    def handle(self, *args, **options):
+        base_name = f"{socket.gethostname()}:{os.getpid()}"
+
+        JobQueue.recover_stale()
+
+        if options['once']:
+            count = 0
+            while JobQueue.run_next(base_name):
+                count += 1
+            self.stdout.write(self.style.SUCCESS(f'✅ Tareas ejecutadas: {count}'))
+            return
+
+        processes = max(options['processes'], 1)
+        poll_interval = options['poll_interval']
+        stop_event = multiprocessing.Event()
+        stopping = []
+
+        # El handler solo marca; el Event compartido se activa desde el loop
+        # (Event.set dentro de un handler puede bloquearse con Event.wait)
+        def stop(signum, frame):
+            stopping.append(signum)
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        # Los hijos no deben heredar las conexiones abiertas del padre
+        connections.close_all()
+
+        workers = {}
+
+        def start(index):
+            name = f"{base_name}-{index}"
+            process = multiprocessing.Process(
+                target=worker_loop,
+                args=(name, stop_event, poll_interval),
+                name=name
+            )
+            process.start()
+            workers[index] = process
+
+        for index in range(processes):
+            start(index)
+
+        self.stdout.write(f'{processes} workers iniciados ({base_name})')
+
+        last_maintenance = time.monotonic()
+
+        while not stopping:
+            time.sleep(1)
+
+            # Reiniciar workers que terminaron inesperadamente
+            for index, process in list(workers.items()):
+                if not process.is_alive() and not stopping:
+                    logger.warning(f"[JOBS] Worker {process.name} terminó (código {process.exitcode}), reiniciando")
+                    start(index)
+
+            if time.monotonic() - last_maintenance >= MAINTENANCE_INTERVAL:
+                close_old_connections()
+                try:
+                    JobQueue.recover_stale()
+                    JobQueue.purge_expired()
+                except Exception:
+                    logger.exception("[JOBS] Error en mantenimiento de tareas")
+                last_maintenance = time.monotonic()
+
+        self.stdout.write('Deteniendo workers...')
+        stop_event.set()
+
+        for process in workers.values():
+            process.join()
+
+        connections.close_all()
+        self.stdout.write(self.style.SUCCESS('✅ Workers detenidos'))
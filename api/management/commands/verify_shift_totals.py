@@ -0,0 +1,87 @@
+# api/management/commands/verify_shift_totals.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.models import Shift
+from api.models.shift import ShiftTotals
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Recalcula los totales acumulados de los turnos y muestra las diferencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Guardar los totales recalculados cuando haya diferencias',
+        )
+        parser.add_argument(
+            '--shift',
+            type=str,
+            help='Verificar solo un turno por número (ej: TUR-000001)',
+        )
+        parser.add_argument(
+            '--open-only',
+            action='store_true',
+            help='Verificar solo turnos abiertos',
+        )
+
+    def handle(self, *args, **options):
+        fix = options['fix']
+
+        shifts = Shift.objects.select_related('totals').order_by('opened_at')
+
+        if options.get('shift'):
+            shifts = shifts.filter(shift_number=options['shift'])
+        if options['open_only']:
+            shifts = shifts.filter(status='open')
+
+        checked = 0
+        mismatched = 0
+
+        for shift in shifts.iterator(chunk_size=500):
+            checked += 1
+            expected = ShiftTotals.compute(shift)
+
+            try:
+                totals = shift.totals
+            except ShiftTotals.DoesNotExist:
+                totals = None
+
+            if totals is None:
+                differences = [('(sin totales)', None, None)]
+            else:
+                differences = [
+                    (field, getattr(totals, field), value)
+                    for field, value in expected.items()
+                    if getattr(totals, field) != value
+                ]
+
+            if not differences:
+                continue
+
+            mismatched += 1
+            self.stdout.write(self.style.WARNING(f'⚠️  {shift.shift_number}'))
+            for field, stored, computed in differences:
+                if stored is None:
+                    self.stdout.write(f'   {field}')
+                else:
+                    self.stdout.write(f'   {field}: guardado {stored} / recalculado {computed}')
+
+            if fix:
+                with transaction.atomic():
+                    # Bloquear la fila y recalcular: las ventas en curso esperan al rebuild
+                    ShiftTotals.objects.select_for_update().filter(shift=shift).first()
+                    expected = ShiftTotals.compute(shift)
+                    ShiftTotals.objects.update_or_create(shift=shift, defaults=expected)
+                logger.info(f"[SHIFT-TOTALS] Totales reconstruidos: {shift.shift_number}")
+
+        self.stdout.write(f'\nTurnos verificados: {checked}')
+
+        if mismatched:
+            action = 'corregidos' if fix else 'con diferencias (usar --fix para corregir)'
+            self.stdout.write(self.style.WARNING(f'Turnos {action}: {mismatched}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ Todos los totales coinciden'))
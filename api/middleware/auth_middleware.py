@@ -3,7 +3,7 @@
 from django.utils.deprecation import MiddlewareMixin
 from django.http import JsonResponse
 from django.shortcuts import redirect
-from rest_framework_simplejwt.tokens import AccessToken, TokenError
+from rest_framework_simplejwt.tokens import TokenError
 from api.models import User
 from api.authentication.jwt_auth import JWTAuthHandler
 from datetime import datetime, timezone
@@ -23,41 +23,26 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
         public_paths = [
             '/api/auth/login/',
             '/api/auth/register/',
+            '/api/auth/logout/',
             '/admin/',
             '/static/',
             '/media/',
-            '/',
         ]
         
         # Verificar si es ruta pública (incluyendo raíz exacta)
         if request.path == '/' or any(request.path.startswith(path) for path in public_paths):
             return None
         
-        # Intentar obtener token de cookie PRIMERO
-        token = request.COOKIES.get('access_token')
-        logger.info(f"[AUTH] Cookie access_token: {'PRESENTE' if token else 'NO ENCONTRADA'}")
-        logger.info(f"[AUTH] Cookies disponibles: {list(request.COOKIES.keys())}")
-        
-        # Si no hay cookie, intentar del header Authorization
-        if not token:
-            auth_header = request.headers.get('Authorization', '')
-            if auth_header.startswith('Bearer '):
-                token = auth_header.split(' ')[1]
-                logger.info(f"[AUTH] Token obtenido del header Authorization")
-        
-        if not token:
-            logger.warning(f"[AUTH] No se encontró token para: {request.path}")
-            return self._handle_no_token(request)
-        
         try:
-            # Validar token
-            access_token = AccessToken(token)
-            user_id = access_token['user_id']
+            # Validar token y obtener usuario (cookie o header Authorization).
+            # El resultado queda en el request y DRF lo reutiliza.
+            auth = JWTAuthHandler.authenticate_request(request)
             
-            logger.info(f"[AUTH] Token válido para user_id: {user_id}")
+            if auth is None:
+                logger.warning(f"[AUTH] No se encontró token para: {request.path}")
+                return self._handle_no_token(request)
             
-            # Obtener usuario
-            user = User.objects.select_related('company', 'role').get(id=user_id)
+            user, access_token = auth
             
             if not user.is_active:
                 logger.warning(f"[AUTH] Usuario inactivo: {user.email}")
@@ -79,7 +64,7 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
             return self._handle_invalid_token(request)
             
         except User.DoesNotExist:
-            logger.error(f"[AUTH] Usuario no encontrado para user_id: {user_id}")
+            logger.error(f"[AUTH] Usuario no encontrado para el token de: {request.path}")
             return JsonResponse({
                 'error': 'Usuario no encontrado'
             }, status=401)
@@ -161,8 +146,8 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
     
     def _handle_no_token(self, request):
         """Manejar caso cuando no hay token"""
-        # Si es una petición a /*, redirigir al login
-        if request.path.startswith(''):
+        # Si es una petición de página, redirigir al login
+        if not request.path.startswith('/api/'):
             return redirect('/')
         
         # Si es una petición API, retornar 401
@@ -173,8 +158,8 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
     
     def _handle_invalid_token(self, request):
         """Manejar caso cuando el token es inválido o expiró"""
-        # Si es una petición a /*, redirigir al login y limpiar cookies
-        if request.path.startswith(''):
+        # Si es una petición de página, redirigir al login y limpiar cookies
+        if not request.path.startswith('/api/'):
             response = redirect('/')
             response.delete_cookie('access_token')
             response.delete_cookie('refresh_token')
@@ -2,7 +2,7 @@
 
 from django.http import JsonResponse, Http404
 from django.shortcuts import render
-from api.models import Page, Permission, RolePageAccess, UserPageAccess, RolePermission, UserPermission
+from api.utils.permission_cache import PermissionCache, PageAccessCache
 from django.utils.deprecation import MiddlewareMixin
 import logging
 
@@ -22,11 +22,12 @@ class PermissionMiddleware(MiddlewareMixin):
             '/static/',
             '/media/',
             '/login/',
-            '/',  # Dashboard siempre accesible para autenticados
         ]
         
-        # Saltar verificación para rutas públicas
-        if any(request.path.startswith(path) for path in public_paths):
+        # Saltar verificación para rutas públicas. El dashboard ('/') solo
+        # como ruta exacta: como prefijo coincidía con todas las rutas y la
+        # verificación de páginas nunca se ejecutaba
+        if request.path == '/' or any(request.path.startswith(path) for path in public_paths):
             return None
         
         # Si no hay usuario autenticado, el middleware JWT ya manejó esto
@@ -55,28 +56,18 @@ class PermissionMiddleware(MiddlewareMixin):
         """Verificar si el usuario tiene acceso a la página"""
         path = request.path
         
-        try:
-            # Buscar la página por ruta
-            page = Page.objects.filter(route=path).first()
-            
-            if not page:
-                # Página no existe en BD - dejar pasar (será 404 real de Django)
-                return None
-            
-            # Verificar si el usuario tiene acceso
-            has_access = self.check_page_access(user, page)
-            
-            if not has_access:
-                logger.warning(f"[PERMISOS] Acceso denegado a {path} para {user.email} ({user.role.display_name})")
-                # Retornar 404 en lugar de 403 por seguridad
-                raise Http404("Página no encontrada")
-            
-            logger.info(f"[PERMISOS] Acceso permitido a {path} para {user.email}")
-            return None
-            
-        except Page.DoesNotExist:
-            # Página no existe - Django manejará el 404
+        # Página no existe en BD - dejar pasar (será 404 real de Django)
+        if path not in PageAccessCache.get_routes():
             return None
+        
+        # Verificar si el usuario tiene acceso
+        if path not in PageAccessCache.get_allowed_routes(user):
+            logger.warning(f"[PERMISOS] Acceso denegado a {path} para {user.email} ({user.role.display_name})")
+            # Retornar 404 en lugar de 403 por seguridad
+            raise Http404("Página no encontrada")
+        
+        logger.info(f"[PERMISOS] Acceso permitido a {path} para {user.email}")
+        return None
     
     @staticmethod
     def check_page_access(user, page):
@@ -88,25 +79,7 @@ class PermissionMiddleware(MiddlewareMixin):
         if user.role.name == 'master_admin':
             return True
         
-        # 1. Verificar restricción específica del usuario (puede QUITAR acceso)
-        user_access = UserPageAccess.objects.filter(
-            user=user,
-            page=page
-        ).first()
-        
-        if user_access:
-            # Si existe restricción de usuario y can_access=False, denegar
-            if not user_access.can_access:
-                return False
-        
-        # 2. Verificar permiso del rol
-        role_access = RolePageAccess.objects.filter(
-            role=user.role,
-            page=page,
-            can_access=True
-        ).exists()
-        
-        return role_access
+        return page.route in PageAccessCache.get_allowed_routes(user)
     
     @staticmethod
     def check_permission(user, resource, action):
@@ -117,25 +90,5 @@ class PermissionMiddleware(MiddlewareMixin):
         if user.role.name == 'master_admin':
             return True
         
-        try:
-            permission = Permission.objects.get(resource=resource, action=action)
-        except Permission.DoesNotExist:
-            return False
-        
-        # Verificar restricción de usuario (puede QUITAR permiso)
-        user_perm = UserPermission.objects.filter(
-            user=user,
-            permission=permission
-        ).first()
-        
-        if user_perm and not user_perm.is_granted:
-            return False
-        
-        # Verificar permiso del rol
-        role_perm = RolePermission.objects.filter(
-            role=user.role,
-            permission=permission,
-            is_granted=True
-        ).exists()
-        
-        return role_perm
\ No newline at end of file
+        # Conjunto de permisos resuelto (una consulta por usuario/rol, luego cache)
+        return (resource, action) in PermissionCache.get_permissions(user)
\ No newline at end of file
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:25
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSequence',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('document_type', models.CharField(choices=[('sale', 'Venta'), ('consignment', 'Consignación'), ('shift', 'Turno')], max_length=20)),
+                ('last_value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_sequences', to='api.company')),
+            ],
+            options={
+                'db_table': 'document_sequences',
+                'unique_together': {('company', 'document_type')},
+            },
+        ),
+    ]
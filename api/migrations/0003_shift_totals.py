@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_document_sequences'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShiftTotals',
+            fields=[
+                ('shift', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='totals', serialize=False, to='api.shift')),
+                ('sales_count', models.IntegerField(default=0)),
+                ('sales_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cash_sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('debit_sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('credit_card_sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('transfer_sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('check_sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('credit_sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cash_income', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cash_expense', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cash_withdrawals', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cash_deposits', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('credit_payments', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('credit_payments_cash', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'shift_totals',
+            },
+        ),
+    ]
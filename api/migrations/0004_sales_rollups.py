@@ -0,0 +1,82 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:33
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_shift_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPaymentRollup',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('payment_method', models.CharField(max_length=20)),
+                ('payments_count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cashier', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_payment_rollups', to=settings.AUTH_USER_MODEL)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_payment_rollups', to='api.company')),
+            ],
+            options={
+                'db_table': 'daily_payment_rollups',
+                'indexes': [models.Index(fields=['company', 'date'], name='idx_dpr_co_date')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductRollup',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('items_count', models.IntegerField(default=0)),
+                ('quantity', models.DecimalField(decimal_places=3, default=0, max_digits=14)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cashier', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_product_rollups', to=settings.AUTH_USER_MODEL)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_product_rollups', to='api.company')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='api.product')),
+            ],
+            options={
+                'db_table': 'daily_product_rollups',
+                'indexes': [models.Index(fields=['company', 'date'], name='idx_dprod_co_date')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('sales_count', models.IntegerField(default=0)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('tax_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cashier', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_sales_rollups', to=settings.AUTH_USER_MODEL)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales_rollups', to='api.company')),
+            ],
+            options={
+                'db_table': 'daily_sales_rollups',
+                'indexes': [models.Index(fields=['company', 'date'], name='idx_dsr_co_date')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesRollupDay',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('version', models.BigIntegerField(default=1)),
+                ('refreshed_version', models.BigIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollup_days', to='api.company')),
+            ],
+            options={
+                'db_table': 'sales_rollup_days',
+                'unique_together': {('company', 'date')},
+            },
+        ),
+    ]
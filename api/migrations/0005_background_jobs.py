@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:51
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('job_type', models.CharField(choices=[('product_import', 'Importación de Productos'), ('product_export', 'Exportación de Productos'), ('client_export', 'Exportación de Clientes'), ('department_export', 'Exportación de Departamentos'), ('credit_export', 'Exportación de Créditos'), ('purchase_order_export', 'Exportación de Órdenes de Compra'), ('stock_reset', 'Reinicio de Stock')], max_length=30)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En Ejecución'), ('completed', 'Completada'), ('failed', 'Fallida'), ('cancelled', 'Cancelada')], default='pending', max_length=20)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('progress', models.IntegerField(default=0)),
+                ('progress_message', models.CharField(blank=True, max_length=255)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('result_file', models.CharField(blank=True, max_length=500)),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='background_jobs', to='api.company')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='background_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'background_jobs',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='idx_job_status'), models.Index(fields=['company', 'created_at'], name='idx_job_comp_date')],
+            },
+        ),
+    ]
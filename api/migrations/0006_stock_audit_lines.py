@@ -0,0 +1,84 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:59
+
+import django.db.models.deletion
+import uuid
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def move_audit_details_to_lines(apps, schema_editor):
+    """Pasar el detalle por producto guardado en before_data/after_data a stock_audit_lines"""
+    StockAudit = apps.get_model('api', 'StockAudit')
+    StockAuditLine = apps.get_model('api', 'StockAuditLine')
+    Product = apps.get_model('api', 'Product')
+
+    for audit in StockAudit.objects.filter(before_data__has_key='products').iterator():
+        after_data = audit.after_data if isinstance(audit.after_data, dict) else {}
+        new_stocks = {
+            item.get('product_id'): item.get('new_stock')
+            for item in after_data.get('products', [])
+        }
+        default_stock = after_data.get('stock_units')
+
+        changes = []
+        for item in audit.before_data.get('products', []):
+            product_id = item.get('product_id')
+            old_stock = item.get('old_stock', item.get('stock_units'))
+            new_stock = new_stocks.get(product_id, default_stock)
+            if old_stock is not None and new_stock is not None:
+                changes.append((product_id, old_stock, new_stock))
+
+        existing = {
+            str(product_id)
+            for product_id in Product.objects.filter(
+                id__in=[product_id for product_id, _, _ in changes]
+            ).values_list('id', flat=True)
+        }
+
+        StockAuditLine.objects.bulk_create([
+            StockAuditLine(
+                audit=audit,
+                product_id=product_id,
+                old_stock=Decimal(str(old_stock)),
+                new_stock=Decimal(str(new_stock))
+            )
+            for product_id, old_stock, new_stock in changes if product_id in existing
+        ], batch_size=1000)
+
+        audit.before_data = None
+        audit.after_data = {'stock_units': default_stock} if default_stock is not None else None
+        audit.save(update_fields=['before_data', 'after_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_background_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockaudit',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='stockaudit',
+            name='lines_archive',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='StockAuditLine',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('old_stock', models.DecimalField(decimal_places=0, max_digits=10)),
+                ('new_stock', models.DecimalField(decimal_places=0, max_digits=10)),
+                ('audit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='api.stockaudit')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stock_audit_lines', to='api.product')),
+            ],
+            options={
+                'db_table': 'stock_audit_lines',
+            },
+        ),
+        migrations.RunPython(move_audit_details_to_lines, migrations.RunPython.noop),
+    ]
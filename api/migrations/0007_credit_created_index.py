@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_stock_audit_lines'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='credit',
+            index=models.Index(fields=['created_at'], name='idx_cred_created'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:06
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def fill_product_barcodes(apps, schema_editor):
+    """Indexar los códigos de unidad y paquete de los productos existentes"""
+    Product = apps.get_model('api', 'Product')
+    ProductBarcode = apps.get_model('api', 'ProductBarcode')
+
+    batch = []
+    products = Product.objects.values_list('id', 'company_id', 'barcode', 'barcode_package')
+
+    for product_id, company_id, barcode, barcode_package in products.iterator(chunk_size=2000):
+        batch.append(ProductBarcode(company_id=company_id, product_id=product_id, code=barcode, kind='unit'))
+        if barcode_package:
+            batch.append(ProductBarcode(company_id=company_id, product_id=product_id, code=barcode_package, kind='package'))
+
+        if len(batch) >= 1000:
+            ProductBarcode.objects.bulk_create(batch)
+            batch = []
+
+    if batch:
+        ProductBarcode.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_credit_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductBarcode',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('code', models.CharField(max_length=50)),
+                ('kind', models.CharField(choices=[('unit', 'Unidad'), ('package', 'Paquete')], max_length=10)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_barcodes', to='api.company')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='barcodes', to='api.product')),
+            ],
+            options={
+                'db_table': 'product_barcodes',
+                'indexes': [models.Index(fields=['company', 'code'], name='idx_pbar_comp_code')],
+                'unique_together': {('product', 'kind')},
+            },
+        ),
+        migrations.RunPython(fill_product_barcodes, migrations.RunPython.noop),
+    ]
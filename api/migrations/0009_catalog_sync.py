@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:08
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_product_barcodes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogTombstone',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('entity', models.CharField(choices=[('product', 'Producto'), ('promotion', 'Promoción')], max_length=20)),
+                ('object_id', models.UUIDField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'catalog_tombstones',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['company', 'updated_at'], name='idx_prod_comp_upd'),
+        ),
+        migrations.AddIndex(
+            model_name='promotion',
+            index=models.Index(fields=['company', 'updated_at'], name='idx_prom_comp_upd'),
+        ),
+        migrations.AddField(
+            model_name='catalogtombstone',
+            name='company',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='catalog_tombstones', to='api.company'),
+        ),
+        migrations.AddIndex(
+            model_name='catalogtombstone',
+            index=models.Index(fields=['company', 'deleted_at'], name='idx_ctomb_comp_del'),
+        ),
+    ]
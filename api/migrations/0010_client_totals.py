@@ -0,0 +1,80 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Exists, OuterRef, Subquery, Sum
+
+
+def fill_client_totals(apps, schema_editor):
+    """Calcular los totales de los clientes con ventas o créditos existentes"""
+    Client = apps.get_model('api', 'Client')
+    Sale = apps.get_model('api', 'Sale')
+    Credit = apps.get_model('api', 'Credit')
+    ClientTotals = apps.get_model('api', 'ClientTotals')
+
+    sales = {
+        row['client_id']: row
+        for row in Sale.objects.filter(
+            status='completed',
+            client__isnull=False
+        ).order_by().values('client_id').annotate(count=Count('id'), amount=Sum('total'))
+    }
+    credits = dict(
+        Credit.objects.filter(
+            status__in=['active', 'partial', 'overdue']
+        ).order_by().values('client_id').annotate(count=Count('id')).values_list('client_id', 'count')
+    )
+
+    last_sales = Sale.objects.filter(client=OuterRef('pk'), status='completed').order_by('-created_at')
+    open_credits = Credit.objects.filter(client=OuterRef('pk'), status__in=['active', 'partial', 'overdue'])
+    clients = Client.objects.filter(Exists(last_sales) | Exists(open_credits)).annotate(
+        last_sale_id=Subquery(last_sales.values('id')[:1]),
+        last_purchase_at=Subquery(last_sales.values('created_at')[:1]),
+        last_purchase_total=Subquery(last_sales.values('total')[:1]),
+    ).values('id', 'last_sale_id', 'last_purchase_at', 'last_purchase_total')
+
+    batch = []
+    for client in clients.iterator(chunk_size=1000):
+        client_sales = sales.get(client['id'], {})
+        batch.append(ClientTotals(
+            client_id=client['id'],
+            purchases_count=client_sales.get('count', 0),
+            purchases_amount=client_sales.get('amount') or 0,
+            last_sale_id=client['last_sale_id'],
+            last_purchase_at=client['last_purchase_at'],
+            last_purchase_total=client['last_purchase_total'],
+            open_credits_count=credits.get(client['id'], 0),
+        ))
+        if len(batch) >= 1000:
+            ClientTotals.objects.bulk_create(batch)
+            batch = []
+
+    if batch:
+        ClientTotals.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_catalog_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientTotals',
+            fields=[
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='totals', serialize=False, to='api.client')),
+                ('purchases_count', models.IntegerField(default=0)),
+                ('purchases_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('last_purchase_at', models.DateTimeField(blank=True, null=True)),
+                ('last_purchase_total', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('open_credits_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('last_sale', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.sale')),
+            ],
+            options={
+                'db_table': 'client_totals',
+            },
+        ),
+        migrations.RunPython(fill_client_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.7 on 2026-10-17 08:10
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+SALE_PAYMENT_FIELDS = {
+    'cash': 'cash_sales',
+    'debit': 'debit_sales',
+    'credit_card': 'credit_card_sales',
+    'transfer': 'transfer_sales',
+    'check': 'check_sales',
+    'credit': 'credit_sales',
+}
+
+MOVEMENT_FIELDS = {
+    'income': 'cash_income',
+    'expense': 'cash_expense',
+    'withdrawal': 'cash_withdrawals',
+    'deposit': 'cash_deposits',
+}
+
+
+def fill_shift_totals(apps, schema_editor):
+    """
+    Totales de los turnos sin fila (abiertos o cerrados antes de 0003)
+    
+    Sin esto un turno abierto al desplegar calcula el cierre solo con las
+    ventas posteriores y queda con diferencias de caja falsas.
+    """
+    Shift = apps.get_model('api', 'Shift')
+    Sale = apps.get_model('api', 'Sale')
+    SalePayment = apps.get_model('api', 'SalePayment')
+    CashMovement = apps.get_model('api', 'CashMovement')
+    CreditPayment = apps.get_model('api', 'CreditPayment')
+    ShiftTotals = apps.get_model('api', 'ShiftTotals')
+
+    shift_ids = set(Shift.objects.filter(totals__isnull=True).values_list('id', flat=True))
+    if not shift_ids:
+        return
+
+    totals = {}
+
+    def add(shift_id, field, value):
+        if shift_id in shift_ids and value:
+            values = totals.setdefault(shift_id, {})
+            values[field] = values.get(field, 0) + value
+
+    for row in Sale.objects.filter(status='completed', shift__isnull=False).order_by().values(
+        'shift_id'
+    ).annotate(count=Count('id'), amount=Sum('total')):
+        add(row['shift_id'], 'sales_count', row['count'])
+        add(row['shift_id'], 'sales_amount', row['amount'])
+
+    for row in SalePayment.objects.filter(sale__status='completed', sale__shift__isnull=False).order_by().values(
+        'sale__shift_id', 'payment_method'
+    ).annotate(amount=Sum('amount')):
+        field = SALE_PAYMENT_FIELDS.get(row['payment_method'])
+        if field:
+            add(row['sale__shift_id'], field, row['amount'])
+
+    for row in CashMovement.objects.order_by().values('shift_id', 'movement_type').annotate(amount=Sum('amount')):
+        field = MOVEMENT_FIELDS.get(row['movement_type'])
+        if field:
+            add(row['shift_id'], field, row['amount'])
+
+    for row in CreditPayment.objects.filter(shift__isnull=False).order_by().values(
+        'shift_id', 'payment_method'
+    ).annotate(amount=Sum('amount')):
+        add(row['shift_id'], 'credit_payments', row['amount'])
+        if row['payment_method'] == 'cash':
+            add(row['shift_id'], 'credit_payments_cash', row['amount'])
+
+    batch = []
+    for shift_id in shift_ids:
+        batch.append(ShiftTotals(shift_id=shift_id, **totals.get(shift_id, {})))
+        if len(batch) >= 1000:
+            ShiftTotals.objects.bulk_create(batch)
+            batch = []
+
+    if batch:
+        ShiftTotals.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_client_totals'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_shift_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-17 09:05
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_table(apps, schema_editor):
+    """
+    Tabla del cache compartido (CACHES con DatabaseCache)
+
+    createcachetable no hace nada si la tabla ya existe o si el backend
+    configurado no usa la base de datos (Redis).
+    """
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_backfill_shift_totals'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
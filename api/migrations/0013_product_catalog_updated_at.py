@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:47
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_updated_at(apps, schema_editor):
+    """
+    Versión de catálogo inicial = última modificación conocida
+
+    Con el default (instante de la migración) todas las cajas recibirían
+    el catálogo completo en su próximo delta.
+    """
+    Product = apps.get_model('api', 'Product')
+    Product.objects.update(catalog_updated_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_cache_table'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='idx_prod_comp_upd',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='catalog_updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(copy_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['company', 'catalog_updated_at'], name='idx_prod_comp_cat'),
+        ),
+    ]
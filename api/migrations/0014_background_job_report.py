@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 08:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_product_catalog_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='job_type',
+            field=models.CharField(choices=[('product_import', 'Importación de Productos'), ('product_export', 'Exportación de Productos'), ('client_export', 'Exportación de Clientes'), ('department_export', 'Exportación de Departamentos'), ('credit_export', 'Exportación de Créditos'), ('purchase_order_export', 'Exportación de Órdenes de Compra'), ('stock_reset', 'Reinicio de Stock'), ('report', 'Reporte')], max_length=30),
+        ),
+    ]
@@ -41,6 +41,150 @@ class Client(models.Model):
         ]
 
 
+class ClientTotals(models.Model):
+    """
+    Resumen de compras del cliente
+    
+    Se actualiza con UPDATE atómicos (F) en la misma transacción que cada
+    venta, anulación o pago que salda un crédito, para que el detalle y los
+    listados de clientes no consulten ventas ni créditos por cliente.
+    El comando rebuild_client_totals lo recalcula y compara.
+    """
+    
+    # Créditos con saldo pendiente
+    OPEN_CREDIT_STATUSES = ['active', 'partial', 'overdue']
+    
+    client = models.OneToOneField(Client, on_delete=models.CASCADE, primary_key=True, related_name='totals')
+    
+    # Ventas completadas
+    purchases_count = models.IntegerField(default=0)
+    purchases_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    # Última venta completada
+    last_sale = models.ForeignKey('Sale', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_purchase_at = models.DateTimeField(null=True, blank=True)
+    last_purchase_total = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    
+    open_credits_count = models.IntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    COUNTER_FIELDS = ['purchases_count', 'purchases_amount', 'open_credits_count']
+    LAST_PURCHASE_FIELDS = ['last_sale_id', 'last_purchase_at', 'last_purchase_total']
+    
+    class Meta:
+        db_table = 'client_totals'
+    
+    def __str__(self):
+        return f"Totales {self.client_id} - {self.purchases_count} compras"
+    
+    # ===== Lectura =====
+    
+    @classmethod
+    def of(cls, client):
+        """Totales del cliente (sin fila: cliente sin compras, no se crea al leer)"""
+        try:
+            return client.totals
+        except cls.DoesNotExist:
+            return cls(client_id=client.pk)
+    
+    # ===== Acumulación =====
+    
+    @classmethod
+    def _add(cls, client_id, increments, values=None):
+        """Sumar los incrementos (y asignar values) con un solo UPDATE"""
+        from django.db.models import F
+        
+        updates = {field: F(field) + value for field, value in increments.items() if value}
+        updates.update(values or {})
+        if not updates:
+            return
+        
+        if not cls.objects.filter(client_id=client_id).update(**updates):
+            cls.objects.get_or_create(client_id=client_id)
+            cls.objects.filter(client_id=client_id).update(**updates)
+    
+    @classmethod
+    def _last_purchase(cls, client_id, exclude_sale_id=None):
+        """Última venta completada del cliente como valores de LAST_PURCHASE_FIELDS"""
+        from api.models import Sale
+        
+        sales = Sale.objects.filter(client_id=client_id, status='completed')
+        if exclude_sale_id:
+            sales = sales.exclude(id=exclude_sale_id)
+        
+        last_sale = sales.order_by('-created_at').values('id', 'created_at', 'total').first()
+        if not last_sale:
+            return dict.fromkeys(cls.LAST_PURCHASE_FIELDS)
+        
+        return {
+            'last_sale_id': last_sale['id'],
+            'last_purchase_at': last_sale['created_at'],
+            'last_purchase_total': last_sale['total'],
+        }
+    
+    @classmethod
+    def record_sale(cls, sale, open_credit=False):
+        """Acumular una venta completada (es la última compra del cliente)"""
+        if not sale.client_id:
+            return
+        
+        cls._add(sale.client_id, {
+            'purchases_count': 1,
+            'purchases_amount': sale.total,
+            'open_credits_count': 1 if open_credit else 0,
+        }, {
+            'last_sale_id': sale.id,
+            'last_purchase_at': sale.created_at,
+            'last_purchase_total': sale.total,
+        })
+    
+    @classmethod
+    def record_cancellation(cls, sale, closed_credit=False):
+        """
+        Revertir una venta completada que se anula (antes de marcarla cancelada)
+        Si era la última compra se busca la anterior
+        """
+        if not sale.client_id:
+            return
+        
+        values = None
+        if cls.objects.filter(client_id=sale.client_id, last_sale_id=sale.id).exists():
+            values = cls._last_purchase(sale.client_id, exclude_sale_id=sale.id)
+        
+        cls._add(sale.client_id, {
+            'purchases_count': -1,
+            'purchases_amount': -sale.total,
+            'open_credits_count': -1 if closed_credit else 0,
+        }, values)
+    
+    @classmethod
+    def record_credit_closed(cls, credit):
+        """Crédito saldado: deja de contar como abierto"""
+        cls._add(credit.client_id, {'open_credits_count': -1})
+    
+    # ===== Verificación =====
+    
+    @classmethod
+    def compute(cls, client):
+        """Recalcular los totales del cliente desde ventas y créditos"""
+        from django.db.models import Count, Sum
+        from decimal import Decimal
+        
+        sales = client.sales.filter(status='completed').aggregate(
+            count=Count('id'),
+            amount=Sum('total')
+        )
+        
+        values = {
+            'purchases_count': sales['count'],
+            'purchases_amount': sales['amount'] or Decimal('0'),
+            'open_credits_count': client.credits.filter(status__in=cls.OPEN_CREDIT_STATUSES).count(),
+        }
+        values.update(cls._last_purchase(client.pk))
+        return values
+
+
 class Credit(models.Model):
     """Créditos de clientes"""
     STATUS_CHOICES = [
@@ -69,6 +213,7 @@ class Credit(models.Model):
             models.Index(fields=['client', 'status'], name='idx_cred_cli_stat'),
             models.Index(fields=['status'], name='idx_cred_status'),
             models.Index(fields=['due_date'], name='idx_cred_due'),
+            models.Index(fields=['created_at'], name='idx_cred_created'),
         ]
 
 
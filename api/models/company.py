@@ -27,4 +27,30 @@ class Company(models.Model):
         indexes = [
             models.Index(fields=['rut'], name='idx_comp_rut'),
             models.Index(fields=['is_active'], name='idx_comp_active'),
-        ]
\ No newline at end of file
+        ]
+
+
+class DocumentSequence(models.Model):
+    """Correlativos de documentos por empresa (ventas, consignaciones, turnos)"""
+    
+    DOCUMENT_TYPES = [
+        ('sale', 'Venta'),
+        ('consignment', 'Consignación'),
+        ('shift', 'Turno'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='document_sequences')
+    document_type = models.CharField(max_length=20, choices=DOCUMENT_TYPES)
+    
+    # Último número reservado (incluye bloques pre-asignados)
+    last_value = models.BigIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'document_sequences'
+        unique_together = [['company', 'document_type']]
+    
+    def __str__(self):
+        return f"{self.company.name} - {self.get_document_type_display()}: {self.last_value}"
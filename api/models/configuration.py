@@ -49,4 +49,63 @@ class BarcodeReaderConfiguration(models.Model):
         db_table = 'barcode_configurations'
         indexes = [
             models.Index(fields=['user', 'is_active'], name='idx_bc_usr_active'),
-        ]
\ No newline at end of file
+        ]
+
+
+class BackgroundJob(models.Model):
+    """Tareas en segundo plano (importaciones, exportaciones, reinicio de stock)"""
+    
+    JOB_TYPES = [
+        ('product_import', 'Importación de Productos'),
+        ('product_export', 'Exportación de Productos'),
+        ('client_export', 'Exportación de Clientes'),
+        ('department_export', 'Exportación de Departamentos'),
+        ('credit_export', 'Exportación de Créditos'),
+        ('purchase_order_export', 'Exportación de Órdenes de Compra'),
+        ('stock_reset', 'Reinicio de Stock'),
+        ('report', 'Reporte'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En Ejecución'),
+        ('completed', 'Completada'),
+        ('failed', 'Fallida'),
+        ('cancelled', 'Cancelada'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='background_jobs')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='background_jobs')
+    
+    job_type = models.CharField(max_length=30, choices=JOB_TYPES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    params = models.JSONField(default=dict, blank=True)
+    
+    # Progreso (0-100) informado por la tarea
+    progress = models.IntegerField(default=0)
+    progress_message = models.CharField(max_length=255, blank=True)
+    
+    # Resultado
+    result = models.JSONField(null=True, blank=True)
+    result_file = models.CharField(max_length=500, blank=True)  # Ruta relativa en MEDIA_ROOT
+    error = models.TextField(blank=True)
+    
+    # Ejecución
+    attempts = models.IntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'background_jobs'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='idx_job_status'),
+            models.Index(fields=['company', 'created_at'], name='idx_job_comp_date'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_job_type_display()} - {self.get_status_display()}"
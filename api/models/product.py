@@ -1,5 +1,6 @@
 # api/models/product.py
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
 import uuid
 from .company import Company
@@ -89,6 +90,13 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Último cambio de datos de catálogo (sincronización offline de cajas);
+    # los movimientos de stock no lo modifican
+    catalog_updated_at = models.DateTimeField(default=timezone.now)
+    
+    # Campos que cambian solo con movimientos de stock
+    STOCK_FIELDS = frozenset(['stock_units', 'updated_at'])
+    
     class Meta:
         db_table = 'products'
         indexes = [
@@ -96,7 +104,50 @@ class Product(models.Model):
             models.Index(fields=['name'], name='idx_prod_name'),
             models.Index(fields=['department'], name='idx_prod_dept'),
             models.Index(fields=['is_active'], name='idx_prod_active'),
+            models.Index(fields=['company', 'catalog_updated_at'], name='idx_prod_comp_cat'),
+        ]
+    
+    @classmethod
+    def touches_catalog(cls, fields):
+        """Los campos escritos incluyen datos de catálogo (no solo stock)"""
+        return not set(fields) <= cls.STOCK_FIELDS
+    
+    def save(self, *args, **kwargs):
+        # Toda escritura que no sea solo de stock cambia la versión de catálogo
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or Product.touches_catalog(update_fields):
+            self.catalog_updated_at = timezone.now()
+            if update_fields is not None:
+                kwargs['update_fields'] = list(update_fields) + ['catalog_updated_at']
+        
+        super().save(*args, **kwargs)
+
+
+class ProductBarcode(models.Model):
+    """
+    Índice de códigos de barras escaneables (unidad y paquete) por empresa
+    Se sincroniza al guardar el producto (ver BarcodeIndex)
+    """
+    KIND_CHOICES = [
+        ('unit', 'Unidad'),
+        ('package', 'Paquete'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='product_barcodes')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='barcodes')
+    code = models.CharField(max_length=50)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    
+    class Meta:
+        db_table = 'product_barcodes'
+        unique_together = [['product', 'kind']]
+        indexes = [
+            models.Index(fields=['company', 'code'], name='idx_pbar_comp_code'),
         ]
+    
+    def __str__(self):
+        return f"{self.code} ({self.get_kind_display()})"
 
 
 class ProductSupplier(models.Model):
@@ -181,6 +232,7 @@ class Promotion(models.Model):
         indexes = [
             models.Index(fields=['company', 'is_active'], name='idx_prom_comp_act'),
             models.Index(fields=['start_date', 'end_date'], name='idx_prom_dates'),
+            models.Index(fields=['company', 'updated_at'], name='idx_prom_comp_upd'),
         ]
 
 
@@ -195,4 +247,27 @@ class PromotionProduct(models.Model):
         unique_together = [['promotion', 'product']]
         indexes = [
             models.Index(fields=['promotion', 'product'], name='idx_pp_prom_prod'),
-        ]
\ No newline at end of file
+        ]
+
+
+class CatalogTombstone(models.Model):
+    """
+    Registro de productos y promociones eliminados
+    Permite a las cajas quitar del catálogo local lo borrado (ver CatalogSync)
+    """
+    ENTITY_CHOICES = [
+        ('product', 'Producto'),
+        ('promotion', 'Promoción'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='catalog_tombstones')
+    entity = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    object_id = models.UUIDField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'catalog_tombstones'
+        indexes = [
+            models.Index(fields=['company', 'deleted_at'], name='idx_ctomb_comp_del'),
+        ]
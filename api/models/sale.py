@@ -83,32 +83,26 @@ class Sale(models.Model):
         self.total = sum(item.total for item in items)
     
     def apply_promotions(self):
-        """Aplica promociones aplicables a los items de la venta"""
-        from django.utils import timezone
-        now = timezone.now()
+        """Aplica las promociones vigentes a los items de la venta (toda la canasta en una pasada)"""
+        from api.utils.promotion_engine import PromotionEngine
         
-        # Obtener promociones activas
-        promotions = self.company.promotions.filter(
-            status='active',
-            start_date__lte=now,
-            end_date__gte=now
-        ).order_by('-priority')
+        items = list(self.items.all())
+        pricing = PromotionEngine.price_basket(self.company_id, [
+            {'product_id': item.product_id, 'quantity': item.quantity, 'unit_price': item.unit_price}
+            for item in items
+        ])
         
-        for item in self.items.all():
-            applicable_promotions = [
-                promo for promo in promotions
-                if promo.can_apply_to_product(item.product)
-            ]
-            
-            if applicable_promotions:
-                # Aplicar la promoción de mayor prioridad
-                best_promotion = applicable_promotions[0]
-                discount = best_promotion.calculate_discount(item.quantity, item.unit_price)
-                
-                if discount > 0:
-                    item.promotion = best_promotion
-                    item.discount_amount = discount
-                    item.save()
+        changed = []
+        for item, price in zip(items, pricing):
+            if price['promotion']:
+                item.promotion_id = price['promotion']['id']
+                item.discount_amount = price['discount']
+                # Mismo cálculo que SaleItem.save() (bulk_update no lo ejecuta)
+                item.subtotal = item.quantity * item.unit_price
+                item.total = item.subtotal + item.tax_amount - item.discount_amount
+                changed.append(item)
+        
+        SaleItem.objects.bulk_update(changed, ['promotion', 'discount_amount', 'subtotal', 'total'])
     
     def complete_sale(self):
         """Completa la venta y actualiza inventario"""
@@ -245,4 +239,90 @@ class SalePayment(models.Model):
         ]
     
     def __str__(self):
-        return f"{self.get_payment_method_display()} - ${self.amount}"
\ No newline at end of file
+        return f"{self.get_payment_method_display()} - ${self.amount}"
+
+
+# ===== ROLLUPS DIARIOS DE VENTAS =====
+
+class SalesRollupDay(models.Model):
+    """
+    Estado de los rollups diarios de una empresa para un día
+    
+    Cada venta completada o anulada incrementa version; el día se recalcula
+    desde las tablas de ventas cuando refreshed_version queda atrás.
+    """
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey('Company', on_delete=models.CASCADE, related_name='sales_rollup_days')
+    date = models.DateField()
+    
+    version = models.BigIntegerField(default=1)
+    refreshed_version = models.BigIntegerField(default=0)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'sales_rollup_days'
+        unique_together = [['company', 'date']]
+    
+    def __str__(self):
+        return f"{self.company_id} - {self.date} (v{self.refreshed_version}/{self.version})"
+
+
+class DailySalesRollup(models.Model):
+    """Totales de ventas completadas por empresa, día y cajero"""
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey('Company', on_delete=models.CASCADE, related_name='daily_sales_rollups')
+    date = models.DateField()
+    cashier = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, blank=True, related_name='daily_sales_rollups')
+    
+    sales_count = models.IntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    tax_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        db_table = 'daily_sales_rollups'
+        indexes = [
+            models.Index(fields=['company', 'date'], name='idx_dsr_co_date'),
+        ]
+
+
+class DailyPaymentRollup(models.Model):
+    """Pagos de ventas completadas por empresa, día, cajero y método de pago"""
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey('Company', on_delete=models.CASCADE, related_name='daily_payment_rollups')
+    date = models.DateField()
+    cashier = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, blank=True, related_name='daily_payment_rollups')
+    payment_method = models.CharField(max_length=20)
+    
+    payments_count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        db_table = 'daily_payment_rollups'
+        indexes = [
+            models.Index(fields=['company', 'date'], name='idx_dpr_co_date'),
+        ]
+
+
+class DailyProductRollup(models.Model):
+    """Items vendidos (ventas completadas) por empresa, día, cajero y producto"""
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey('Company', on_delete=models.CASCADE, related_name='daily_product_rollups')
+    date = models.DateField()
+    cashier = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, blank=True, related_name='daily_product_rollups')
+    product = models.ForeignKey('Product', on_delete=models.CASCADE, related_name='daily_rollups')
+    
+    items_count = models.IntegerField(default=0)
+    quantity = models.DecimalField(max_digits=14, decimal_places=3, default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)  # Suma de quantity * unit_price
+    
+    class Meta:
+        db_table = 'daily_product_rollups'
+        indexes = [
+            models.Index(fields=['company', 'date'], name='idx_dprod_co_date'),
+        ]
@@ -74,34 +74,13 @@ class Shift(models.Model):
         return f"Turno {self.shift_number} - {self.user.username}"
     
     def calculate_expected_amounts(self):
-        """Calcula los montos esperados basándose en ventas y movimientos"""
-        from django.db.models import Sum, Q
-        
-        # Ventas del turno
-        sales = self.sales.filter(status='completed')
-        
-        # Pagos por método
-        cash_payments = sales.aggregate(
-            total=Sum('payments__amount', filter=Q(payments__payment_method='cash'))
-        )['total'] or Decimal('0')
-        
-        card_payments = sales.aggregate(
-            total=Sum('payments__amount', filter=Q(payments__payment_method__in=['debit', 'credit_card']))
-        )['total'] or Decimal('0')
-        
-        transfer_payments = sales.aggregate(
-            total=Sum('payments__amount', filter=Q(payments__payment_method='transfer'))
-        )['total'] or Decimal('0')
-        
-        # Movimientos de caja
-        cash_movements = self.cash_movements.aggregate(
-            total=Sum('amount')
-        )['total'] or Decimal('0')
+        """Calcula los montos esperados a partir de los totales acumulados del turno"""
+        totals = ShiftTotals.for_shift(self)
         
         # Calcular esperados
-        self.expected_cash = self.opening_cash + cash_payments + cash_movements
-        self.expected_card = card_payments
-        self.expected_transfer = transfer_payments
+        self.expected_cash = self.opening_cash + totals.cash_sales + totals.movements_total
+        self.expected_card = totals.card_sales
+        self.expected_transfer = totals.transfer_sales
         self.expected_total = self.expected_cash + self.expected_card + self.expected_transfer
     
     def close_shift(self, closing_amounts, closed_by, notes=''):
@@ -148,6 +127,193 @@ class Shift(models.Model):
         return self.sales.filter(status='pending').exists()
 
 
+class ShiftTotals(models.Model):
+    """
+    Totales acumulados del turno
+    
+    Se actualizan con UPDATE atómicos (F) en la misma transacción que cada
+    venta, anulación, movimiento de caja o pago de crédito, para que el
+    resumen y el cierre del turno no tengan que re-agregar esas tablas.
+    El comando verify_shift_totals los recalcula y compara.
+    """
+    
+    # Método de pago de la venta -> campo acumulador
+    SALE_PAYMENT_FIELDS = {
+        'cash': 'cash_sales',
+        'debit': 'debit_sales',
+        'credit_card': 'credit_card_sales',
+        'transfer': 'transfer_sales',
+        'check': 'check_sales',
+        'credit': 'credit_sales',
+    }
+    
+    # Tipo de movimiento de caja -> campo acumulador
+    MOVEMENT_FIELDS = {
+        'income': 'cash_income',
+        'expense': 'cash_expense',
+        'withdrawal': 'cash_withdrawals',
+        'deposit': 'cash_deposits',
+    }
+    
+    shift = models.OneToOneField(Shift, on_delete=models.CASCADE, primary_key=True, related_name='totals')
+    
+    # Ventas completadas
+    sales_count = models.IntegerField(default=0)
+    sales_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    # Pagos de ventas por método
+    cash_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    debit_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    credit_card_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    transfer_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    check_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    credit_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    # Movimientos de caja (egresos y retiros se guardan negativos, como en CashMovement)
+    cash_income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cash_expense = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cash_withdrawals = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cash_deposits = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    # Pagos de créditos recibidos en el turno
+    credit_payments = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    credit_payments_cash = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    COUNTER_FIELDS = [
+        'sales_count', 'sales_amount',
+        'cash_sales', 'debit_sales', 'credit_card_sales',
+        'transfer_sales', 'check_sales', 'credit_sales',
+        'cash_income', 'cash_expense', 'cash_withdrawals', 'cash_deposits',
+        'credit_payments', 'credit_payments_cash',
+    ]
+    
+    class Meta:
+        db_table = 'shift_totals'
+    
+    def __str__(self):
+        return f"Totales {self.shift_id} - ${self.sales_amount}"
+    
+    @property
+    def card_sales(self):
+        return self.debit_sales + self.credit_card_sales
+    
+    @property
+    def movements_total(self):
+        return self.cash_income + self.cash_expense + self.cash_withdrawals + self.cash_deposits
+    
+    # ===== Acumulación =====
+    
+    @classmethod
+    def for_shift(cls, shift):
+        """
+        Obtener los totales del turno
+        Si no existen se crean recalculados desde ventas y movimientos
+        (nunca vacíos: el cierre del turno los usa como esperados)
+        """
+        try:
+            return shift.totals
+        except cls.DoesNotExist:
+            totals, _ = cls.objects.get_or_create(shift_id=shift.pk, defaults=cls.compute(shift))
+            return totals
+    
+    @classmethod
+    def _add(cls, shift_id, increments):
+        """Sumar los incrementos con un solo UPDATE"""
+        from django.db.models import F
+        
+        increments = {field: value for field, value in increments.items() if value}
+        if not increments:
+            return
+        
+        updates = {field: F(field) + value for field, value in increments.items()}
+        
+        if not cls.objects.filter(shift_id=shift_id).update(**updates):
+            cls.objects.get_or_create(shift_id=shift_id)
+            cls.objects.filter(shift_id=shift_id).update(**updates)
+    
+    @classmethod
+    def record_sale(cls, sale, payments, sign=1):
+        """
+        Acumular una venta completada y sus pagos
+        sign=-1 revierte la venta (anulación)
+        payments: iterable de (payment_method, amount)
+        """
+        if not sale.shift_id:
+            return
+        
+        increments = {
+            'sales_count': sign,
+            'sales_amount': sign * sale.total,
+        }
+        for payment_method, amount in payments:
+            field = cls.SALE_PAYMENT_FIELDS.get(payment_method)
+            if field:
+                increments[field] = increments.get(field, Decimal('0')) + sign * Decimal(str(amount))
+        
+        cls._add(sale.shift_id, increments)
+    
+    @classmethod
+    def record_movement(cls, movement):
+        """Acumular un movimiento de caja"""
+        cls._add(movement.shift_id, {
+            cls.MOVEMENT_FIELDS[movement.movement_type]: movement.amount
+        })
+    
+    @classmethod
+    def record_credit_payment(cls, payment):
+        """Acumular un pago de crédito recibido en el turno"""
+        if not payment.shift_id:
+            return
+        
+        cls._add(payment.shift_id, {
+            'credit_payments': payment.amount,
+            'credit_payments_cash': payment.amount if payment.payment_method == 'cash' else 0,
+        })
+    
+    # ===== Verificación =====
+    
+    @classmethod
+    def compute(cls, shift):
+        """Recalcular los totales del turno desde ventas, movimientos y pagos"""
+        from django.db.models import Sum, Count, Q
+        from api.models import SalePayment, CreditPayment
+        
+        values = dict.fromkeys(cls.COUNTER_FIELDS, Decimal('0'))
+        
+        sales = shift.sales.filter(status='completed').aggregate(
+            count=Count('id'),
+            amount=Sum('total')
+        )
+        values['sales_count'] = sales['count']
+        values['sales_amount'] = sales['amount'] or Decimal('0')
+        
+        payments = SalePayment.objects.filter(
+            sale__shift=shift,
+            sale__status='completed'
+        ).aggregate(**{
+            field: Sum('amount', filter=Q(payment_method=method))
+            for method, field in cls.SALE_PAYMENT_FIELDS.items()
+        })
+        
+        movements = shift.cash_movements.aggregate(**{
+            field: Sum('amount', filter=Q(movement_type=movement_type))
+            for movement_type, field in cls.MOVEMENT_FIELDS.items()
+        })
+        
+        credit_payments = CreditPayment.objects.filter(shift=shift).aggregate(
+            credit_payments=Sum('amount'),
+            credit_payments_cash=Sum('amount', filter=Q(payment_method='cash'))
+        )
+        
+        for aggregated in (payments, movements, credit_payments):
+            for field, value in aggregated.items():
+                values[field] = value or Decimal('0')
+        
+        return values
+
+
 class CashMovement(models.Model):
     """Modelo para registrar movimientos de efectivo (retiros, ingresos)"""
     
@@ -80,10 +80,15 @@ class StockAudit(models.Model):
     description = models.TextField()
     affected_products_count = models.IntegerField(default=0)
     
-    # Datos antes/después (guardado como JSON)
+    # Resumen antes/después (guardado como JSON)
+    # El detalle por producto va en StockAuditLine
     before_data = models.JSONField(null=True, blank=True, help_text='Estado antes del cambio')
     after_data = models.JSONField(null=True, blank=True, help_text='Estado después del cambio')
     
+    # Detalle comprimido de auditorías antiguas (CSV gzip, reemplaza a StockAuditLine)
+    lines_archive = models.BinaryField(null=True, blank=True)
+    archived_at = models.DateTimeField(null=True, blank=True)
+    
     # Usuario responsable
     performed_by = models.ForeignKey('User', on_delete=models.PROTECT, related_name='stock_audits')
     performed_at = models.DateTimeField(auto_now_add=True, db_index=True)
@@ -111,6 +116,22 @@ class StockAudit(models.Model):
         return f"{self.get_action_type_display()} - {self.performed_at.strftime('%Y-%m-%d %H:%M')}"
 
 
+class StockAuditLine(models.Model):
+    """Cambio de stock de un producto dentro de una auditoría"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    audit = models.ForeignKey(StockAudit, on_delete=models.CASCADE, related_name='lines')
+    product = models.ForeignKey('Product', on_delete=models.PROTECT, related_name='stock_audit_lines')
+    
+    old_stock = models.DecimalField(max_digits=10, decimal_places=0)
+    new_stock = models.DecimalField(max_digits=10, decimal_places=0)
+    
+    class Meta:
+        db_table = 'stock_audit_lines'
+    
+    def __str__(self):
+        return f"{self.product_id}: {self.old_stock} -> {self.new_stock}"
+
+
 class LastPrintedTicket(models.Model):
     """
     Modelo para rastrear el último ticket impreso por usuario
@@ -18,6 +18,10 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'slug', 'created_at', 'updated_at']
     
     def get_product_count(self, obj):
+        # Las vistas de listado anotan el conteo (CategoryTree.active_products)
+        active_products = getattr(obj, 'active_products', None)
+        if active_products is not None:
+            return active_products
         return obj.products.filter(is_active=True).count()
     
     def validate_name(self, value):
@@ -60,6 +64,10 @@ class CategoryDetailSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'slug', 'created_at']
     
     def get_product_count(self, obj):
+        # Las vistas de listado anotan el conteo (CategoryTree.active_products)
+        active_products = getattr(obj, 'active_products', None)
+        if active_products is not None:
+            return active_products
         return obj.products.filter(is_active=True).count()
     
     def get_products(self, obj):
@@ -2,6 +2,7 @@
 
 from rest_framework import serializers
 from api.models import Client
+from api.models.client import ClientTotals
 from api.utils.validators import RutValidator, PhoneValidator, EmailValidator
 from decimal import Decimal
 
@@ -108,23 +109,59 @@ class ClientSerializer(serializers.ModelSerializer):
         return data
 
 
-class ClientDetailSerializer(ClientSerializer):
-    """Serializer con información detallada de créditos"""
-    active_credits = serializers.SerializerMethodField()
+class ClientStatsSerializer(ClientSerializer):
+    """Serializer con el resumen de compras (clients con select_related('totals'))"""
     total_purchases = serializers.SerializerMethodField()
+    total_spent = serializers.SerializerMethodField()
     last_purchase = serializers.SerializerMethodField()
+    open_credits_count = serializers.SerializerMethodField()
     
     class Meta(ClientSerializer.Meta):
         fields = ClientSerializer.Meta.fields + [
-            'active_credits', 'total_purchases', 'last_purchase'
+            'total_purchases', 'total_spent', 'last_purchase', 'open_credits_count'
         ]
     
+    def get_total_purchases(self, obj):
+        """Total de compras del cliente"""
+        return ClientTotals.of(obj).purchases_count
+    
+    def get_total_spent(self, obj):
+        """Monto total comprado"""
+        return float(ClientTotals.of(obj).purchases_amount)
+    
+    def get_last_purchase(self, obj):
+        """Última compra"""
+        totals = ClientTotals.of(obj)
+        
+        if totals.last_purchase_at:
+            return {
+                'date': totals.last_purchase_at.isoformat(),
+                'total': float(totals.last_purchase_total)
+            }
+        return None
+    
+    def get_open_credits_count(self, obj):
+        """Créditos con saldo pendiente"""
+        return ClientTotals.of(obj).open_credits_count
+
+
+class ClientDetailSerializer(ClientStatsSerializer):
+    """Serializer con información detallada de créditos"""
+    active_credits = serializers.SerializerMethodField()
+    
+    class Meta(ClientStatsSerializer.Meta):
+        fields = ClientStatsSerializer.Meta.fields + ['active_credits']
+    
     def get_active_credits(self, obj):
         """Obtener créditos activos"""
         from api.models import Credit
+        
+        if not ClientTotals.of(obj).open_credits_count:
+            return []
+        
         credits = Credit.objects.filter(
             client=obj,
-            status__in=['pending', 'partial']
+            status__in=ClientTotals.OPEN_CREDIT_STATUSES
         ).order_by('-created_at')[:5]
         
         return [{
@@ -136,26 +173,6 @@ class ClientDetailSerializer(ClientSerializer):
             'status': credit.status,
             'created_at': credit.created_at.isoformat()
         } for credit in credits]
-    
-    def get_total_purchases(self, obj):
-        """Total de compras del cliente"""
-        from api.models import Sale
-        return Sale.objects.filter(client=obj, status='completed').count()
-    
-    def get_last_purchase(self, obj):
-        """Última compra"""
-        from api.models import Sale
-        last_sale = Sale.objects.filter(
-            client=obj, 
-            status='completed'
-        ).order_by('-created_at').first()
-        
-        if last_sale:
-            return {
-                'date': last_sale.created_at.isoformat(),
-                'total': float(last_sale.total_amount)
-            }
-        return None
 
 
 class ClientCreateSerializer(serializers.ModelSerializer):
@@ -12,6 +12,10 @@ class DepartmentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'company', 'slug', 'created_at', 'updated_at']
     
     def get_product_count(self, obj):
+        # Las vistas de listado anotan el conteo (CategoryTree.active_products)
+        active_products = getattr(obj, 'active_products', None)
+        if active_products is not None:
+            return active_products
         return obj.products.filter(is_active=True).count()
     
     def validate_name(self, value):
@@ -46,6 +50,10 @@ class DepartmentDetailSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
     
     def get_product_count(self, obj):
+        # Las vistas de listado anotan el conteo (CategoryTree.active_products)
+        active_products = getattr(obj, 'active_products', None)
+        if active_products is not None:
+            return active_products
         return obj.products.filter(is_active=True).count()
     
     def get_products(self, obj):
@@ -0,0 +1,24 @@
+# api/serializers/job_serializers.py
+
+from rest_framework import serializers
+from api.models.configuration import BackgroundJob
+
+
+class BackgroundJobSerializer(serializers.ModelSerializer):
+    job_type_display = serializers.CharField(source='get_job_type_display', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    created_by_name = serializers.CharField(source='created_by.username', read_only=True)
+    has_file = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = BackgroundJob
+        fields = [
+            'id', 'job_type', 'job_type_display', 'status', 'status_display',
+            'progress', 'progress_message', 'result', 'has_file', 'error',
+            'attempts', 'created_by', 'created_by_name',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+    
+    def get_has_file(self, obj):
+        return bool(obj.result_file)
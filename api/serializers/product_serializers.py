@@ -37,6 +37,53 @@ class ProductListSerializer(serializers.ModelSerializer):
         return MoneyHelper.format_currency(obj.unit_price)
 
 
+class ProductListRows:
+    """
+    Misma salida que ProductListSerializer leída con values()
+
+    Para listados completos del catálogo: una consulta con los nombres de
+    departamento y categoría, sin instancias del modelo ni campos de DRF.
+    Cada fila se arma con funciones de formato resueltas una sola vez.
+    """
+
+    VALUES = [
+        'id', 'barcode', 'name', 'department__name', 'category__name',
+        'stock_units', 'min_stock', 'unit_price', 'is_active',
+        'is_package', 'units_per_package',
+    ]
+
+    @staticmethod
+    def _decimal(value):
+        # Igual que DecimalField(decimal_places=0) de DRF
+        return None if value is None else '{:f}'.format(value.quantize(Decimal('1')))
+
+    @staticmethod
+    def serialize(queryset):
+        """Lista de productos serializados (queryset de Product)"""
+        from api.utils.helpers import MoneyHelper
+
+        decimal = ProductListRows._decimal
+        stock_display = StockCalculator.stock_display
+        price_display = MoneyHelper.format_currency
+
+        return [
+            {
+                'id': str(row['id']),
+                'barcode': row['barcode'],
+                'name': row['name'],
+                'department_name': row['department__name'],
+                'category_name': row['category__name'],
+                'stock_units': decimal(row['stock_units']),
+                'stock_display': stock_display(row['stock_units'], row['is_package'], row['units_per_package']),
+                'min_stock': decimal(row['min_stock']),
+                'unit_price': decimal(row['unit_price']),
+                'price_display': price_display(row['unit_price']),
+                'is_active': row['is_active'],
+            }
+            for row in queryset.values(*ProductListRows.VALUES)
+        ]
+
+
 class ProductSerializer(serializers.ModelSerializer):
     department_name = serializers.SerializerMethodField()
     suppliers = serializers.SerializerMethodField()
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from api.models import Shift, CashMovement, CashCount
+from api.models.shift import ShiftTotals
 from django.db.models import Sum, Q, Count
 
 class CashMovementSerializer(serializers.ModelSerializer):
@@ -89,12 +90,10 @@ class ShiftSerializer(serializers.ModelSerializer):
         ]
     
     def get_sales_count(self, obj):
-        return obj.sales.filter(status='completed').count()
+        return ShiftTotals.for_shift(obj).sales_count
     
     def get_total_sales(self, obj):
-        return obj.sales.filter(status='completed').aggregate(
-            total=Sum('total')
-        )['total'] or 0
+        return ShiftTotals.for_shift(obj).sales_amount
     
     def validate_opening_cash(self, value):
         if value < 0:
@@ -152,12 +151,10 @@ class ShiftListSerializer(serializers.ModelSerializer):
         ]
     
     def get_sales_count(self, obj):
-        return obj.sales.filter(status='completed').count()
+        return ShiftTotals.for_shift(obj).sales_count
     
     def get_total_sales(self, obj):
-        return obj.sales.filter(status='completed').aggregate(
-            total=Sum('total')
-        )['total'] or 0
+        return ShiftTotals.for_shift(obj).sales_amount
 
 
 class OpenShiftSerializer(serializers.Serializer):
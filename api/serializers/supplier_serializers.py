@@ -2,6 +2,7 @@
 
 from rest_framework import serializers
 from api.models import Supplier, PurchaseOrder, PurchaseOrderItem, SupplierPayment, Product, Department
+from api.utils.supplier_aggregates import SupplierAggregates
 from decimal import Decimal
 from django.db import transaction
 
@@ -26,17 +27,15 @@ class SupplierSerializer(serializers.ModelSerializer):
     
     def get_total_purchases(self, obj):
         """Total de compras realizadas"""
-        return obj.purchase_orders.filter(status__in=['completed', 'paid']).count()
+        return SupplierAggregates.of(obj)['purchases_count']
     
     def get_pending_orders(self, obj):
         """Órdenes de compra pendientes"""
-        return obj.purchase_orders.filter(status='pending').count()
+        return SupplierAggregates.of(obj)['pending_count']
     
     def get_total_debt(self, obj):
         """Deuda total con el proveedor"""
-        orders = obj.purchase_orders.filter(status__in=['pending', 'partial', 'paid'])
-        total_debt = sum(order.total_amount - order.paid_amount for order in orders)
-        return float(total_debt)
+        return float(SupplierAggregates.of(obj)['debt_amount'])
     
     def validate_name(self, value):
         """Validar nombre único por empresa"""
@@ -243,11 +242,10 @@ class SupplierListSerializer(serializers.ModelSerializer):
         ]
     
     def get_pending_orders_count(self, obj):
-        return obj.purchase_orders.filter(status='pending').count()
+        return SupplierAggregates.of(obj)['pending_count']
     
     def get_total_debt(self, obj):
-        orders = obj.purchase_orders.filter(status__in=['pending', 'partial', 'paid'])
-        return float(sum(order.total_amount - order.paid_amount for order in orders))
+        return float(SupplierAggregates.of(obj)['debt_amount'])
 
 
 class PurchaseOrderListSerializer(serializers.ModelSerializer):
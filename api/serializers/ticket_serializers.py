@@ -123,14 +123,14 @@ class StockAuditSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'company', 'action_type', 'action_type_display',
             'description', 'affected_products_count',
-            'before_data', 'after_data',
+            'before_data', 'after_data', 'archived_at',
             'performed_by', 'performed_by_name', 'performed_at',
             'ip_address', 'user_agent',
             'requires_approval', 'approved', 'approved_by', 'approved_by_name', 'approved_at'
         ]
         read_only_fields = [
             'id', 'company', 'performed_by', 'performed_at',
-            'approved', 'approved_by', 'approved_at'
+            'approved', 'approved_by', 'approved_at', 'archived_at'
         ]
 
 
@@ -161,15 +161,25 @@ class BulkStockUpdateSerializer(serializers.Serializer):
     """Serializer para actualización masiva de stock"""
     updates = serializers.ListField(
         child=serializers.DictField(),
+        required=False,
         help_text='Lista de productos con sus nuevos stocks'
     )
+    file = serializers.FileField(
+        required=False,
+        help_text='Archivo CSV o JSON lines (product_id o barcode, new_stock)'
+    )
     reason = serializers.CharField(max_length=500)
     
+    def validate(self, data):
+        if not data.get('updates') and not data.get('file'):
+            raise serializers.ValidationError('Debe enviar updates o un archivo')
+        return data
+    
     def validate_updates(self, value):
         """Validar formato de actualizaciones"""
         for update in value:
-            if 'product_id' not in update:
-                raise serializers.ValidationError('Cada actualización debe incluir product_id')
+            if 'product_id' not in update and 'barcode' not in update:
+                raise serializers.ValidationError('Cada actualización debe incluir product_id o barcode')
             
             if 'new_stock' not in update:
                 raise serializers.ValidationError('Cada actualización debe incluir new_stock')
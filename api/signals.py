@@ -0,0 +1,151 @@
+# api/signals.py
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from api.models import (
+    Company, Role, User,
+    Permission, RolePermission, UserPermission,
+    Page, RolePageAccess, UserPageAccess,
+    Product, Department, Category, Supplier, ProductSupplier, Promotion
+)
+from api.utils.barcode_index import BarcodeIndex
+from api.utils.catalog_sync import CatalogSync
+from api.utils.category_tree import CategoryTree
+from api.utils.inventory_valuation import InventoryValuation
+from api.utils.promotion_engine import PromotionEngine
+from api.utils.permission_cache import PermissionCache, PageAccessCache
+from api.utils.user_cache import UserCache
+
+
+# ===== USUARIOS AUTENTICADOS =====
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Usuario actualizado, desactivado o eliminado"""
+    UserCache.invalidate_user(instance.id)
+
+
+@receiver([post_save, post_delete], sender=Role)
+@receiver([post_save, post_delete], sender=Company)
+def invalidate_cached_users(sender, instance, **kwargs):
+    """Rol o empresa modificados (van cacheados junto al usuario)"""
+    UserCache.invalidate_all()
+
+
+# ===== PERMISOS =====
+
+@receiver([post_save, post_delete], sender=UserPermission)
+def invalidate_user_permissions(sender, instance, **kwargs):
+    """Restricción de usuario creada, modificada o eliminada"""
+    PermissionCache.invalidate_user(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=RolePermission)
+def invalidate_role_permissions(sender, instance, **kwargs):
+    """Permiso base de un rol creado, modificado o eliminado"""
+    PermissionCache.invalidate_role(instance.role_id)
+
+
+@receiver([post_save, post_delete], sender=Permission)
+def invalidate_permission_catalog(sender, instance, **kwargs):
+    """Cambio en el catálogo de permisos (resource/action)"""
+    PermissionCache.invalidate_all()
+
+
+# ===== ACCESO A PÁGINAS =====
+
+@receiver([post_save, post_delete], sender=UserPageAccess)
+def invalidate_user_page_access(sender, instance, **kwargs):
+    """Restricción de página de usuario creada, modificada o eliminada"""
+    PageAccessCache.invalidate_user(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=RolePageAccess)
+def invalidate_role_page_access(sender, instance, **kwargs):
+    """Acceso de un rol a una página creado, modificado o eliminado"""
+    PageAccessCache.invalidate_role(instance.role_id)
+
+
+@receiver([post_save, post_delete], sender=Page)
+def invalidate_page_index(sender, instance, **kwargs):
+    """Página creada, modificada o eliminada (índice de rutas)"""
+    PageAccessCache.invalidate_all()
+
+
+# ===== CÓDIGOS DE BARRAS =====
+
+@receiver(post_save, sender=Product)
+def sync_product_barcodes(sender, instance, update_fields=None, **kwargs):
+    """Producto creado o modificado (índice de códigos y cache de escaneo)"""
+    if update_fields is not None and not Product.touches_catalog(update_fields):
+        # Solo stock: el escaneo lo lee del producto, no del cache
+        return
+    BarcodeIndex.sync_products([instance])
+    BarcodeIndex.invalidate_company(instance.company_id)
+
+
+@receiver(post_delete, sender=Product)
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=Supplier)
+def invalidate_scanned_products(sender, instance, **kwargs):
+    """Producto eliminado, o departamento / proveedor modificados (van en el producto cacheado)"""
+    BarcodeIndex.invalidate_company(instance.company_id)
+
+
+@receiver([post_save, post_delete], sender=ProductSupplier)
+def invalidate_scanned_product_suppliers(sender, instance, **kwargs):
+    """Relación producto-proveedor creada, modificada o eliminada"""
+    BarcodeIndex.invalidate_company(instance.product.company_id)
+
+
+# ===== ÁRBOL DE NAVEGACIÓN =====
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_tree(sender, instance, update_fields=None, **kwargs):
+    """Producto, departamento o categoría creados, modificados o eliminados (conteos del árbol)"""
+    if sender is Product and update_fields is not None and not Product.touches_catalog(update_fields):
+        # Solo stock: los conteos del árbol no dependen del stock
+        return
+    CategoryTree.invalidate_company(instance.company_id)
+
+
+# ===== VALORIZACIÓN DE INVENTARIO =====
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Department)
+def invalidate_inventory_valuation(sender, instance, **kwargs):
+    """Producto (incluido su stock) o departamento creados, modificados o eliminados"""
+    InventoryValuation.invalidate_company(instance.company_id)
+
+
+# ===== CATÁLOGO OFFLINE =====
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Promotion)
+def invalidate_catalog_snapshot(sender, instance, update_fields=None, **kwargs):
+    """Producto o promoción creados, modificados o eliminados (catálogo de las cajas)"""
+    if sender is Product and update_fields is not None and not Product.touches_catalog(update_fields):
+        # Solo stock: no es parte del catálogo
+        return
+    CatalogSync.invalidate_company(instance.company_id)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Promotion)
+def record_catalog_deletion(sender, instance, origin=None, **kwargs):
+    """Producto o promoción eliminados (las cajas los quitan en el próximo delta)"""
+    if isinstance(origin, Company):
+        # La empresa completa se está eliminando
+        return
+    entity = 'product' if sender is Product else 'promotion'
+    CatalogSync.record_deletion(entity, instance.company_id, instance.id)
+
+
+# ===== PROMOCIONES =====
+
+@receiver([post_save, post_delete], sender=Promotion)
+def invalidate_promotion_index(sender, instance, **kwargs):
+    """Promoción creada, modificada o eliminada (las vistas guardan la promoción al cambiar sus productos)"""
+    PromotionEngine.invalidate_company(instance.company_id)
@@ -1,3 +1,991 @@
-from django.test import TestCase
+from django.db import connection, transaction, IntegrityError
+from django.http import Http404
+from django.test import TestCase, TransactionTestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from api.models import Company, Role, User, Product, Sale, SaleItem, Shift, Client, Permission, RolePermission, Supplier, PurchaseOrder, Page, RolePageAccess, UserPageAccess, Department, Category, Promotion, PromotionProduct, SystemAlert
+from api.models.client import ClientTotals
+from api.models.company import DocumentSequence
+from api.models.sale import SalesRollupDay
+from api.models.ticket import StockAuditLine
+from api.models.configuration import BackgroundJob
+from api.authentication.jwt_auth import JWTAuthHandler
+from api.middleware.auth_middleware import JWTAuthenticationMiddleware
+from api.middleware.permission_middleware import PermissionMiddleware
+from api.utils.barcode_index import BarcodeIndex
+from api.utils.background_jobs import JobHeartbeat, JobQueue
+from api.utils.catalog_sync import CatalogSync
+from api.utils.category_tree import CategoryTree
+from api.utils.checkout import CheckoutEngine
+from api.utils.pagination import Paginator
+from api.utils.permission_cache import PermissionCache
+from api.utils.product_import import ProductImporter
+from api.utils.promotion_engine import PromotionEngine
+from api.utils.user_cache import UserCache
+from api.utils.excel_handler import ExcelExporter
+from api.utils.inventory_valuation import InventoryValuation
+from api.utils.report_utils import IVACalculator
+from api.utils.sales_rollup import SalesRollup
+from api.utils.sequences import SequenceAllocator
+from api.utils.stock_alerts import LowStockAlerts
+from api.utils.stock_audit import StockAuditLog
+from api.utils.stock_updates import StockUpdater
+from datetime import timedelta
+from decimal import Decimal
+from openpyxl import load_workbook
+import io
+import time
+from unittest import mock
 
-# Create your tests here.
+
+def create_company_user(email='cajero@test.cl', rut='11.111.111-1'):
+    """Empresa, rol de cajero y usuario para las pruebas"""
+    company = Company.objects.create(
+        name='Empresa Test',
+        rut='76.000.000-0',
+        address='Calle 1',
+        phone='123',
+        email='empresa@test.cl'
+    )
+    role = Role.objects.create(
+        company=company,
+        name='cashier',
+        display_name='Cajero',
+        hierarchy_level=2
+    )
+    user = User.objects.create_user(
+        email,
+        'clave-segura-123',
+        company=company,
+        role=role,
+        username='cajero',
+        first_name='Caja',
+        last_name='Test',
+        rut=rut
+    )
+    return company, role, user
+
+
+class AuthMiddlewarePublicPathsTest(TestCase):
+    """Rutas públicas y privadas del JWTAuthenticationMiddleware"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = JWTAuthenticationMiddleware(lambda request: None)
+
+    def process(self, path, token=None):
+        request = self.factory.get(path)
+        if token:
+            request.COOKIES['access_token'] = token
+        return request, self.middleware.process_request(request)
+
+    def test_root_is_public(self):
+        _, response = self.process('/')
+        self.assertIsNone(response)
+
+    def test_static_is_public(self):
+        _, response = self.process('/static/css/styles.css')
+        self.assertIsNone(response)
+
+    def test_login_and_logout_are_public(self):
+        for path in ['/api/auth/login/', '/api/auth/logout/']:
+            _, response = self.process(path)
+            self.assertIsNone(response, path)
+
+    def test_private_page_without_token_redirects_to_login(self):
+        _, response = self.process('/panel-de-control/')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], '/')
+
+    def test_private_api_without_token_returns_401(self):
+        _, response = self.process('/api/products/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_private_page_with_invalid_token_clears_cookies(self):
+        _, response = self.process('/panel-de-control/', token='no-es-un-token')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.cookies['access_token'].value, '')
+
+    def test_private_page_with_token_sets_user(self):
+        _, _, user = create_company_user()
+        tokens = JWTAuthHandler.generate_tokens(user)
+
+        request, response = self.process('/panel-de-control/', token=tokens['access'])
+
+        self.assertIsNone(response)
+        self.assertEqual(request.user.id, user.id)
+
+
+class PermissionMiddlewarePageAccessTest(TestCase):
+    """Verificación de acceso a páginas del PermissionMiddleware"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = PermissionMiddleware(lambda request: None)
+        self.company, self.role, self.user = create_company_user()
+
+        # Las versiones del cache se incrementan al confirmar la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            sales = Page.objects.create(name='ventas', display_name='Ventas', route='/ventas/')
+            Page.objects.create(name='usuarios', display_name='Usuarios', route='/usuarios/')
+            RolePageAccess.objects.create(role=self.role, page=sales)
+        self.sales = sales
+
+    def process(self, path):
+        request = self.factory.get(path)
+        request.user = User.objects.get(id=self.user.id)
+        return self.middleware.process_request(request)
+
+    def test_root_is_public(self):
+        self.assertIsNone(self.process('/'))
+
+    def test_public_prefixes_skip_the_check(self):
+        for path in ['/static/js/app.js', '/login/', '/api/auth/me/']:
+            self.assertIsNone(self.process(path), path)
+
+    def test_page_allowed_by_role(self):
+        self.assertIsNone(self.process('/ventas/'))
+
+    def test_page_without_role_access_is_denied(self):
+        with self.assertRaises(Http404):
+            self.process('/usuarios/')
+
+    def test_user_restriction_overrides_role_access(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            UserPageAccess.objects.create(user=self.user, page=self.sales, can_access=False)
+
+        with self.assertRaises(Http404):
+            self.process('/ventas/')
+
+    def test_unregistered_page_is_left_to_django(self):
+        self.assertIsNone(self.process('/no-registrada/'))
+
+    def test_master_admin_skips_the_check(self):
+        self.role.name = 'master_admin'
+        self.role.save()
+
+        self.assertIsNone(self.process('/usuarios/'))
+
+
+class CheckoutStockTest(TestCase):
+    """Descuento de stock de la venta (UPDATE condicional)"""
+
+    def setUp(self):
+        self.company, self.role, self.user = create_company_user()
+        self.first = Product.objects.create(company=self.company, barcode='780001', name='Bebida', unit_price=1000, stock_units=10)
+        self.second = Product.objects.create(company=self.company, barcode='780002', name='Galletas', unit_price=500, stock_units=1)
+
+    def stock(self, product):
+        return Product.objects.values_list('stock_units', flat=True).get(id=product.id)
+
+    def test_decrement_stock_updates_every_product(self):
+        self.assertTrue(CheckoutEngine.decrement_stock({
+            str(self.first.id): Decimal('3'),
+            str(self.second.id): Decimal('1'),
+        }))
+
+        self.assertEqual(self.stock(self.first), 7)
+        self.assertEqual(self.stock(self.second), 0)
+
+    def test_decrement_stock_returns_false_when_stock_is_insufficient(self):
+        with transaction.atomic():
+            ok = CheckoutEngine.decrement_stock({
+                str(self.first.id): Decimal('3'),
+                str(self.second.id): Decimal('2'),
+            })
+            # Lo que hace create_sale cuando falla el descuento
+            transaction.set_rollback(True)
+
+        self.assertFalse(ok)
+        self.assertEqual(self.stock(self.first), 10)
+        self.assertEqual(self.stock(self.second), 1)
+
+    def post_sale(self, items, amount):
+        permission = Permission.objects.create(name='sales.create', display_name='Crear ventas', resource='sales', action='create')
+        RolePermission.objects.create(role=self.role, permission=permission)
+        Shift.objects.create(company=self.company, user=self.user, shift_number='TUR-000001', opening_cash=0)
+
+        client = APIClient()
+        client.cookies['access_token'] = JWTAuthHandler.generate_tokens(self.user)['access']
+
+        return client.post('/api/sales/create/', {
+            'items': [{'product_id': str(product.id), 'quantity': quantity} for product, quantity in items],
+            'payments': [{'payment_method': 'cash', 'amount': amount}],
+        }, format='json')
+
+    def test_sale_decrements_stock(self):
+        response = self.post_sale([(self.first, 2), (self.second, 1)], 2975)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.stock(self.first), 8)
+        self.assertEqual(self.stock(self.second), 0)
+
+    def test_sale_with_insufficient_stock_is_rolled_back(self):
+        response = self.post_sale([(self.first, 2), (self.second, 2)], 3570)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Stock insuficiente', response.data['error'])
+        self.assertFalse(Sale.objects.filter(company=self.company).exists())
+        self.assertEqual(self.stock(self.first), 10)
+        self.assertEqual(self.stock(self.second), 1)
+
+    def test_apply_promotions_recomputes_item_total(self):
+        now = timezone.now()
+        promotion = Promotion.objects.create(
+            company=self.company, name='10% x 3', promotion_type='quantity_discount',
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+            min_quantity=3, discount_percentage=10
+        )
+        PromotionProduct.objects.create(promotion=promotion, product=self.first)
+        sale = Sale.objects.create(company=self.company, sale_number='VTA-00000001', total=3000, created_by=self.user)
+        # SaleItem.save() usa campos que el producto no tiene: crear sin save()
+        SaleItem.objects.bulk_create([SaleItem(
+            sale=sale, product=self.first, quantity=3, unit_price=1000, subtotal=3000, total=3000
+        )])
+
+        sale.apply_promotions()
+
+        item = sale.items.get()
+        self.assertEqual(item.promotion_id, promotion.id)
+        self.assertEqual(item.discount_amount, Decimal('300'))
+        self.assertEqual(item.total, item.quantity * item.unit_price - item.discount_amount)
+
+
+class SequenceAllocatorTest(TestCase):
+    """Correlativos de documentos reservados por bloques"""
+
+    def setUp(self):
+        self.company, _, _ = create_company_user()
+        SequenceAllocator._blocks.clear()
+
+    def next_value(self):
+        # El resto del bloque se instala al confirmar la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            return SequenceAllocator.next_value(self.company, 'sale')
+
+    def test_numbers_are_unique_and_ordered_across_blocks(self):
+        block = SequenceAllocator.BLOCK_SIZES['sale']
+
+        values = [self.next_value() for _ in range(block + 5)]
+
+        self.assertEqual(values, list(range(1, block + 6)))
+        sequence = DocumentSequence.objects.get(company=self.company, document_type='sale')
+        self.assertEqual(sequence.last_value, block * 2)
+
+    def test_rolled_back_reservation_is_not_used(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.assertEqual(SequenceAllocator.next_value(self.company, 'sale'), 1)
+                transaction.set_rollback(True)
+
+        self.assertEqual(self.next_value(), 1)
+        self.assertEqual(self.next_value(), 2)
+
+    def test_sequence_continues_after_existing_documents(self):
+        Sale.objects.create(company=self.company, sale_number='VTA-00000041', total=0)
+
+        self.assertEqual(SequenceAllocator.next_number(self.company, 'sale'), 'VTA-00000042')
+
+    def test_prefetched_block_is_used_without_queries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            SequenceAllocator.prefetch(self.company, 'sale', register='caja-1')
+
+        with self.assertNumQueries(0):
+            values = [SequenceAllocator.next_value(self.company, 'sale', 'caja-1') for _ in range(3)]
+
+        self.assertEqual(values, [1, 2, 3])
+
+    def test_each_register_takes_its_own_block(self):
+        block = SequenceAllocator.BLOCK_SIZES['sale']
+        with self.captureOnCommitCallbacks(execute=True):
+            SequenceAllocator.prefetch(self.company, 'sale', register='caja-1')
+            SequenceAllocator.prefetch(self.company, 'sale', register='caja-2')
+
+        self.assertEqual(SequenceAllocator.next_value(self.company, 'sale', 'caja-1'), 1)
+        self.assertEqual(SequenceAllocator.next_value(self.company, 'sale', 'caja-2'), block + 1)
+        self.assertEqual(SequenceAllocator.next_value(self.company, 'sale', 'caja-1'), 2)
+
+
+class ClientTotalsTest(TestCase):
+    """Resumen de compras del cliente"""
+
+    def setUp(self):
+        self.company, _, _ = create_company_user()
+        self.client_obj = Client.objects.create(company=self.company, rut='12.345.678-5', first_name='Ana', last_name='Pérez')
+
+    def sale(self, number, total, created_at):
+        sale = Sale.objects.create(
+            company=self.company,
+            client=self.client_obj,
+            sale_number=number,
+            total=total,
+            status='completed'
+        )
+        Sale.objects.filter(id=sale.id).update(created_at=created_at)
+        sale.refresh_from_db()
+        ClientTotals.record_sale(sale)
+        return sale
+
+    def test_cancellation_restores_previous_last_purchase(self):
+        now = timezone.now()
+        first = self.sale('VTA-00000001', Decimal('1000'), now - timedelta(days=1))
+        last = self.sale('VTA-00000002', Decimal('2500'), now)
+
+        ClientTotals.record_cancellation(last)
+        Sale.objects.filter(id=last.id).update(status='cancelled')
+
+        totals = ClientTotals.objects.get(client=self.client_obj)
+        self.assertEqual(totals.purchases_count, 1)
+        self.assertEqual(totals.purchases_amount, Decimal('1000'))
+        self.assertEqual(totals.last_sale_id, first.id)
+        self.assertEqual(totals.last_purchase_total, Decimal('1000'))
+
+        # Coincide con el recálculo desde las ventas
+        for field, value in ClientTotals.compute(self.client_obj).items():
+            self.assertEqual(getattr(totals, field), value, field)
+
+
+class PurchaseOrderExportTest(TestCase):
+    """Hoja de exportación de órdenes de compra"""
+
+    def test_sheet_reads_purchase_order_fields(self):
+        company, _, user = create_company_user()
+        supplier = Supplier.objects.create(company=company, rut='77.777.777-7', name='Distribuidora Sur')
+        PurchaseOrder.objects.create(
+            company=company,
+            supplier=supplier,
+            order_number='OC-0001',
+            total_amount=Decimal('15000'),
+            paid_amount=Decimal('5000'),
+            status='partial',
+            created_by=user,
+            notes='Entrega parcial'
+        )
+        orders = PurchaseOrder.objects.filter(company=company).select_related('supplier', 'created_by')
+
+        title, headers, rows, _ = ExcelExporter.purchase_orders_sheet(orders)
+        book = io.BytesIO()
+        ExcelExporter.write_streaming(book, title, headers, rows)
+        book.seek(0)
+
+        values = list(load_workbook(book).active.iter_rows(values_only=True))
+        self.assertEqual(len(values), 2)
+        row = dict(zip(values[0], values[1]))
+        self.assertEqual(row['Número Orden'], 'OC-0001')
+        self.assertEqual(row['Proveedor'], 'Distribuidora Sur')
+        self.assertEqual(row['Total'], 15000)
+        self.assertEqual(row['Pendiente'], 10000)
+        self.assertEqual(row['Estado'], 'Pago Parcial')
+        self.assertEqual(row['Notas'], 'Entrega parcial')
+
+
+class JobHeartbeatTest(TransactionTestCase):
+    """Heartbeat de tareas en segundo plano desde el hilo del worker"""
+
+    def setUp(self):
+        self.interval = JobHeartbeat.INTERVAL
+        JobHeartbeat.INTERVAL = 0.05
+        company, _, user = create_company_user()
+        self.job = BackgroundJob.objects.create(
+            company=company,
+            created_by=user,
+            job_type='product_export',
+            status='running',
+            worker='worker-1',
+            heartbeat_at=timezone.now() - timedelta(hours=1)
+        )
+
+    def tearDown(self):
+        JobHeartbeat.INTERVAL = self.interval
+
+    def test_heartbeat_advances_without_progress_calls(self):
+        stale = self.job.heartbeat_at
+
+        with JobHeartbeat(self.job):
+            time.sleep(0.3)
+
+        self.job.refresh_from_db()
+        self.assertGreater(self.job.heartbeat_at, stale + timedelta(minutes=59))
+
+    def test_heartbeat_stops_when_job_is_taken_by_another_worker(self):
+        BackgroundJob.objects.filter(id=self.job.id).update(worker='worker-2')
+        stale = self.job.heartbeat_at
+
+        with JobHeartbeat(self.job):
+            time.sleep(0.2)
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.heartbeat_at, stale)
+
+
+class ReportJobTest(TestCase):
+    """Reportes pesados ejecutados en la cola de tareas (async=true)"""
+
+    def setUp(self):
+        company, role, self.user = create_company_user()
+        permission = Permission.objects.create(name='reports.view', display_name='Ver reportes', resource='reports', action='view')
+        RolePermission.objects.create(role=role, permission=permission)
+        Product.objects.create(company=company, barcode='780001', name='Bebida', unit_price=1000, stock_units=4)
+
+        self.client = APIClient()
+        self.client.cookies['access_token'] = JWTAuthHandler.generate_tokens(self.user)['access']
+
+    def test_async_report_matches_sync_response(self):
+        response = self.client.get('/api/reports/inventory/', {'async': 'true'})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['job_type'], 'report')
+
+        self.assertTrue(JobQueue.run_next('worker-1'))
+
+        job = BackgroundJob.objects.get(id=response.data['id'])
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.params['query'], {'async': 'true'})
+        self.assertEqual(job.result, self.client.get('/api/reports/inventory/').json())
+
+
+class InventoryReportTest(TestCase):
+    """Valorización de inventario cacheada y formato anterior del reporte"""
+
+    def setUp(self):
+        self.company, role, self.user = create_company_user()
+        permission = Permission.objects.create(name='reports.view', display_name='Ver reportes', resource='reports', action='view')
+        RolePermission.objects.create(role=role, permission=permission)
+        department = Department.objects.create(company=self.company, name='Bebidas', slug='bebidas')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(
+                company=self.company, department=department, barcode='780001', name='Bebida',
+                unit_price=1000, cost_price=600, stock_units=4
+            )
+
+        self.client = APIClient()
+        self.client.cookies['access_token'] = JWTAuthHandler.generate_tokens(self.user)['access']
+
+    def test_snapshot_is_reused_until_stock_changes(self):
+        self.assertEqual(InventoryValuation.snapshot(self.company)['summary']['total_stock_value'], 2400)
+
+        with CaptureQueriesContext(connection) as ctx:
+            InventoryValuation.snapshot(self.company)
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if '"products"' in q['sql']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.stock_units = 10
+            self.product.save(update_fields=['stock_units', 'updated_at'])
+        self.assertEqual(InventoryValuation.snapshot(self.company)['summary']['total_stock_value'], 6000)
+
+    def test_legacy_route_keeps_previous_format(self):
+        response = self.client.get('/api/reports/inventory/legacy/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Deprecation'], 'true')
+        self.assertEqual(response.data['summary'], {'total_products': 1, 'total_inventory_value': 4000.0})
+        self.assertEqual(response.data['by_department']['Bebidas']['products_count'], 1)
+        self.assertEqual(response.data['products'][0]['status'], 'optimal')
+
+
+class IVABreakdownTest(TestCase):
+    """Desglose de IVA agrupado por tasa (consulta y respaldo en Python)"""
+
+    def test_lines_fallback_matches_grouped_query(self):
+        company, _, _ = create_company_user()
+        products = [
+            Product.objects.create(company=company, barcode='780001', name='Pan', unit_price=1, is_tax_exempt=True),
+            Product.objects.create(company=company, barcode='780002', name='Bebida', unit_price=1),
+            Product.objects.create(company=company, barcode='780003', name='Licor', unit_price=1, variable_tax_rate=Decimal('31.50')),
+            Product.objects.create(company=company, barcode='780004', name='Jugo', unit_price=1, variable_tax_rate=Decimal('0')),
+        ]
+        sale = Sale.objects.create(company=company, sale_number='VTA-00000001', total=0, status='completed')
+
+        items = []
+        for idx in range(40):
+            product = products[idx % len(products)]
+            # Precios con centavos: la suma en float no daría el mismo resultado
+            items.append(SaleItem(
+                sale=sale,
+                product=product,
+                quantity=Decimal(idx % 3 + 1),
+                unit_price=Decimal('333.33') + Decimal(idx) / 100
+            ))
+        SaleItem.objects.bulk_create(items)
+
+        grouped = IVACalculator.breakdown_for_sales(Sale.objects.filter(id=sale.id))
+        fallback = IVACalculator.breakdown_from_lines(
+            (item.quantity * item.unit_price, item.product.is_tax_exempt, item.product.variable_tax_rate)
+            for item in items
+        )
+
+        self.assertEqual(fallback, grouped)
+        self.assertGreater(grouped['total_exempt'], 0)
+        self.assertGreater(grouped['iva_19_percent'], 0)
+        self.assertGreater(grouped['iva_variable'], 0)
+
+
+class PermissionCacheTest(TestCase):
+    """Permisos resueltos con invalidación por versión"""
+
+    def setUp(self):
+        self.company, self.role, self.user = create_company_user()
+        permission = Permission.objects.create(name='sales.view', display_name='Ver ventas', resource='sales', action='view')
+        self.grant = RolePermission.objects.create(role=self.role, permission=permission)
+
+    def permissions(self):
+        # Usuario nuevo por request: sin el cache del request anterior
+        return PermissionCache.get_permissions(User.objects.get(id=self.user.id))
+
+    def test_steady_state_reads_do_not_query(self):
+        self.assertIn(('sales', 'view'), self.permissions())
+        user = User.objects.get(id=self.user.id)
+
+        with self.assertNumQueries(0):
+            self.assertIn(('sales', 'view'), PermissionCache.get_permissions(user))
+
+    def test_invalidation_is_seen_by_the_same_process(self):
+        self.assertIn(('sales', 'view'), self.permissions())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grant.is_granted = False
+            self.grant.save()
+
+        self.assertNotIn(('sales', 'view'), self.permissions())
+
+
+class UserCacheTest(TestCase):
+    """Usuario autenticado cacheado por proceso"""
+
+    def setUp(self):
+        _, _, self.user = create_company_user()
+
+    def test_steady_state_lookup_does_not_query(self):
+        UserCache.get_user(self.user.id)
+
+        with self.assertNumQueries(0):
+            user = UserCache.get_user(self.user.id)
+
+        self.assertEqual(user.company.name, 'Empresa Test')
+        self.assertEqual(user.role.name, 'cashier')
+
+    def test_saving_the_user_invalidates_the_entry(self):
+        UserCache.get_user(self.user.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Renombrado'
+            self.user.save()
+
+        self.assertEqual(UserCache.get_user(self.user.id).first_name, 'Renombrado')
+
+
+class ProductSignalsTest(TestCase):
+    """Guardados solo de stock no invalidan índices de catálogo"""
+
+    def setUp(self):
+        self.company, _, _ = create_company_user()
+        self.product = Product.objects.create(
+            company=self.company, barcode='780001', name='Bebida', unit_price=1000, stock_units=10
+        )
+
+    def test_stock_only_save_skips_catalog_signals(self):
+        with mock.patch.object(BarcodeIndex, 'sync_products') as sync, \
+                mock.patch.object(CategoryTree, 'invalidate_company') as invalidate:
+            self.product.stock_units = 9
+            self.product.save(update_fields=['stock_units', 'updated_at'])
+
+        sync.assert_not_called()
+        invalidate.assert_not_called()
+
+    def test_catalog_save_syncs_barcodes_and_tree(self):
+        with mock.patch.object(BarcodeIndex, 'sync_products') as sync, \
+                mock.patch.object(CategoryTree, 'invalidate_company') as invalidate:
+            self.product.name = 'Bebida 1.5L'
+            self.product.save(update_fields=['name', 'updated_at'])
+
+        sync.assert_called_once()
+        invalidate.assert_called_once_with(self.company.id)
+
+
+class CatalogSyncTest(TestCase):
+    """Catálogo offline de las cajas"""
+
+    def setUp(self):
+        self.company, self.role, self.user = create_company_user()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(
+                company=self.company, barcode='780001', name='Bebida', unit_price=1000, stock_units=10
+            )
+
+    def test_cached_snapshot_is_served_without_scanning_tables(self):
+        etag, data = CatalogSync.snapshot(self.company)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(CatalogSync.snapshot(self.company), (etag, data))
+
+        # Solo la lectura del cache compartido (con DatabaseCache es una consulta)
+        tables = ['products', 'promotions', 'catalog_tombstones']
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if any(t in q['sql'] for t in tables)])
+
+    def test_catalog_change_replaces_snapshot_but_stock_change_does_not(self):
+        etag, _ = CatalogSync.snapshot(self.company)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.stock_units = 5
+            self.product.save(update_fields=['stock_units', 'updated_at'])
+        self.assertEqual(CatalogSync.snapshot(self.company)[0], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.unit_price = 1200
+            self.product.save()
+        self.assertNotEqual(CatalogSync.snapshot(self.company)[0], etag)
+
+    def delta(self, since):
+        client = APIClient()
+        client.cookies['access_token'] = JWTAuthHandler.generate_tokens(self.user)['access']
+        return client.get('/api/catalog/delta/', {'since': since})
+
+    def grant_products_view(self):
+        permission = Permission.objects.create(name='products.view', display_name='Ver productos', resource='products', action='view')
+        RolePermission.objects.create(role=self.role, permission=permission)
+
+    def test_delta_returns_changes_and_deletions_since_version(self):
+        self.grant_products_view()
+        since = CatalogSync.encode_version(timezone.now() - CatalogSync.SYNC_OVERLAP - timedelta(minutes=5))
+        Product.objects.filter(id=self.product.id).update(catalog_updated_at=timezone.now() - timedelta(days=1))
+        changed = Product.objects.create(company=self.company, barcode='780002', name='Galletas', unit_price=500)
+        deleted = Product.objects.create(company=self.company, barcode='780003', name='Jugo', unit_price=800)
+        deleted_id = deleted.id
+        deleted.delete()
+
+        response = self.delta(since)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['products']], [changed.id])
+        self.assertEqual(response.data['deleted'], {'products': [deleted_id], 'promotions': []})
+        self.assertGreater(int(response.data['version']), int(since))
+
+    def test_delta_before_tombstone_retention_returns_410(self):
+        self.grant_products_view()
+        expired = timezone.now() - timedelta(days=CatalogSync.TOMBSTONE_DAYS + 1)
+
+        response = self.delta(CatalogSync.encode_version(expired))
+
+        self.assertEqual(response.status_code, 410)
+
+    def test_invalid_version_returns_400(self):
+        self.grant_products_view()
+
+        self.assertEqual(self.delta('no-es-version').status_code, 400)
+        self.assertEqual(self.delta('-5').status_code, 400)
+
+
+class SalesRollupTodayTest(TestCase):
+    """El día actual se lee de los rollups una vez recalculado"""
+
+    def setUp(self):
+        self.company, _, self.user = create_company_user()
+        self.shift = Shift.objects.create(company=self.company, user=self.user, shift_number='TUR-000001', opening_cash=0)
+        self.today = timezone.localdate()
+
+    def sale(self, number, total):
+        with self.captureOnCommitCallbacks(execute=True):
+            sale = Sale.objects.create(
+                company=self.company, sale_number=number, subtotal=total, total=total, shift=self.shift,
+                status='completed', sale_date=timezone.now(), created_by=self.user
+            )
+            SalesRollup.mark_sale(sale)
+        return sale
+
+    def reader(self):
+        return SalesRollup.reader(self.company, self.today, self.today)
+
+    def test_today_without_row_is_read_live(self):
+        # Rollups desde ayer: el rango está cubierto, pero hoy no tiene fila
+        SalesRollupDay.objects.create(company=self.company, date=self.today - timedelta(days=1))
+
+        self.assertEqual(self.reader().live_days, [self.today])
+
+    def test_today_is_served_from_rollup_when_clean(self):
+        self.sale('VTA-00000001', 1000)
+        self.assertEqual(self.reader().live_days, [self.today])
+
+        SalesRollup.refresh_day(self.company.id, self.today)
+        reader = self.reader()
+        self.assertEqual(reader.live_days, [])
+        self.assertEqual(reader.totals()['total'], 1000)
+
+        # Una venta nueva vuelve a dejar el día en vivo
+        self.sale('VTA-00000002', 500)
+        reader = self.reader()
+        self.assertEqual(reader.live_days, [self.today])
+        self.assertEqual(reader.totals()['total'], 1500)
+
+
+class PaginatorTest(TestCase):
+    """Paginación por páginas y por cursor"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_page_size_is_validated_and_clamped(self):
+        cases = [
+            ({}, 50),
+            ({'page_size': '20'}, 20),
+            ({'page_size': 'x'}, 50),
+            ({'page_size': '0'}, 50),
+            ({'page_size': '9000'}, 500),
+        ]
+        for params, expected in cases:
+            self.assertEqual(Paginator.page_size(self.factory.get('/', params), 50, 500), expected, params)
+
+        self.assertEqual(Paginator.page_size(self.factory.get('/', {'limit': '10'}), 50, 500, param='limit'), 10)
+
+    def cursor_page(self, queryset, ordering, **params):
+        request = self.factory.get('/api/products/', {'page_size': 3, **params})
+        return Paginator.paginate_cursor(queryset, request, ordering)
+
+    def test_cursor_round_trip_over_repeated_sort_values(self):
+        company, _, _ = create_company_user()
+        for i in range(8):
+            # Precios repetidos: el id desempata el orden
+            Product.objects.create(company=company, barcode=f'78000{i}', name=f'Producto {i}', unit_price=1000 * (i % 3))
+        products = Product.objects.filter(company=company)
+        ordering = ['-unit_price', 'id']
+        expected = list(products.order_by(*ordering).values_list('id', flat=True))
+
+        pages = [self.cursor_page(products, ordering)]
+        while pages[-1]['next_cursor']:
+            pages.append(self.cursor_page(products, ordering, cursor=pages[-1]['next_cursor']))
+
+        self.assertEqual([len(page['results']) for page in pages], [3, 3, 2])
+        self.assertEqual([item.id for page in pages for item in page['results']], expected)
+        self.assertIsNone(pages[0]['previous_cursor'])
+        self.assertIsNone(pages[0]['count'])
+
+        # Volver desde la última página con previous_cursor
+        previous = self.cursor_page(products, ordering, cursor=pages[-1]['previous_cursor'])
+        self.assertEqual([item.id for item in previous['results']], expected[3:6])
+        previous = self.cursor_page(products, ordering, cursor=previous['previous_cursor'])
+        self.assertEqual([item.id for item in previous['results']], expected[:3])
+        self.assertIsNone(previous['previous_cursor'])
+
+    def test_invalid_cursor_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            self.cursor_page(Product.objects.all(), ['-unit_price', 'id'], cursor='no-es-cursor')
+
+
+class StockUpdaterTest(TestCase):
+    """Cargas masivas de stock por bloques"""
+
+    def setUp(self):
+        self.company, _, self.user = create_company_user()
+        self.products = [
+            Product.objects.create(company=self.company, barcode=f'78000{i}', name=f'Producto {i}', unit_price=1000, stock_units=10)
+            for i in range(4)
+        ]
+
+    def stock(self):
+        return [Product.objects.values_list('stock_units', flat=True).get(id=p.id) for p in self.products]
+
+    def apply(self, entries):
+        with mock.patch.object(StockUpdater, 'CHUNK_SIZE', 2):
+            return StockUpdater.apply(self.company, list(enumerate(entries, start=1)), self.user, 'Conteo')
+
+    def test_entries_are_applied_and_audited_by_chunks(self):
+        result = self.apply([
+            {'barcode': '780000', 'new_stock': '5'},
+            {'product_id': str(self.products[1].id), 'new_stock': '10'},
+            {'barcode': '780000', 'new_stock': '7'},
+            {'barcode': 'no-existe', 'new_stock': '1'},
+            {'barcode': '780002', 'new_stock': 'x'},
+            {'barcode': '780003', 'new_stock': '0'},
+        ])
+
+        self.assertEqual(self.stock(), [5, 10, 10, 0])
+        self.assertEqual((result['updated'], result['unchanged']), (2, 1))
+        self.assertEqual([error.split(':')[0] for error in result['errors']], ['Línea 3', 'Línea 4', 'Línea 5'])
+        self.assertIn('repetido', result['errors'][0])
+
+        lines = StockAuditLine.objects.filter(audit_id=result['audit_id'])
+        self.assertEqual(
+            sorted((line.product_id, line.old_stock, line.new_stock) for line in lines),
+            sorted([(self.products[0].id, 10, 5), (self.products[3].id, 10, 0)])
+        )
+
+    def test_failed_chunk_keeps_previous_chunks_committed(self):
+        add_lines = StockAuditLog.add_lines
+        calls = []
+
+        def failing_add_lines(audit, changes):
+            calls.append(audit)
+            if len(calls) == 2:
+                raise RuntimeError('falla en el segundo bloque')
+            return add_lines(audit, changes)
+
+        with mock.patch.object(StockAuditLog, 'add_lines', side_effect=failing_add_lines):
+            with self.assertRaises(RuntimeError):
+                self.apply([{'barcode': f'78000{i}', 'new_stock': '1'} for i in range(4)])
+
+        self.assertEqual(self.stock(), [1, 1, 10, 10])
+        audit = calls[0]
+        audit.refresh_from_db()
+        self.assertEqual(audit.affected_products_count, 2)
+        self.assertEqual(StockAuditLine.objects.filter(audit=audit).count(), 2)
+
+
+class PromotionEngineBasketTest(TestCase):
+    """Promociones aplicadas a la canasta completa"""
+
+    def setUp(self):
+        self.company, _, _ = create_company_user()
+        self.promoted = Product.objects.create(company=self.company, barcode='780001', name='Bebida', unit_price=1000)
+        self.other = Product.objects.create(company=self.company, barcode='780002', name='Galletas', unit_price=500)
+        now = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.promotion = Promotion.objects.create(
+                company=self.company, name='2x1', promotion_type='free_units',
+                start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+                buy_quantity=2, free_quantity=1
+            )
+            PromotionProduct.objects.create(promotion=self.promotion, product=self.promoted)
+            self.promotion.save()
+
+    def line(self, product, quantity=1):
+        return {
+            'product_id': product.id if product else None,
+            'quantity': Decimal(quantity),
+            'unit_price': product.unit_price if product else Decimal('300'),
+        }
+
+    def test_lines_of_the_same_product_share_the_discount(self):
+        # Tres escaneos separados del mismo producto: un 2x1 sobre 3 unidades
+        lines = [
+            self.line(self.promoted),
+            self.line(self.other),
+            self.line(self.promoted),
+            self.line(None),
+            self.line(self.promoted),
+        ]
+
+        pricing = PromotionEngine.price_basket(self.company.id, lines)
+
+        discounts = [price['discount'] for price in pricing]
+        self.assertEqual(discounts, [Decimal('333.33'), 0, Decimal('333.33'), 0, Decimal('333.34')])
+        self.assertEqual(sum(discounts), Decimal('1000.00'))
+        self.assertEqual([price['free_units'] for price in pricing], [1, 0, 0, 0, 0])
+        self.assertEqual(pricing[0]['promotion']['id'], self.promotion.id)
+        self.assertIsNone(pricing[1]['promotion'])
+
+    def test_grouped_quantity_below_the_rule_gets_no_discount(self):
+        pricing = PromotionEngine.price_basket(self.company.id, [self.line(self.promoted)])
+
+        self.assertEqual(pricing[0]['discount'], 0)
+        self.assertIsNone(pricing[0]['promotion'])
+
+
+class LowStockAlertsTest(TestCase):
+    """Alertas de stock bajo generadas por lotes"""
+
+    def setUp(self):
+        self.company, _, _ = create_company_user()
+
+    def test_crossed_min_stock_only_reports_products_crossing_the_minimum(self):
+        products = {
+            'cruza': Product(id='cruza', stock_units=6, min_stock=5),
+            'justo': Product(id='justo', stock_units=7, min_stock=5),
+            'no-llega': Product(id='no-llega', stock_units=10, min_stock=5),
+            'ya-bajo': Product(id='ya-bajo', stock_units=5, min_stock=5),
+        }
+        quantities = {'cruza': 3, 'justo': 2, 'no-llega': 4, 'ya-bajo': 1}
+
+        crossed = LowStockAlerts.crossed_min_stock(products, quantities)
+
+        self.assertEqual(sorted(crossed), ['cruza', 'justo'])
+
+    def test_generate_skips_products_with_unread_alert(self):
+        low = Product.objects.create(company=self.company, barcode='780001', name='Bebida', unit_price=1000, stock_units=2, min_stock=5)
+        Product.objects.create(company=self.company, barcode='780002', name='Galletas', unit_price=500, stock_units=20, min_stock=5)
+
+        self.assertEqual(LowStockAlerts.generate(self.company), 1)
+        self.assertEqual(LowStockAlerts.generate(self.company), 0)
+        self.assertEqual(LowStockAlerts.generate(self.company, product_ids=[]), 0)
+        self.assertTrue(SystemAlert.objects.filter(company=self.company, product=low, status='unread').exists())
+
+
+class CategoryTreeTest(TestCase):
+    """Conteos del árbol de navegación"""
+
+    def setUp(self):
+        self.company, _, _ = create_company_user()
+        self.drinks = Department.objects.create(company=self.company, name='Bebidas', slug='bebidas')
+        self.snacks = Department.objects.create(company=self.company, name='Snacks', slug='snacks')
+        self.sodas = Category.objects.create(company=self.company, department=self.drinks, name='Gaseosas', slug='gaseosas')
+        Category.objects.create(company=self.company, department=self.drinks, name='Jugos', slug='jugos')
+
+    def product(self, barcode, department=None, category=None, is_active=True):
+        return Product.objects.create(
+            company=self.company, barcode=barcode, name=f'Producto {barcode}', unit_price=1000,
+            department=department, category=category, is_active=is_active
+        )
+
+    def test_build_counts_active_products_per_node(self):
+        self.product('1', self.drinks, self.sodas)
+        self.product('2', self.drinks, self.sodas)
+        self.product('3', self.drinks)
+        self.product('4', self.snacks)
+        self.product('5', self.drinks, self.sodas, is_active=False)
+        self.product('6')
+
+        tree = CategoryTree._build(self.company.id)
+
+        self.assertEqual(tree['total_products'], 5)
+        drinks, snacks = tree['departments']
+        self.assertEqual((drinks['name'], drinks['product_count']), ('Bebidas', 3))
+        self.assertEqual([(c['name'], c['product_count']) for c in drinks['categories']], [('Gaseosas', 2), ('Jugos', 0)])
+        self.assertEqual(drinks['no_category']['product_count'], 1)
+        self.assertEqual((snacks['product_count'], snacks['no_category']['product_count']), (1, 1))
+
+
+class ProductImporterTest(TestCase):
+    """Importación de productos por bloques (upsert por código)"""
+
+    def setUp(self):
+        self.company, _, _ = create_company_user()
+        self.existing = Product.objects.create(company=self.company, barcode='780001', name='Bebida', unit_price=1000, stock_units=5)
+        self.unchanged = Product.objects.create(company=self.company, barcode='780002', name='Galletas', unit_price=500, stock_units=3)
+
+    @staticmethod
+    def row(barcode, name, price, stock=None):
+        values = [None] * len(ProductImporter.COLUMNS)
+        values[0], values[2], values[4], values[8] = barcode, name, stock, price
+        return values
+
+    def import_rows(self, rows):
+        with mock.patch.object(ProductImporter, 'CHUNK_SIZE', 2):
+            return ProductImporter.import_rows(list(enumerate(rows, start=2)), self.company, {})
+
+    def test_rows_are_upserted_by_chunks(self):
+        result = self.import_rows([
+            self.row('780001', 'Bebida 1.5L', 1200),
+            self.row('780002', 'Galletas', 500),
+            self.row('780003', 'Jugo', 800, stock=7),
+            self.row('780001', 'Bebida repetida', 1300),
+            self.row('780004', None, 900),
+        ])
+
+        self.assertEqual((result['created'], result['updated'], result['unchanged']), (1, 1, 1))
+        self.assertEqual([error.split(':')[0] for error in result['errors']], ['Fila 5', 'Fila 6'])
+
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.name, self.existing.unit_price, self.existing.stock_units), ('Bebida 1.5L', 1200, 5))
+        self.assertEqual(Product.objects.get(barcode='780003').stock_units, 7)
+
+    def test_conflicting_chunk_falls_back_to_row_by_row(self):
+        # Otro proceso insertó uno de los códigos entre la lectura y el INSERT
+        with mock.patch.object(Product.objects, 'bulk_create', side_effect=IntegrityError('duplicado')) as bulk_create:
+            result = self.import_rows([
+                self.row('780003', 'Jugo', 800),
+                self.row('780001', 'Bebida 1.5L', 1200),
+            ])
+
+        bulk_create.assert_called_once()
+        self.assertEqual((result['created'], result['updated']), (1, 1))
+        self.assertEqual(result['errors'], [])
+        self.assertTrue(Product.objects.filter(company=self.company, barcode='780003').exists())
+        self.assertEqual(Product.objects.get(id=self.existing.id).unit_price, 1200)
@@ -24,6 +24,8 @@ from api.views import (
     alert_views,
     reports_complete_views,
     product_supplier_views,
+    job_views,
+    catalog_views,
 )
 
 urlpatterns = [
@@ -61,6 +63,7 @@ urlpatterns = [
     path('products/reset-stock/', product_views.reset_stock, name='reset-stock'),
     path('products/bulk-update/', product_views.bulk_update_products, name='bulk-update-products'),
     path('products/no-asociados/', product_views.products_not_associated, name='products_not_associated'),
+    path('products/navigation-tree/', product_views.navigation_tree, name='products_navigation_tree'),
     
     # Defective products
     path('products/defective/', product_views.list_defective_products, name='list-defective-products'),
@@ -114,11 +117,13 @@ urlpatterns = [
     
     # Auditoría
     path('stock/audit-history/', stock_management_views.stock_audit_history, name='stock_audit_history'),
+    path('stock/audit-history/<uuid:audit_id>/lines/', stock_management_views.stock_audit_lines, name='stock_audit_lines'),
 
     # Reportes completos
     path('reports/sales/', reports_views.sales_report, name='sales_report'),
     path('reports/cash-flow/', reports_views.cash_flow_report, name='cash_flow_report'),
-    path('reports/inventory/', reports_views.inventory_report, name='inventory_report'),
+    # Formato anterior de reports/inventory/ (obsoleto, ver reports_views.inventory_report)
+    path('reports/inventory/legacy/', reports_views.inventory_report, name='inventory_report_legacy'),
     path('reports/credits/', reports_views.credits_report, name='credits_report'),
     path('reports/purchase-orders/', reports_views.purchase_orders_report, name='purchase_orders_report'),
 
@@ -187,6 +192,7 @@ urlpatterns = [
     path('promotions/<uuid:promotion_id>/deactivate/', promotion_views.deactivate_promotion, name='deactivate-promotion'),
     path('promotions/product/<uuid:product_id>/', promotion_views.get_active_promotions_for_product, name='promotions-for-product'),
     path('promotions/calculate-price/', promotion_views.calculate_promotion_price, name='calculate-promotion-price'),
+    path('promotions/price-basket/', promotion_views.price_basket, name='promotion-price-basket'),
     path('promotions/export/', promotion_views.export_promotions, name='export-promotions'),
 
     # ========== CONSIGNMENTS ==========
@@ -251,4 +257,14 @@ urlpatterns = [
     path("product-suppliers-massive/delete/", product_supplier_views.delete_product_suppliers_massive, name="delete_product_suppliers_massive"),
     path("product-suppliers/by-product/<uuid:product_id>/", product_supplier_views.get_suppliers_by_product, name="product-suppliers"),
     path("product-suppliers/by-product-supplier/",product_supplier_views.delete_product_supplier_by_product_and_supplier,name="delete-product-supplier-by-product-supplier",),
+
+    # ========== BACKGROUND JOBS ==========
+    path('jobs/', job_views.list_jobs, name='list-jobs'),
+    path('jobs/<uuid:job_id>/', job_views.get_job, name='get-job'),
+    path('jobs/<uuid:job_id>/download/', job_views.download_job_file, name='download-job-file'),
+    path('jobs/<uuid:job_id>/cancel/', job_views.cancel_job, name='cancel-job'),
+
+    # ========== CATALOG (CAJAS OFFLINE) ==========
+    path('catalog/snapshot/', catalog_views.catalog_snapshot, name='catalog-snapshot'),
+    path('catalog/delta/', catalog_views.catalog_delta, name='catalog-delta'),
 ]
\ No newline at end of file
@@ -0,0 +1,314 @@
+# api/utils/background_jobs.py
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.response import Response
+from api.models.configuration import BackgroundJob
+from api.serializers.job_serializers import BackgroundJobSerializer
+from api.utils.job_handlers import JobHandlers
+from datetime import timedelta
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    """La tarea fue cancelada mientras se ejecutaba"""
+    pass
+
+
+class JobContext:
+    """
+    Contexto que recibe cada tarea al ejecutarse
+
+    Permite informar progreso y guardar el archivo de resultado en el
+    storage local. El heartbeat lo mantiene JobHeartbeat aunque la tarea
+    no informe progreso.
+    """
+
+    PROGRESS_INTERVAL = 2  # segundos mínimos entre actualizaciones de progreso
+
+    def __init__(self, job):
+        self.job = job
+        self.result_file = ''
+        self._last_update = 0
+        self._last_percent = None
+
+    def progress(self, done, total=None, message=''):
+        """
+        Informar avance (done de total, o porcentaje si total es None)
+        Lanza JobCancelled si la tarea fue cancelada.
+        """
+        if total:
+            percent = min(int(done * 100 / total), 99)
+        else:
+            percent = min(int(done), 99)
+
+        now = time.monotonic()
+        if percent == self._last_percent and now - self._last_update < self.PROGRESS_INTERVAL:
+            return
+
+        updated = BackgroundJob.objects.filter(
+            id=self.job.id,
+            status='running',
+            worker=self.job.worker
+        ).update(
+            progress=percent,
+            progress_message=message[:255],
+            heartbeat_at=timezone.now()
+        )
+
+        if not updated:
+            raise JobCancelled()
+
+        self._last_update = now
+        self._last_percent = percent
+
+    def track(self, iterable, total, message=''):
+        """Recorrer iterable informando progreso"""
+        for done, item in enumerate(iterable, start=1):
+            yield item
+            if done % 500 == 0:
+                self.progress(done, total, message)
+
+    def save_file(self, fileobj, filename):
+        """Guardar el archivo de resultado de la tarea"""
+        fileobj.seek(0)
+        self.result_file = default_storage.save(
+            JobQueue.file_path(self.job, filename),
+            File(fileobj)
+        )
+        return self.result_file
+
+
+class JobHeartbeat:
+    """
+    Heartbeat de la tarea desde un hilo del worker
+
+    progress() solo corre entre pasos de la tarea; un paso largo sin
+    llamadas (un count grande, guardar el libro) dejaría la tarea sin
+    heartbeat y recover_stale la entregaría a otro worker mientras esta
+    sigue ejecutándose. El hilo renueva heartbeat_at cada INTERVAL segundos
+    mientras la tarea siga en ejecución a nombre de este worker.
+    """
+
+    INTERVAL = 60  # segundos (muy por debajo de JobQueue.STALE_AFTER)
+
+    def __init__(self, job):
+        self.job = job
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, name=f"heartbeat-{job.id}", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _beat(self):
+        try:
+            while not self._stop.wait(self.INTERVAL):
+                alive = BackgroundJob.objects.filter(
+                    id=self.job.id,
+                    status='running',
+                    worker=self.job.worker
+                ).update(heartbeat_at=timezone.now())
+
+                # Cancelada o tomada por otro worker: progress() lo informa a la tarea
+                if not alive:
+                    break
+        except Exception:
+            logger.exception(f"[JOBS] Error en heartbeat de {self.job.id}")
+        finally:
+            # El hilo usa su propia conexión
+            connection.close()
+
+
+class JobQueue:
+    """
+    Cola de tareas en segundo plano sobre la base de datos (sin broker externo)
+
+    Los requests encolan una fila en background_jobs y responden de
+    inmediato; los procesos de `manage.py run_workers` toman las tareas
+    pendientes (SELECT ... FOR UPDATE SKIP LOCKED cuando la base lo
+    soporta), las ejecutan y guardan el resultado y el archivo generado
+    en MEDIA_ROOT/jobs/<id>/.
+    """
+
+    STALE_AFTER = 600  # segundos sin heartbeat (JobHeartbeat) para considerar caído al worker
+    MAX_ATTEMPTS = 3
+    RESULT_TTL_DAYS = 7
+
+    # ===== Encolar =====
+
+    @staticmethod
+    def file_path(job, filename):
+        return f"jobs/{job.id}/{os.path.basename(filename)}"
+
+    @staticmethod
+    def enqueue(user, job_type, params=None, upload=None):
+        """
+        Crear una tarea pendiente
+        upload: archivo subido que la tarea necesita (se guarda en el storage)
+        """
+        if job_type not in dict(BackgroundJob.JOB_TYPES):
+            raise ValueError(f"Tipo de tarea desconocido: {job_type}")
+
+        job = BackgroundJob(
+            company=user.company,
+            created_by=user,
+            job_type=job_type,
+            params=params or {}
+        )
+
+        if upload is not None:
+            job.params['file'] = default_storage.save(JobQueue.file_path(job, upload.name), upload)
+
+        job.save()
+        logger.info(f"[JOBS] Tarea encolada: {job.job_type} ({job.id}) por {user.email}")
+        return job
+
+    @staticmethod
+    def wants_async(request):
+        """El request pide ejecutar la operación en segundo plano (async=true)"""
+        value = request.GET.get('async')
+        if value is None and hasattr(request.data, 'get'):
+            value = request.data.get('async')
+        return str(value).lower() in ('true', '1')
+
+    @staticmethod
+    def accepted_response(job):
+        """Respuesta 202 con la tarea encolada (consultar en /api/jobs/<id>/)"""
+        return Response(BackgroundJobSerializer(job).data, status=202)
+
+    # ===== Ejecución =====
+
+    @staticmethod
+    def claim(worker):
+        """Tomar la tarea pendiente más antigua (None si no hay)"""
+        with transaction.atomic():
+            pending = BackgroundJob.objects.filter(status='pending').order_by('created_at')
+
+            if connection.features.has_select_for_update_skip_locked:
+                pending = pending.select_for_update(skip_locked=True)
+
+            job = pending.first()
+            if job is None:
+                return None
+
+            now = timezone.now()
+
+            # Condicional: sin SKIP LOCKED otro worker pudo tomarla primero
+            claimed = BackgroundJob.objects.filter(id=job.id, status='pending').update(
+                status='running',
+                worker=worker,
+                attempts=F('attempts') + 1,
+                started_at=now,
+                heartbeat_at=now
+            )
+
+        if not claimed:
+            return None
+
+        job.refresh_from_db()
+        return job
+
+    @staticmethod
+    def run(job):
+        """Ejecutar una tarea tomada y guardar su resultado"""
+        handler = JobHandlers.get(job.job_type)
+        context = JobContext(job)
+        started = time.monotonic()
+
+        try:
+            with JobHeartbeat(job):
+                result = handler(job, context)
+        except JobCancelled:
+            logger.info(f"[JOBS] Tarea cancelada: {job.job_type} ({job.id})")
+            return
+        except Exception as e:
+            logger.exception(f"[JOBS] Tarea fallida: {job.job_type} ({job.id})")
+            BackgroundJob.objects.filter(id=job.id, status='running', worker=job.worker).update(
+                status='failed',
+                error=str(e),
+                finished_at=timezone.now()
+            )
+            return
+
+        BackgroundJob.objects.filter(id=job.id, status='running', worker=job.worker).update(
+            status='completed',
+            progress=100,
+            progress_message='',
+            result=result,
+            result_file=context.result_file,
+            finished_at=timezone.now()
+        )
+        logger.info(f"[JOBS] Tarea completada: {job.job_type} ({job.id}) en {time.monotonic() - started:.1f}s")
+
+    @staticmethod
+    def run_next(worker):
+        """Tomar y ejecutar una tarea; retorna False si no había pendientes"""
+        job = JobQueue.claim(worker)
+        if job is None:
+            return False
+
+        JobQueue.run(job)
+        return True
+
+    @staticmethod
+    def cancel(job):
+        """Cancelar una tarea pendiente o en ejecución"""
+        return BackgroundJob.objects.filter(
+            id=job.id,
+            status__in=['pending', 'running']
+        ).update(status='cancelled', finished_at=timezone.now()) > 0
+
+    # ===== Mantenimiento =====
+
+    @staticmethod
+    def recover_stale():
+        """Reencolar (o marcar como fallidas) las tareas de workers caídos"""
+        limit = timezone.now() - timedelta(seconds=JobQueue.STALE_AFTER)
+        stale = BackgroundJob.objects.filter(status='running', heartbeat_at__lt=limit)
+
+        retried = stale.filter(attempts__lt=JobQueue.MAX_ATTEMPTS).update(
+            status='pending',
+            worker='',
+            progress=0
+        )
+        failed = stale.update(
+            status='failed',
+            error='El worker dejó de responder',
+            finished_at=timezone.now()
+        )
+
+        if retried or failed:
+            logger.warning(f"[JOBS] Tareas sin heartbeat: {retried} reencoladas, {failed} fallidas")
+
+    @staticmethod
+    def purge_expired():
+        """Eliminar tareas terminadas (y sus archivos) más antiguas que RESULT_TTL_DAYS"""
+        limit = timezone.now() - timedelta(days=JobQueue.RESULT_TTL_DAYS)
+        expired = BackgroundJob.objects.filter(
+            status__in=['completed', 'failed', 'cancelled'],
+            finished_at__lt=limit
+        )
+
+        count = 0
+        for job in expired.iterator():
+            for path in (job.result_file, job.params.get('file')):
+                if path and default_storage.exists(path):
+                    default_storage.delete(path)
+            job.delete()
+            count += 1
+
+        if count:
+            logger.info(f"[JOBS] Tareas antiguas eliminadas: {count}")
@@ -0,0 +1,199 @@
+# api/utils/barcode_index.py
+
+from collections import OrderedDict
+from django.core.cache import cache
+from api.models import Product
+from api.models.product import ProductBarcode
+from api.serializers.product_serializers import ProductSerializer
+from api.utils.helpers import StockCalculator
+from api.utils.permission_cache import VersionedCache
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BarcodeIndex(VersionedCache):
+    """
+    Búsqueda de productos por código de barras (camino de escaneo del POS)
+
+    Los códigos de unidad y paquete de cada producto se indexan en
+    ProductBarcode (company, code). El producto serializado se guarda por
+    código en memoria del proceso (LRU) y en el cache de Django, con una
+    versión por empresa que se incrementa al guardar productos,
+    departamentos o proveedores. El stock no se cachea: cada escaneo lo
+    lee del producto por su id.
+    """
+
+    CACHE_TIMEOUT = 600  # 10 minutos en cache compartido
+    LOCAL_TIMEOUT = 60  # 1 minuto en memoria del proceso
+    LOCAL_MAX_ENTRIES = 5000
+    KEY_PREFIX = 'barcode'
+
+    NOT_FOUND = '__not_found__'
+    DUPLICATED = '__duplicated__'
+
+    # Campo de ProductSerializer para formatear el stock leído en cada escaneo
+    _stock_field = ProductSerializer().fields['stock_units']
+
+    # {(company_id, code): (version, expires_at, payload)}
+    _local = OrderedDict()
+    _lock = threading.Lock()
+
+    # ===== Sincronización del índice =====
+
+    @staticmethod
+    def _codes(product):
+        codes = {'unit': product.barcode}
+        if product.barcode_package:
+            codes['package'] = product.barcode_package
+        return codes
+
+    @staticmethod
+    def sync_products(products):
+        """Crear / actualizar / eliminar las filas de ProductBarcode de los productos"""
+        products = list(products)
+        if not products:
+            return
+
+        existing = {
+            (row.product_id, row.kind): row
+            for row in ProductBarcode.objects.filter(product__in=[product.id for product in products])
+        }
+
+        to_create = []
+        to_update = []
+
+        for product in products:
+            codes = BarcodeIndex._codes(product)
+
+            for kind, code in codes.items():
+                row = existing.pop((product.id, kind), None)
+                if row is None:
+                    to_create.append(ProductBarcode(
+                        company_id=product.company_id,
+                        product_id=product.id,
+                        code=code,
+                        kind=kind
+                    ))
+                elif row.code != code or row.company_id != product.company_id:
+                    row.code = code
+                    row.company_id = product.company_id
+                    to_update.append(row)
+
+        # Filas de códigos que el producto ya no tiene
+        to_delete = [row.id for row in existing.values()]
+
+        if to_delete:
+            ProductBarcode.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            ProductBarcode.objects.bulk_update(to_update, ['code', 'company'], batch_size=500)
+        if to_create:
+            ProductBarcode.objects.bulk_create(to_create, batch_size=500)
+
+    # ===== Invalidación =====
+
+    @classmethod
+    def invalidate_company(cls, company_id):
+        """Invalidar los productos cacheados de una empresa"""
+        cls._bump(cls._version_key('company', company_id))
+
+    # ===== Búsqueda =====
+
+    @classmethod
+    def _local_get(cls, key, version, now):
+        with cls._lock:
+            entry = cls._local.get(key)
+            if entry is None:
+                return None
+            if entry[0] != version or entry[1] <= now:
+                del cls._local[key]
+                return None
+            cls._local.move_to_end(key)
+            return entry[2]
+
+    @classmethod
+    def _local_set(cls, key, version, now, payload):
+        with cls._lock:
+            cls._local[key] = (version, now + cls.LOCAL_TIMEOUT, payload)
+            cls._local.move_to_end(key)
+            while len(cls._local) > cls.LOCAL_MAX_ENTRIES:
+                cls._local.popitem(last=False)
+
+    @staticmethod
+    def _load(company_id, code):
+        """Producto activo con el código (payload serializado o marcador)"""
+        product_ids = list(ProductBarcode.objects.filter(
+            company_id=company_id,
+            code=code,
+            product__is_active=True
+        ).values_list('product_id', flat=True).distinct()[:2])
+
+        if not product_ids:
+            return BarcodeIndex.NOT_FOUND
+        if len(product_ids) > 1:
+            return BarcodeIndex.DUPLICATED
+
+        product = Product.objects.select_related('department').prefetch_related(
+            'supplier_relations__supplier'
+        ).get(id=product_ids[0])
+
+        return dict(ProductSerializer(product).data)
+
+    @classmethod
+    def _payload(cls, company_id, code):
+        version = cls._get_version('company', company_id)
+        local_key = (company_id, code)
+        now = time.monotonic()
+
+        # 1. Memoria del proceso
+        payload = cls._local_get(local_key, version, now)
+        if payload is not None:
+            return payload
+
+        # 2. Cache compartido
+        shared_key = f"{cls.KEY_PREFIX}:p:{company_id}:{version}:{code}"
+        payload = cache.get(shared_key)
+
+        # 3. Base de datos
+        if payload is None:
+            payload = cls._load(company_id, code)
+            cache.set(shared_key, payload, cls.CACHE_TIMEOUT)
+            logger.debug(f"[BARCODE] Código cargado en cache: {code}")
+
+        cls._local_set(local_key, version, now, payload)
+        return payload
+
+    @classmethod
+    def find(cls, company, code):
+        """
+        Producto activo (datos de ProductSerializer) con código de unidad o paquete
+
+        Lanza Product.DoesNotExist si no existe y
+        Product.MultipleObjectsReturned si el código está en más de un producto
+        """
+        payload = cls._payload(company.id, code)
+
+        if payload == cls.NOT_FOUND:
+            raise Product.DoesNotExist()
+        if payload == cls.DUPLICATED:
+            raise Product.MultipleObjectsReturned()
+
+        # Stock actual (una consulta por id; también confirma que sigue activo)
+        stock_units = Product.objects.filter(
+            id=payload['id'],
+            is_active=True
+        ).values_list('stock_units', flat=True).first()
+
+        if stock_units is None:
+            raise Product.DoesNotExist()
+
+        data = dict(payload)
+        data['stock_units'] = cls._stock_field.to_representation(stock_units)
+        data['stock_display'] = StockCalculator.stock_display(
+            stock_units,
+            payload['is_package'],
+            payload['units_per_package']
+        )
+        return data
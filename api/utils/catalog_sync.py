@@ -0,0 +1,192 @@
+# api/utils/catalog_sync.py
+
+from django.core.cache import cache
+from django.utils import timezone
+from api.models import Product, Promotion, PromotionProduct
+from api.models.product import CatalogTombstone
+from api.utils.permission_cache import VersionedCache
+from rest_framework.utils.encoders import JSONEncoder
+from datetime import datetime, timedelta, timezone as dt_timezone
+import gzip
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSync(VersionedCache):
+    """
+    Catálogo para operación offline de las cajas
+
+    La caja descarga una vez el catálogo completo (comprimido y cacheado
+    mientras no cambien productos ni promociones) y luego pide solo los
+    cambios desde la versión que tiene: productos con catalog_updated_at
+    posterior, promociones con updated_at posterior y eliminaciones
+    registradas en CatalogTombstone. La versión es el instante del servidor
+    en microsegundos.
+
+    El catálogo comprimido se cachea con la versión de catálogo de la
+    empresa (VersionedCache), que se incrementa al confirmar cambios de
+    productos o promociones (señales, importación y actualización masiva),
+    así que pedir el catálogo no recorre las tablas.
+
+    El stock no es parte del catálogo: las ventas y ajustes de stock no
+    cambian catalog_updated_at, así que no invalidan el catálogo cacheado
+    ni aparecen en los deltas.
+    """
+
+    PRODUCT_FIELDS = [
+        'id', 'barcode', 'barcode_package', 'name',
+        'department_id', 'category_id',
+        'unit_price', 'is_package', 'units_per_package', 'package_price',
+        'is_tray', 'packages_per_tray', 'tray_price',
+        'is_tax_exempt', 'variable_tax_rate',
+        'has_returnable_container', 'container_price',
+        'is_active', 'catalog_updated_at',
+    ]
+
+    PROMOTION_FIELDS = [
+        'id', 'name', 'promotion_type', 'start_date', 'end_date',
+        'min_quantity', 'discount_percentage', 'buy_quantity', 'free_quantity',
+        'fixed_price', 'is_active', 'updated_at',
+    ]
+
+    # Margen para cambios confirmados después de leer la versión
+    # (las filas repetidas se aplican igual en la caja)
+    SYNC_OVERLAP = timedelta(seconds=60)
+    TOMBSTONE_DAYS = 30
+    CACHE_TIMEOUT = 3600
+    KEY_PREFIX = 'catalog'
+
+    EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+    # ===== Versiones =====
+
+    @staticmethod
+    def encode_version(moment):
+        return str((moment - CatalogSync.EPOCH) // timedelta(microseconds=1))
+
+    @staticmethod
+    def decode_version(value):
+        """Instante de una versión (ValueError si no es válida)"""
+        microseconds = int(value)
+        if microseconds < 0:
+            raise ValueError('Versión inválida')
+        return CatalogSync.EPOCH + timedelta(microseconds=microseconds)
+
+    @staticmethod
+    def is_expired(since):
+        """La versión es anterior a las eliminaciones conservadas"""
+        return since < timezone.now() - timedelta(days=CatalogSync.TOMBSTONE_DAYS)
+
+    # ===== Lectura =====
+
+    @staticmethod
+    def _products(company, changed_since=None):
+        products = Product.objects.filter(company=company)
+
+        if changed_since is None:
+            products = products.filter(is_active=True)
+        else:
+            products = products.filter(catalog_updated_at__gte=changed_since)
+
+        return list(products.order_by().values(*CatalogSync.PRODUCT_FIELDS))
+
+    @staticmethod
+    def _promotions(company, now, changed_since=None):
+        promotions = Promotion.objects.filter(company=company)
+
+        if changed_since is None:
+            promotions = promotions.filter(is_active=True, end_date__gte=now)
+        else:
+            promotions = promotions.filter(updated_at__gte=changed_since)
+
+        promotions = list(promotions.order_by().values(*CatalogSync.PROMOTION_FIELDS))
+
+        # Productos de todas las promociones en una sola consulta
+        product_ids = {}
+        for promotion_id, product_id in PromotionProduct.objects.filter(
+            promotion_id__in=[promotion['id'] for promotion in promotions]
+        ).values_list('promotion_id', 'product_id'):
+            product_ids.setdefault(promotion_id, []).append(product_id)
+
+        for promotion in promotions:
+            promotion['product_ids'] = product_ids.get(promotion['id'], [])
+
+        return promotions
+
+    @classmethod
+    def fingerprint(cls, company):
+        """Huella del catálogo (cambia con altas, eliminaciones y cambios de catálogo, no de stock)"""
+        return str(cls._get_version('company', company.id))
+
+    @classmethod
+    def invalidate_company(cls, company_id):
+        """Invalidar el catálogo cacheado de la empresa al confirmar la transacción en curso"""
+        cls._bump(cls._version_key('company', company_id))
+
+    @staticmethod
+    def snapshot(company):
+        """
+        Catálogo completo como JSON comprimido con gzip
+        Retorna (huella, bytes); se reutiliza mientras la huella no cambie
+        """
+        etag = CatalogSync.fingerprint(company)
+        key = f"{CatalogSync.KEY_PREFIX}:snapshot:{company.id}:{etag}"
+
+        data = cache.get(key)
+        if data is not None:
+            return etag, data
+
+        now = timezone.now()
+        catalog = {
+            'version': CatalogSync.encode_version(now),
+            'generated_at': now,
+            'products': CatalogSync._products(company),
+            'promotions': CatalogSync._promotions(company, now),
+        }
+
+        data = gzip.compress(
+            json.dumps(catalog, cls=JSONEncoder, separators=(',', ':')).encode('utf-8')
+        )
+        cache.set(key, data, CatalogSync.CACHE_TIMEOUT)
+
+        logger.info(
+            f"[CATALOG] Catálogo generado para {company.id}: {len(catalog['products'])} productos, "
+            f"{len(catalog['promotions'])} promociones, {len(data)} bytes"
+        )
+        return etag, data
+
+    @staticmethod
+    def delta(company, since):
+        """Cambios desde la versión indicada (filas modificadas e ids eliminados)"""
+        now = timezone.now()
+        changed_since = since - CatalogSync.SYNC_OVERLAP
+
+        deleted = {'products': [], 'promotions': []}
+        for entity, object_id in CatalogTombstone.objects.filter(
+            company=company,
+            deleted_at__gte=changed_since
+        ).values_list('entity', 'object_id'):
+            deleted[f"{entity}s"].append(object_id)
+
+        return {
+            'version': CatalogSync.encode_version(now),
+            'since': CatalogSync.encode_version(since),
+            'products': CatalogSync._products(company, changed_since),
+            'promotions': CatalogSync._promotions(company, now, changed_since),
+            'deleted': deleted,
+        }
+
+    # ===== Eliminaciones =====
+
+    @staticmethod
+    def record_deletion(entity, company_id, object_id):
+        CatalogTombstone.objects.create(company_id=company_id, entity=entity, object_id=object_id)
+
+    @staticmethod
+    def purge_tombstones():
+        """Eliminar registros de eliminación más antiguos que la retención"""
+        limit = timezone.now() - timedelta(days=CatalogSync.TOMBSTONE_DAYS)
+        deleted, _ = CatalogTombstone.objects.filter(deleted_at__lt=limit).delete()
+        return deleted
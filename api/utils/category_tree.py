@@ -0,0 +1,113 @@
+# api/utils/category_tree.py
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from api.models import Category, Department, Product
+from api.utils.permission_cache import VersionedCache
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CategoryTree(VersionedCache):
+    """
+    Árbol departamento -> categoría con conteo de productos activos
+
+    Los conteos salen de una sola consulta agrupada por (departamento,
+    categoría); departamentos y categorías se leen con values(). El árbol
+    se cachea por empresa y se invalida por versión al guardar o eliminar
+    productos, categorías o departamentos (y en las escrituras masivas).
+    """
+
+    CACHE_TIMEOUT = 3600
+    KEY_PREFIX = 'category_tree'
+
+    @staticmethod
+    def active_products():
+        """Anotación del conteo de productos activos (departamentos o categorías)"""
+        return Count('products', filter=Q(products__is_active=True))
+
+    # ===== Construcción =====
+
+    @staticmethod
+    def _build(company_id):
+        counts = Product.objects.filter(
+            company_id=company_id,
+            is_active=True
+        ).order_by().values('department_id', 'category_id').annotate(total=Count('id'))
+
+        by_department = {}
+        by_category = {}
+        without_category = {}
+        total_products = 0
+
+        for row in counts:
+            total_products += row['total']
+            if row['department_id'] is not None:
+                by_department[row['department_id']] = by_department.get(row['department_id'], 0) + row['total']
+            if row['category_id'] is not None:
+                by_category[row['category_id']] = by_category.get(row['category_id'], 0) + row['total']
+            elif row['department_id'] is not None:
+                without_category[row['department_id']] = row['total']
+
+        categories = {}
+        for category in Category.objects.filter(
+            company_id=company_id,
+            is_active=True
+        ).order_by('name').values('id', 'name', 'slug', 'description', 'department_id'):
+            categories.setdefault(category['department_id'], []).append({
+                'id': str(category['id']),
+                'name': category['name'],
+                'slug': category['slug'],
+                'description': category['description'],
+                'product_count': by_category.get(category['id'], 0),
+            })
+
+        departments = [
+            {
+                'id': str(department['id']),
+                'name': department['name'],
+                'slug': department['slug'],
+                'description': department['description'],
+                'product_count': by_department.get(department['id'], 0),
+                'categories': categories.get(department['id'], []),
+                'no_category': {
+                    'id': 'no-category',
+                    'name': 'Sin Categoría',
+                    'slug': 'no-category',
+                    'product_count': without_category.get(department['id'], 0),
+                },
+            }
+            for department in Department.objects.filter(
+                company_id=company_id,
+                is_active=True
+            ).order_by('name').values('id', 'name', 'slug', 'description')
+        ]
+
+        return {
+            'total_products': total_products,
+            'departments': departments,
+        }
+
+    # ===== Lectura =====
+
+    @classmethod
+    def get(cls, company_id):
+        """Árbol de navegación de la empresa (desde cache mientras no cambie la versión)"""
+        version = cls._get_version('company', company_id)
+        key = f"{cls.KEY_PREFIX}:tree:{company_id}:{version}"
+
+        tree = cache.get(key)
+        if tree is None:
+            tree = cls._build(company_id)
+            cache.set(key, tree, cls.CACHE_TIMEOUT)
+            logger.debug(f"[CATEGORY_TREE] Árbol generado para {company_id}: {len(tree['departments'])} departamentos")
+
+        return tree
+
+    # ===== Invalidación =====
+
+    @classmethod
+    def invalidate_company(cls, company_id):
+        """Invalidar el árbol cacheado de una empresa"""
+        cls._bump(cls._version_key('company', company_id))
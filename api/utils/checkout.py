@@ -0,0 +1,115 @@
+# api/utils/checkout.py
+
+from django.db.models import Case, When, F, Q
+from django.utils import timezone
+from api.models import Product, SaleItem, SalePayment
+from decimal import Decimal
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CheckoutEngine:
+    """
+    Operaciones por lotes para el cierre de una venta
+
+    Todas las operaciones deben ejecutarse dentro de transaction.atomic().
+    El costo en consultas es constante sin importar el número de líneas.
+    """
+
+    DEFAULT_TAX_RATE = Decimal('19.00')
+
+    @staticmethod
+    def lock_products(company, product_ids):
+        """
+        Bloquear y obtener los productos de la venta en una sola consulta
+
+        Los bloqueos se toman en orden de id para que dos ventas concurrentes
+        con los mismos productos no generen deadlocks.
+        Retorna {str(product_id): product}
+        """
+        products = Product.objects.select_for_update().filter(
+            company=company,
+            id__in=set(product_ids)
+        ).order_by('id')
+
+        return {str(product.id): product for product in products}
+
+    @staticmethod
+    def calculate_line(product, quantity, unit_price, discount_amount=Decimal('0')):
+        """Calcular subtotal, impuesto y total de una línea (impuesto sobre el neto con descuento)"""
+        subtotal = quantity * unit_price
+        net = subtotal - discount_amount
+
+        if product and not product.is_tax_exempt:
+            tax_rate = product.variable_tax_rate or CheckoutEngine.DEFAULT_TAX_RATE
+            tax_amount = net * (tax_rate / 100)
+        else:
+            tax_amount = Decimal('0')
+
+        return {
+            'subtotal': subtotal,
+            'discount_amount': discount_amount,
+            'tax_amount': tax_amount,
+            'total': net + tax_amount,
+        }
+
+    @staticmethod
+    def decrement_stock(quantities):
+        """
+        Descontar stock con un único UPDATE condicional
+
+        quantities: {product_id: cantidad total a descontar}
+        Cada fila solo se actualiza si tiene stock suficiente; retorna False
+        si alguna no se actualizó (la transacción debe revertirse).
+        """
+        if not quantities:
+            return True
+
+        condition = Q()
+        cases = []
+        for product_id, quantity in quantities.items():
+            condition |= Q(id=product_id, stock_units__gte=quantity)
+            cases.append(When(id=product_id, then=F('stock_units') - quantity))
+
+        updated = Product.objects.filter(condition).update(
+            stock_units=Case(*cases, default=F('stock_units')),
+            updated_at=timezone.now()
+        )
+
+        if updated != len(quantities):
+            logger.warning(f"[CHECKOUT] Stock actualizado en {updated} de {len(quantities)} productos")
+            return False
+
+        return True
+
+    @staticmethod
+    def create_items(sale, items):
+        """Crear todas las líneas de la venta en un solo INSERT"""
+        return SaleItem.objects.bulk_create([
+            SaleItem(
+                sale=sale,
+                product=item['product'],
+                quantity=item['quantity'],
+                unit_price=item['unit_price'],
+                subtotal=item['subtotal'],
+                discount_amount=item['discount_amount'],
+                tax_amount=item['tax_amount'],
+                total=item['total'],
+                promotion_id=item.get('promotion_id')
+            )
+            for item in items
+        ])
+
+    @staticmethod
+    def create_payments(sale, payments_data):
+        """Crear todos los pagos de la venta en un solo INSERT"""
+        return SalePayment.objects.bulk_create([
+            SalePayment(
+                sale=sale,
+                payment_method=payment_data['payment_method'],
+                amount=Decimal(str(payment_data['amount'])),
+                reference_number=payment_data.get('reference_number')
+            )
+            for payment_data in payments_data
+        ])
@@ -1,11 +1,18 @@
 # api/utils/excel_handler.py
 
 from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from django.http import HttpResponse
+from openpyxl.utils import get_column_letter
+from django.db.models import Count, Q
+from django.http import HttpResponse, FileResponse
+from django.utils import timezone
 from datetime import datetime
 from io import BytesIO
+from itertools import chain, islice
+from api.utils.product_import import ProductImporter
 import logging
+import tempfile
 
 logger = logging.getLogger(__name__)
 
@@ -49,181 +56,326 @@ class ExcelExporter:
             adjusted_width = min(max_length + 2, 50)  # Máximo 50
             ws.column_dimensions[column_letter].width = adjusted_width
     
+    # ===== Exportación en streaming =====
+    
+    CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    CHUNK_SIZE = 2000  # Filas por lectura de la base de datos
+    WIDTH_SAMPLE_ROWS = 500  # Filas usadas para calcular el ancho de columnas
+    MAX_COLUMN_WIDTH = 50
+    
     @staticmethod
-    def export_products(products, company_name):
-        """Exportar productos a Excel"""
-        wb, ws = ExcelExporter.create_workbook("Productos")
+    def _header_cells(ws, headers):
+        """Celdas del header con estilos (modo write-only)"""
+        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+        header_font = Font(bold=True, color="FFFFFF", size=11)
+        alignment = Alignment(horizontal="center", vertical="center")
+        
+        cells = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.fill = header_fill
+            cell.font = header_font
+            cell.alignment = alignment
+            cells.append(cell)
+        return cells
+    
+    @staticmethod
+    def write_streaming(file, title, headers, rows):
+        """
+        Escribir un libro en modo write-only
+        
+        Las filas se escriben a medida que se leen (el libro no queda en
+        memoria). openpyxl escribe el ancho de columnas antes de la primera
+        fila, así que se calcula con el header y las primeras filas.
+        Retorna la cantidad de filas escritas.
+        """
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title[:31])  # Excel limita a 31 caracteres
+        
+        rows = iter(rows)
+        sample = list(islice(rows, ExcelExporter.WIDTH_SAMPLE_ROWS))
         
-        # Headers
+        widths = [len(str(header)) for header in headers]
+        for row in sample:
+            for idx, value in enumerate(row):
+                widths[idx] = max(widths[idx], len(str(value)))
+        
+        for idx, width in enumerate(widths, start=1):
+            ws.column_dimensions[get_column_letter(idx)].width = min(width + 2, ExcelExporter.MAX_COLUMN_WIDTH)
+        
+        ws.append(ExcelExporter._header_cells(ws, headers))
+        
+        count = 0
+        for row in chain(sample, rows):
+            ws.append(row)
+            count += 1
+        
+        wb.save(file)
+        return count
+    
+    @staticmethod
+    def streaming_response(title, headers, rows, filename_prefix, company_name):
+        """
+        Respuesta HTTP con el libro generado en un archivo temporal
+        
+        El archivo se envía por bloques (FileResponse) y se elimina al
+        cerrarse la respuesta; la memoria usada no depende de la cantidad de filas.
+        """
+        tmp = tempfile.TemporaryFile()
+        try:
+            count = ExcelExporter.write_streaming(tmp, title, headers, rows)
+            tmp.seek(0)
+        except Exception:
+            tmp.close()
+            raise
+        
+        logger.info(f"Excel generado: {title} - {count} filas")
+        
+        response = FileResponse(tmp, content_type=ExcelExporter.CONTENT_TYPE)
+        filename = f"{filename_prefix}_{company_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    # ===== Hojas (título, headers, filas, prefijo de archivo) =====
+    
+    @staticmethod
+    def products_sheet(products):
+        """Hoja de productos (mismo formato que la importación)"""
         headers = [
             'Código de Barras', 'Código Paquete', 'Nombre', 'Departamento',
             'Stock Unidades', 'Stock Mínimo', 'Es Paquete', 'Unidades por Paquete',
             'Precio Unitario', 'Precio Paquete', 'Precio Bandeja',
             'Tiene IVA', 'IVA %', 'Envase Retornable', 'Estado'
         ]
-        ws.append(headers)
-        ExcelExporter.style_header(ws)
-        
-        # Datos
-        for product in products:
-            row = [
-                product.barcode,
-                product.barcode_package or '',
-                product.name,
-                product.department.name if product.department_id else '',
-                float(product.stock_units or 0),
-                float(product.min_stock or 0),
-                'Sí' if product.is_package else 'No',
-                product.units_per_package or '',
-                float(product.unit_price or 0),
-                float(product.package_price) if product.package_price is not None else '',
-                float(product.tray_price) if product.tray_price is not None else '',
-                # IVA
-                'No' if product.is_tax_exempt else 'Sí',
-                float(product.variable_tax_rate or 0) if not product.is_tax_exempt else 0,
-                'Sí' if product.has_returnable_container else 'No',
-                'Activo' if product.is_active else 'Inactivo',
-            ]
-            ws.append(row)
-        
-        ExcelExporter.auto_adjust_columns(ws)
         
-        # Crear respuesta HTTP
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        filename = f"productos_{company_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        def rows():
+            for product in products.iterator(chunk_size=ExcelExporter.CHUNK_SIZE):
+                yield [
+                    product.barcode,
+                    product.barcode_package or '',
+                    product.name,
+                    product.department.name if product.department_id else '',
+                    float(product.stock_units or 0),
+                    float(product.min_stock or 0),
+                    'Sí' if product.is_package else 'No',
+                    product.units_per_package or '',
+                    float(product.unit_price or 0),
+                    float(product.package_price) if product.package_price is not None else '',
+                    float(product.tray_price) if product.tray_price is not None else '',
+                    # IVA
+                    'No' if product.is_tax_exempt else 'Sí',
+                    float(product.variable_tax_rate or 0) if not product.is_tax_exempt else 0,
+                    'Sí' if product.has_returnable_container else 'No',
+                    'Activo' if product.is_active else 'Inactivo',
+                ]
         
-        wb.save(response)
-        return response
+        return "Productos", headers, rows(), "productos"
     
     @staticmethod
-    def export_departments(departments, company_name):
-        """Exportar departamentos a Excel"""
-        wb, ws = ExcelExporter.create_workbook("Departamentos")
-        
+    def departments_sheet(departments):
+        """Hoja de departamentos"""
         headers = ['Nombre', 'Descripción', 'Cantidad Productos', 'Estado']
-        ws.append(headers)
-        ExcelExporter.style_header(ws)
-        
-        for dept in departments:
-            row = [
-                dept.name,
-                dept.description or '',
-                dept.products.filter(is_active=True).count(),
-                'Activo' if dept.is_active else 'Inactivo'
-            ]
-            ws.append(row)
-        
-        ExcelExporter.auto_adjust_columns(ws)
         
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        # Conteo de productos activos en la misma consulta
+        departments = departments.annotate(
+            active_products=Count('products', filter=Q(products__is_active=True))
         )
-        filename = f"departamentos_{company_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
         
-        wb.save(response)
-        return response
+        def rows():
+            for dept in departments.iterator(chunk_size=ExcelExporter.CHUNK_SIZE):
+                yield [
+                    dept.name,
+                    dept.description or '',
+                    dept.active_products,
+                    'Activo' if dept.is_active else 'Inactivo'
+                ]
+        
+        return "Departamentos", headers, rows(), "departamentos"
     
     @staticmethod
-    def export_clients(clients, company_name):
-        """Exportar clientes a Excel"""
-        wb, ws = ExcelExporter.create_workbook("Clientes")
-        
+    def clients_sheet(clients):
+        """Hoja de clientes"""
         headers = [
             'RUT', 'Nombre', 'Apellido', 'Teléfono', 'Email', 'Dirección',
             'Tiene Crédito', 'Límite Crédito', 'Deuda Actual',
             'Tiene Descuento', 'Descuento %', 'Estado'
         ]
-        ws.append(headers)
-        ExcelExporter.style_header(ws)
-        
-        for client in clients:
-            row = [
-                client.rut,
-                client.first_name,
-                client.last_name,
-                client.phone or '',
-                client.email or '',
-                client.address or '',
-                'Sí' if client.has_credit else 'No',
-                float(client.credit_limit) if client.credit_limit else 'Ilimitado',
-                float(client.current_debt),
-                'Sí' if client.has_discount else 'No',
-                float(client.discount_percentage) if client.has_discount else 0,
-                'Activo' if client.is_active else 'Inactivo'
-            ]
-            ws.append(row)
         
-        ExcelExporter.auto_adjust_columns(ws)
+        def rows():
+            for client in clients.iterator(chunk_size=ExcelExporter.CHUNK_SIZE):
+                yield [
+                    client.rut,
+                    client.first_name,
+                    client.last_name,
+                    client.phone or '',
+                    client.email or '',
+                    client.address or '',
+                    'Sí' if client.has_credit else 'No',
+                    float(client.credit_limit) if client.credit_limit else 'Ilimitado',
+                    float(client.current_debt),
+                    'Sí' if client.has_discount else 'No',
+                    float(client.discount_percentage) if client.has_discount else 0,
+                    'Activo' if client.is_active else 'Inactivo'
+                ]
         
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        filename = f"clientes_{company_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return "Clientes", headers, rows(), "clientes"
+    
+    @staticmethod
+    def credits_sheet(credits):
+        """Hoja de créditos (credits con select_related('client', 'sale'))"""
+        headers = [
+            'Cliente', 'RUT', 'Teléfono', 'Dirección', 'Monto Total', 'Monto Pagado',
+            'Saldo Pendiente', 'Estado', 'Fecha Crédito', 'Fecha Vencimiento',
+            'Días Atraso', 'Número Venta'
+        ]
+        today = timezone.now().date()
         
-        wb.save(response)
-        return response
+        def rows():
+            for credit in credits.iterator(chunk_size=ExcelExporter.CHUNK_SIZE):
+                client = credit.client
+                
+                # Calcular días de atraso
+                days_overdue = 0
+                if credit.status in ['pending', 'partial'] and credit.due_date and today > credit.due_date:
+                    days_overdue = (today - credit.due_date).days
+                
+                yield [
+                    f"{client.first_name} {client.last_name}",
+                    client.rut,
+                    client.phone or '',
+                    client.address or '',
+                    float(credit.total_amount),
+                    float(credit.paid_amount),
+                    float(credit.remaining_amount),
+                    credit.get_status_display(),
+                    credit.created_at.strftime('%Y-%m-%d'),
+                    credit.due_date.strftime('%Y-%m-%d') if credit.due_date else '',
+                    days_overdue,
+                    credit.sale.sale_number if credit.sale else ''
+                ]
+        
+        return "Créditos", headers, rows(), "creditos"
+    
+    @staticmethod
+    def suppliers_sheet(suppliers):
+        """Hoja de proveedores (suppliers anotados con SupplierAggregates.annotate)"""
+        headers = [
+            'Nombre', 'Representante', 'Teléfono 1', 'Teléfono 2', 'Email 1', 'Email 2',
+            'Sitio Web', 'Dirección', 'Órdenes Pendientes', 'Deuda Total', 'Fecha Creación'
+        ]
+        
+        def rows():
+            for supplier in suppliers.iterator(chunk_size=ExcelExporter.CHUNK_SIZE):
+                yield [
+                    supplier.name,
+                    supplier.representative or '',
+                    supplier.phone_1 or '',
+                    supplier.phone_2 or '',
+                    supplier.email_1 or '',
+                    supplier.email_2 or '',
+                    supplier.website or '',
+                    supplier.address or '',
+                    supplier.pending_count,
+                    float(supplier.debt_amount),
+                    supplier.created_at.strftime('%Y-%m-%d %H:%M')
+                ]
+        
+        return "Proveedores", headers, rows(), "proveedores"
+    
+    @staticmethod
+    def purchase_orders_sheet(orders):
+        """Hoja de órdenes de compra (orders con select_related('supplier', 'created_by'))"""
+        headers = [
+            'Número Orden', 'Proveedor', 'Total', 'Pagado', 'Pendiente',
+            'Estado', 'Creado Por', 'Fecha Creación', 'Notas'
+        ]
+        
+        def rows():
+            for order in orders.iterator(chunk_size=ExcelExporter.CHUNK_SIZE):
+                yield [
+                    order.order_number,
+                    order.supplier.name,
+                    float(order.total_amount),
+                    float(order.paid_amount),
+                    float(order.total_amount - order.paid_amount),
+                    order.get_status_display(),
+                    order.created_by.username,
+                    order.created_at.strftime('%Y-%m-%d %H:%M'),
+                    order.notes or ''
+                ]
+        
+        return "Órdenes de Compra", headers, rows(), "ordenes_compra"
+    
+    # ===== Respuestas HTTP =====
+    
+    @staticmethod
+    def export_products(products, company_name):
+        """Exportar productos a Excel"""
+        return ExcelExporter.streaming_response(*ExcelExporter.products_sheet(products), company_name)
+    
+    @staticmethod
+    def export_departments(departments, company_name):
+        """Exportar departamentos a Excel"""
+        return ExcelExporter.streaming_response(*ExcelExporter.departments_sheet(departments), company_name)
+    
+    @staticmethod
+    def export_clients(clients, company_name):
+        """Exportar clientes a Excel"""
+        return ExcelExporter.streaming_response(*ExcelExporter.clients_sheet(clients), company_name)
+    
+    @staticmethod
+    def export_credits(credits, company_name):
+        """Exportar créditos a Excel"""
+        return ExcelExporter.streaming_response(*ExcelExporter.credits_sheet(credits), company_name)
+    
+    @staticmethod
+    def export_suppliers(suppliers, company_name):
+        """Exportar proveedores a Excel"""
+        return ExcelExporter.streaming_response(*ExcelExporter.suppliers_sheet(suppliers), company_name)
+    
+    @staticmethod
+    def export_purchase_orders(orders, company_name):
+        """Exportar órdenes de compra a Excel"""
+        return ExcelExporter.streaming_response(*ExcelExporter.purchase_orders_sheet(orders), company_name)
 
 
 class ExcelImporter:
     """Importador de datos desde Excel"""
     
     @staticmethod
-    def import_products(file, company, department_map):
-        """Importar productos desde Excel"""
+    def iter_rows(wb, min_row=2):
+        """
+        Filas de la hoja activa en modo read-only, sin las filas vacías
+        Genera (número de fila, valores)
+        """
+        ws = wb.active
+        for idx, row in enumerate(ws.iter_rows(min_row=min_row, values_only=True), start=min_row):
+            if row and any(value not in (None, '') for value in row):
+                yield idx, row
+    
+    @staticmethod
+    def import_products(file, company, department_map, progress=None):
+        """
+        Importar productos desde Excel (crea o actualiza por código de barras)
+        progress: callback opcional (filas procesadas, total estimado)
+        Retorna {'created', 'updated', 'unchanged', 'errors'}
+        """
         try:
-            wb = load_workbook(file)
-            ws = wb.active
-            
-            products_data = []
-            errors = []
-            
-            # Saltar header (fila 1)
-            for idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-                try:
-                    # Validar que tenga al menos los datos básicos
-                    if not row[0] or not row[2]:  # Barcode y Nombre
-                        errors.append(f"Fila {idx}: Falta código de barras o nombre")
-                        continue
-                    
-                    product_data = {
-                        'barcode': str(row[0]).strip(),
-                        'barcode_package': str(row[1]).strip() if row[1] else None,
-                        'name': str(row[2]).strip(),
-                        'department_name': str(row[3]).strip() if row[3] else None,
-                        'stock_units': float(row[4]) if row[4] else 0,
-                        'min_stock': float(row[5]) if row[5] else 0,
-                        'is_package': str(row[6]).lower() in ['sí', 'si', 'yes', 'true', '1'] if row[6] else False,
-                        'units_per_package': int(row[7]) if row[7] else None,
-                        'price_unit': float(row[8]) if row[8] else 0,
-                        'price_package': float(row[9]) if row[9] else None,
-                        'price_tray': float(row[10]) if row[10] else None,
-                        'is_tax_exempt': str(row[11]).lower() in ['no', 'false', '0'] if row[11] else False,
-                        'tax_percentage': float(row[12]) if row[12] else 19,
-                        'has_returnable_container': str(row[13]).lower() in ['sí', 'si', 'yes', 'true', '1'] if row[13] else False,
-                        'company': company
-                    }
-                    
-                    products_data.append(product_data)
-                    
-                except Exception as e:
-                    errors.append(f"Fila {idx}: Error al procesar - {str(e)}")
-                    logger.error(f"Error importando fila {idx}: {str(e)}")
-            
-            return {
-                'success': len(products_data),
-                'products': products_data,
-                'errors': errors
-            }
-            
+            wb = load_workbook(file, read_only=True, data_only=True)
         except Exception as e:
             logger.error(f"Error al importar Excel: {str(e)}")
             return {
-                'success': 0,
-                'products': [],
+                'created': 0,
+                'updated': 0,
+                'unchanged': 0,
                 'errors': [f"Error al leer archivo: {str(e)}"]
-            }
\ No newline at end of file
+            }
+        
+        try:
+            total = max((wb.active.max_row or 1) - 1, 0)
+            return ProductImporter.import_rows(
+                ExcelImporter.iter_rows(wb), company, department_map,
+                progress=(lambda done: progress(done, total)) if progress else None
+            )
+        finally:
+            wb.close()
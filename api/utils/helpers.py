@@ -86,16 +86,25 @@ class StockCalculator:
     @staticmethod
     def format_stock_display(product):
         """Formatear display de stock según configuración"""
-        stock_units = product.stock_units or Decimal('0')
+        return StockCalculator.stock_display(
+            product.stock_units,
+            product.is_package,
+            product.units_per_package
+        )
+
+    @staticmethod
+    def stock_display(stock_units, is_package, units_per_package):
+        """Display de stock a partir de los valores (sin instancia del producto)"""
+        stock_units = stock_units or Decimal('0')
 
         stock_units_int = int(stock_units)
 
-        if not product.is_package or not product.units_per_package:
+        if not is_package or not units_per_package:
             return f"{stock_units_int} unidades"
 
         packages, remaining = StockCalculator.calculate_packages(
             stock_units,
-            product.units_per_package
+            units_per_package
         )
 
         packages = int(packages)
@@ -0,0 +1,141 @@
+# api/utils/inventory_valuation.py
+
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from api.models import Department, Product
+from api.utils.permission_cache import VersionedCache
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class InventoryValuation(VersionedCache):
+    """
+    Valorización de inventario calculada en la base de datos
+
+    Totales y desglose por departamento salen de una consulta agrupada
+    (stock_units * cost_price). El detalle se lee con values().iterator()
+    sin cargar instancias. El resumen de la empresa se cachea con una
+    versión por empresa (VersionedCache) que se incrementa al confirmar
+    cambios de productos (incluido el stock) o departamentos: señales y
+    los UPDATE masivos de checkout, reinicio y cargas de stock.
+    """
+
+    CACHE_TIMEOUT = 3600
+    KEY_PREFIX = 'inventory'
+    CHUNK_SIZE = 2000
+
+    DETAIL_FIELDS = [
+        'barcode', 'name', 'stock_units', 'min_stock', 'unit_price', 'cost_price',
+        'is_package', 'units_per_package',
+    ]
+
+    ZERO = Value(0, output_field=DecimalField(max_digits=20, decimal_places=0))
+
+    @staticmethod
+    def _value(prefix=''):
+        return ExpressionWrapper(
+            F(f'{prefix}stock_units') * F(f'{prefix}cost_price'),
+            output_field=DecimalField(max_digits=20, decimal_places=0)
+        )
+
+    # ===== Cálculo =====
+
+    @staticmethod
+    def summary(products):
+        """Cantidad, valor total y productos con stock bajo de un queryset de productos"""
+        totals = products.order_by().aggregate(
+            total_products=Count('id'),
+            total_stock_value=Coalesce(Sum(InventoryValuation._value()), InventoryValuation.ZERO),
+            products_with_low_stock=Count('id', filter=Q(stock_units__lte=F('min_stock')))
+        )
+
+        return {
+            'total_products': totals['total_products'],
+            'total_stock_value': float(totals['total_stock_value']),
+            'products_with_low_stock': totals['products_with_low_stock']
+        }
+
+    @staticmethod
+    def by_department(company):
+        """Totales por departamento activo (productos activos) en una consulta agrupada"""
+        active = Q(products__is_active=True)
+
+        departments = Department.objects.filter(
+            company=company,
+            is_active=True
+        ).annotate(
+            total_products=Count('products', filter=active),
+            total_stock_value=Coalesce(
+                Sum(InventoryValuation._value('products__'), filter=active),
+                InventoryValuation.ZERO
+            ),
+            low_stock_products=Count(
+                'products',
+                filter=active & Q(products__stock_units__lte=F('products__min_stock'))
+            )
+        ).order_by('name').values('id', 'name', 'total_products', 'total_stock_value', 'low_stock_products')
+
+        return [
+            {
+                'department_id': str(department['id']),
+                'department_name': department['name'],
+                'total_products': department['total_products'],
+                'total_stock_value': float(department['total_stock_value']),
+                'low_stock_products': department['low_stock_products']
+            }
+            for department in departments
+        ]
+
+    @staticmethod
+    def rows(products):
+        """Detalle por producto (generador, sin instanciar modelos)"""
+        detail = products.annotate(
+            department_name=F('department__name'),
+            stock_value=InventoryValuation._value()
+        ).values('department_name', 'stock_value', *InventoryValuation.DETAIL_FIELDS)
+
+        for product in detail.iterator(chunk_size=InventoryValuation.CHUNK_SIZE):
+            yield {
+                'department': product['department_name'],
+                'barcode': product['barcode'],
+                'name': product['name'],
+                'stock_units': float(product['stock_units']),
+                'min_stock': float(product['min_stock']),
+                'unit_price': float(product['unit_price']),
+                'cost_price': float(product['cost_price']),
+                'stock_value': float(product['stock_value']),
+                'status': 'BAJO' if product['stock_units'] <= product['min_stock'] else 'OK',
+                'is_package': product['is_package'],
+                'units_per_package': product['units_per_package']
+            }
+
+    # ===== Snapshot cacheado =====
+
+    @classmethod
+    def invalidate_company(cls, company_id):
+        """Invalidar la valorización cacheada de la empresa al confirmar la transacción en curso"""
+        cls._bump(cls._version_key('company', company_id))
+
+    @classmethod
+    def snapshot(cls, company):
+        """Resumen de la empresa y desglose por departamento, cacheados mientras no cambie la versión"""
+        key = f"{cls.KEY_PREFIX}:snapshot:{company.id}:{cls._get_version('company', company.id)}"
+
+        snapshot = cache.get(key)
+        if snapshot is not None:
+            return snapshot
+
+        snapshot = {
+            'calculated_at': timezone.now().isoformat(),
+            'summary': InventoryValuation.summary(
+                Product.objects.filter(company=company, is_active=True)
+            ),
+            'departments': InventoryValuation.by_department(company),
+        }
+        cache.set(key, snapshot, InventoryValuation.CACHE_TIMEOUT)
+
+        logger.debug(f"[INVENTORY] Valorización calculada para {company.id}")
+        return snapshot
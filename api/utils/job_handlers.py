@@ -0,0 +1,285 @@
+# api/utils/job_handlers.py
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from api.models import Product, Department, Client, Credit, PurchaseOrder
+from api.utils.excel_handler import ExcelExporter, ExcelImporter
+from api.utils.inventory_valuation import InventoryValuation
+from api.utils.stock_audit import StockAuditLog
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+from datetime import datetime
+import json
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+
+class JobHandlers:
+    """
+    Tareas ejecutables en segundo plano
+
+    Cada método se llama igual que su job_type (BackgroundJob.JOB_TYPES),
+    recibe (job, context) y retorna un dict JSON con el resultado.
+    """
+
+    @staticmethod
+    def get(job_type):
+        return getattr(JobHandlers, job_type)
+
+    # ===== Helpers =====
+
+    @staticmethod
+    def _scope(queryset, user):
+        """Master Admin exporta de todas las companies"""
+        if user.role.name == 'master_admin':
+            return queryset, "Todas las empresas"
+        return queryset.filter(company=user.company), user.company.name
+
+    @staticmethod
+    def _write_sheet(context, sheet, total, company_name):
+        """Escribir una hoja de ExcelExporter como archivo de resultado"""
+        title, headers, rows, prefix = sheet
+        filename = f"{prefix}_{company_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+
+        with tempfile.TemporaryFile() as tmp:
+            count = ExcelExporter.write_streaming(
+                tmp, title, headers,
+                context.track(rows, total, f"Exportando {title.lower()}")
+            )
+            context.save_file(tmp, filename)
+
+        return {'rows': count, 'filename': filename}
+
+    # ===== Importaciones =====
+
+    @staticmethod
+    def product_import(job, context):
+        """Importar productos desde el Excel subido (params: file)"""
+        departments = Department.objects.filter(company=job.company, is_active=True)
+        department_map = {dept.name.lower(): dept for dept in departments}
+
+        def progress(done, total):
+            context.progress(done, total, 'Importando productos')
+
+        with default_storage.open(job.params['file'], 'rb') as file:
+            return ExcelImporter.import_products(file, job.company, department_map, progress=progress)
+
+    # ===== Exportaciones =====
+
+    @staticmethod
+    def product_export(job, context):
+        products, company_name = JobHandlers._scope(
+            Product.objects.filter(is_active=True),
+            job.created_by
+        )
+        products = products.select_related('department').order_by('name')
+
+        return JobHandlers._write_sheet(
+            context, ExcelExporter.products_sheet(products), products.count(), company_name
+        )
+
+    @staticmethod
+    def client_export(job, context):
+        clients, company_name = JobHandlers._scope(
+            Client.objects.filter(is_active=True),
+            job.created_by
+        )
+        clients = clients.order_by('first_name', 'last_name')
+
+        return JobHandlers._write_sheet(
+            context, ExcelExporter.clients_sheet(clients), clients.count(), company_name
+        )
+
+    @staticmethod
+    def department_export(job, context):
+        departments, company_name = JobHandlers._scope(
+            Department.objects.filter(is_active=True),
+            job.created_by
+        )
+        departments = departments.order_by('name')
+
+        return JobHandlers._write_sheet(
+            context, ExcelExporter.departments_sheet(departments), departments.count(), company_name
+        )
+
+    @staticmethod
+    def credit_export(job, context):
+        """Exportar créditos (params: status, client_id, overdue)"""
+        params = job.params
+        credits = Credit.objects.filter(
+            client__company=job.company
+        ).select_related('client', 'sale')
+
+        if params.get('status'):
+            credits = credits.filter(status=params['status'])
+        if params.get('client_id'):
+            credits = credits.filter(client_id=params['client_id'])
+        if str(params.get('overdue', '')).lower() == 'true':
+            credits = credits.filter(
+                Q(status='pending') | Q(status='partial'),
+                due_date__lt=timezone.now().date()
+            )
+
+        credits = credits.order_by('-created_at')
+
+        return JobHandlers._write_sheet(
+            context, ExcelExporter.credits_sheet(credits), credits.count(), job.company.name
+        )
+
+    @staticmethod
+    def purchase_order_export(job, context):
+        """Exportar órdenes de compra (params: supplier_id, status)"""
+        params = job.params
+        orders = PurchaseOrder.objects.filter(
+            company=job.company
+        ).select_related('supplier', 'created_by')
+
+        if params.get('supplier_id'):
+            orders = orders.filter(supplier_id=params['supplier_id'])
+        if params.get('status'):
+            orders = orders.filter(status=params['status'])
+
+        orders = orders.order_by('-created_at')
+
+        return JobHandlers._write_sheet(
+            context, ExcelExporter.purchase_orders_sheet(orders), orders.count(), job.company.name
+        )
+
+    # ===== Reportes =====
+
+    @staticmethod
+    def _report_views():
+        """Reportes que se pueden pedir con async=true: nombre -> (ruta, vista)"""
+        # Import diferido: las vistas importan JobQueue
+        from api.views import reports_views, reports_complete_views
+
+        return {
+            'sales': ('/api/reports/sales/', reports_views.sales_report),
+            'cash_flow': ('/api/reports/cash-flow/', reports_views.cash_flow_report),
+            'inventory': ('/api/reports/inventory/', reports_complete_views.inventory_report),
+            'financial_projection': ('/api/reports/financial-projection/', reports_complete_views.financial_projection_report),
+        }
+
+    @staticmethod
+    def report(job, context):
+        """
+        Ejecutar un reporte pesado (params: report, query)
+
+        Se ejecuta la misma vista con los filtros del request original y
+        los permisos de quien lo pidió; el resultado JSON queda en
+        job.result (o el Excel como archivo de resultado).
+        """
+        path, view = JobHandlers._report_views()[job.params['report']]
+        query = {key: value for key, value in (job.params.get('query') or {}).items() if key != 'async'}
+
+        context.progress(0, message='Generando reporte')
+
+        request = APIRequestFactory().get(path, query)
+        force_authenticate(request, user=job.created_by)
+        response = view(request)
+
+        if response.status_code >= 400:
+            raise ValueError(response.data.get('error', f"Error {response.status_code}"))
+
+        if isinstance(response.data, bytes):
+            filename = response['Content-Disposition'].split('filename=')[-1].strip('"')
+            with tempfile.TemporaryFile() as tmp:
+                tmp.write(response.data)
+                context.save_file(tmp, filename)
+            return {'filename': filename}
+
+        return json.loads(JSONRenderer().render(response.data))
+
+    # ===== Stock =====
+
+    RESET_CHUNK_SIZE = 2000
+
+    @staticmethod
+    def reset_company_stock(company, user, reason, ip_address=None, user_agent='', progress=None):
+        """
+        Reiniciar a 0 el stock de los productos activos de la empresa
+        registrando el stock anterior de cada producto en la auditoría
+
+        Los productos se procesan en bloques por id, cada uno en su propia
+        transacción (bloquear, auditar y reiniciar). El progreso se informa
+        entre bloques, fuera de las transacciones de datos, para no dejar
+        bloqueada la fila de la tarea. Si la tarea se cancela o falla, la
+        auditoría registra los productos ya reiniciados.
+        """
+        products = Product.objects.filter(
+            company=company,
+            is_active=True
+        ).exclude(stock_units=0)
+        
+        total = products.count()
+        
+        audit = StockAuditLog.start(
+            company, 'reset', f"Reinicio completo de stock. Razón: {reason}", user,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            after_data={'stock_units': 0},
+            requires_approval=False,
+            approved=True,
+            approved_by=user
+        )
+        
+        affected_count = 0
+        last_id = None
+        
+        try:
+            while True:
+                with transaction.atomic():
+                    chunk = products.select_for_update().order_by('id')
+                    if last_id is not None:
+                        chunk = chunk.filter(id__gt=last_id)
+                    
+                    # Guardar estado antes del cambio
+                    rows = list(chunk.values_list('id', 'stock_units')[:JobHandlers.RESET_CHUNK_SIZE])
+                    if not rows:
+                        break
+                    
+                    StockAuditLog.add_lines(audit, [(product_id, stock_units, 0) for product_id, stock_units in rows])
+                    
+                    # Reiniciar stock
+                    affected_count += Product.objects.filter(
+                        id__in=[product_id for product_id, _ in rows]
+                    ).update(stock_units=0, updated_at=timezone.now())
+                    InventoryValuation.invalidate_company(company.id)
+                
+                last_id = rows[-1][0]
+                
+                if progress:
+                    progress(affected_count, total)
+        finally:
+            StockAuditLog.finish(audit, affected_count)
+        
+        logger.warning(
+            f"⚠️ STOCK REINICIADO: {affected_count} productos afectados. "
+            f"Realizado por: {user.email}. Razón: {reason}"
+        )
+        
+        return {
+            'audit_id': str(audit.id),
+            'affected_products': affected_count
+        }
+
+    @staticmethod
+    def stock_reset(job, context):
+        """Reinicio de stock (params: reason, ip_address, user_agent)"""
+        params = job.params
+
+        def progress(done, total):
+            context.progress(done, total, 'Reiniciando stock')
+
+        return JobHandlers.reset_company_stock(
+            job.company,
+            job.created_by,
+            params.get('reason', ''),
+            ip_address=params.get('ip_address'),
+            user_agent=params.get('user_agent', ''),
+            progress=progress
+        )
@@ -1,11 +1,19 @@
 # api/utils/pagination.py
 
+from django.db.models import Q
 from rest_framework.response import Response
 from math import ceil
+import base64
+import json
 
 class Paginator:
     """
     Utilidad para paginar querysets de Django
+    
+    Dos modos:
+    - Por páginas (page, page_size): COUNT + OFFSET, permite saltar a una página
+    - Por cursor (cursor, page_size): keyset sobre un orden único, tiempo
+      constante por página (scroll infinito); el total es opcional (count=true)
     """
     
     @staticmethod
@@ -14,7 +22,7 @@ class Paginator:
         Pagina un queryset basado en los parámetros de la request
         
         Args:
-            queryset: QuerySet de Django a paginar
+            queryset: QuerySet de Django (o lista) a paginar
             request: Request object de DRF
             default_page_size: Tamaño de página por defecto (50)
             max_page_size: Tamaño máximo permitido (500)
@@ -25,22 +33,17 @@ class Paginator:
         # Obtener parámetros de paginación
         try:
             page = int(request.GET.get('page', 1))
-            page_size = int(request.GET.get('page_size', default_page_size))
         except (ValueError, TypeError):
             page = 1
-            page_size = default_page_size
         
         # Validar parámetros
         if page < 1:
             page = 1
         
-        if page_size < 1:
-            page_size = default_page_size
-        elif page_size > max_page_size:
-            page_size = max_page_size
+        page_size = Paginator.page_size(request, default_page_size, max_page_size)
         
-        # Contar total de items
-        total_items = queryset.count()
+        # Contar total de items (también acepta listas)
+        total_items = len(queryset) if isinstance(queryset, list) else queryset.count()
         
         # Calcular total de páginas
         total_pages = ceil(total_items / page_size) if total_items > 0 else 1
@@ -84,7 +87,146 @@ class Paginator:
         }
     
     @staticmethod
-    def paginate_response(queryset, request, serializer_class, default_page_size=50, max_page_size=500):
+    def page_size(request, default_page_size=50, max_page_size=500, param='page_size'):
+        """
+        Tamaño de página pedido en la request (param), validado
+        
+        Un valor inválido o menor a 1 usa default_page_size;
+        uno mayor a max_page_size se limita a ese máximo
+        """
+        try:
+            page_size = int(request.GET.get(param, default_page_size))
+        except (ValueError, TypeError):
+            page_size = default_page_size
+        
+        if page_size < 1:
+            page_size = default_page_size
+        return min(page_size, max_page_size)
+    
+    # ===== Cursor (keyset) =====
+    
+    @staticmethod
+    def encode_cursor(values, reverse=False):
+        """Token opaco con los valores de orden de un item"""
+        raw = json.dumps({'v': values, 'r': reverse}, default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(token, queryset, ordering):
+        """
+        Valores de orden (convertidos al tipo de cada campo) y dirección de un token
+        ValueError si el token no es válido
+        """
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            data = json.loads(raw)
+            values = data['v']
+            reverse = bool(data['r'])
+        except (ValueError, TypeError, KeyError):
+            raise ValueError('Cursor inválido')
+        
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise ValueError('Cursor inválido')
+        
+        model = queryset.model
+        try:
+            values = [
+                model._meta.get_field(key.lstrip('-')).to_python(value)
+                for key, value in zip(ordering, values)
+            ]
+        except Exception:
+            raise ValueError('Cursor inválido')
+        
+        return values, reverse
+    
+    @staticmethod
+    def _after(ordering, values, reverse=False):
+        """
+        Condición "después de values" según el orden
+        (k1 > v1) OR (k1 = v1 AND k2 > v2) ... con > o < según la dirección
+        """
+        condition = Q()
+        equal = Q()
+        
+        for key, value in zip(ordering, values):
+            field = key.lstrip('-')
+            descending = key.startswith('-') != reverse
+            condition |= equal & Q(**{f"{field}__{'lt' if descending else 'gt'}": value})
+            equal &= Q(**{field: value})
+        
+        return condition
+    
+    @staticmethod
+    def _url(request, **params):
+        query_params = request.GET.copy()
+        for key, value in params.items():
+            query_params[key] = value
+        return f"{request.build_absolute_uri(request.path)}?{query_params.urlencode()}"
+    
+    @staticmethod
+    def paginate_cursor(queryset, request, ordering, default_page_size=50, max_page_size=500):
+        """
+        Pagina un queryset por cursor (keyset)
+        
+        Args:
+            queryset: QuerySet de Django a paginar
+            request: Request object de DRF (cursor vacío = primera página)
+            ordering: Orden único y sin nulos, ej: ['-sale_date', '-id']
+            
+        Returns:
+            dict con los datos paginados y tokens next_cursor / previous_cursor
+            (count solo si se pide count=true)
+        
+        Raises:
+            ValueError si el cursor no es válido
+        """
+        page_size = Paginator.page_size(request, default_page_size, max_page_size)
+        token = request.GET.get('cursor')
+        
+        count = None
+        if request.GET.get('count', '').lower() == 'true':
+            count = queryset.count()
+        
+        reverse = False
+        page = queryset.order_by(*ordering)
+        
+        if token:
+            values, reverse = Paginator.decode_cursor(token, queryset, ordering)
+            if reverse:
+                inverted = [key[1:] if key.startswith('-') else f'-{key}' for key in ordering]
+                page = queryset.order_by(*inverted)
+            page = page.filter(Paginator._after(ordering, values, reverse))
+        
+        # Un item extra indica si hay más en esa dirección
+        items = list(page[:page_size + 1])
+        has_more = len(items) > page_size
+        items = items[:page_size]
+        
+        if reverse:
+            items.reverse()
+        
+        def key_values(item):
+            return [getattr(item, key.lstrip('-')) for key in ordering]
+        
+        has_next = has_more if not reverse else bool(token)
+        has_previous = has_more if reverse else bool(token)
+        
+        next_cursor = Paginator.encode_cursor(key_values(items[-1])) if items and has_next else None
+        previous_cursor = Paginator.encode_cursor(key_values(items[0]), reverse=True) if items and has_previous else None
+        
+        return {
+            'count': count,
+            'page_size': page_size,
+            'next_cursor': next_cursor,
+            'previous_cursor': previous_cursor,
+            'next': Paginator._url(request, cursor=next_cursor, page_size=page_size) if next_cursor else None,
+            'previous': Paginator._url(request, cursor=previous_cursor, page_size=page_size) if previous_cursor else None,
+            'results': items
+        }
+    
+    @staticmethod
+    def paginate_response(queryset, request, serializer_class, default_page_size=50, max_page_size=500,
+                          extra_data=None, cursor_ordering=None):
         """
         Pagina un queryset y devuelve una Response serializada
         
@@ -94,19 +236,37 @@ class Paginator:
             serializer_class: Clase del serializer a usar
             default_page_size: Tamaño de página por defecto
             max_page_size: Tamaño máximo permitido
+            extra_data: dict opcional que se agrega a la respuesta
+            cursor_ordering: Orden único que habilita el modo cursor
+                (?cursor= en la request), ej: ['-sale_date', '-id']
             
         Returns:
             Response de DRF con datos paginados
         """
-        paginated_data = Paginator.paginate(
-            queryset, 
-            request, 
-            default_page_size, 
-            max_page_size
-        )
+        if cursor_ordering and 'cursor' in request.GET:
+            try:
+                paginated_data = Paginator.paginate_cursor(
+                    queryset,
+                    request,
+                    cursor_ordering,
+                    default_page_size,
+                    max_page_size
+                )
+            except ValueError as e:
+                return Response({'error': str(e)}, status=400)
+        else:
+            paginated_data = Paginator.paginate(
+                queryset, 
+                request, 
+                default_page_size, 
+                max_page_size
+            )
         
         # Serializar los resultados
         serializer = serializer_class(paginated_data['results'], many=True)
         paginated_data['results'] = serializer.data
         
+        if extra_data:
+            paginated_data = {**extra_data, **paginated_data}
+        
         return Response(paginated_data)
\ No newline at end of file
@@ -0,0 +1,259 @@
+# api/utils/permission_cache.py
+
+from django.core.cache import cache
+from django.db import transaction
+from api.models import Page, RolePageAccess, UserPageAccess, RolePermission, UserPermission
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class VersionedCache:
+    """
+    Base para caches de acceso invalidados por versión
+
+    Cada namespace mantiene tres contadores en el cache de Django:
+    global, por rol y por usuario. Las entradas cacheadas incluyen las
+    versiones con que se construyeron, así que al incrementar un contador
+    las entradas antiguas dejan de coincidir sin tener que borrarlas.
+
+    Los contadores se leen del cache compartido y cada proceso los reutiliza
+    durante VERSION_TTL segundos, así que una invalidación llega a todos los
+    workers en ese plazo (al proceso que la hace, de inmediato). Eso
+    requiere que CACHES sea compartido (Redis o DatabaseCache, ver
+    settings); con LocMem cada proceso solo vería sus propias invalidaciones.
+    """
+
+    CACHE_TIMEOUT = 300  # 5 minutos
+    VERSION_TTL = 5  # segundos que un proceso reutiliza las versiones leídas
+    KEY_PREFIX = None
+
+    # Versiones leídas por el proceso: {llave: (versión, expires_at)}
+    _versions = {}
+
+    @classmethod
+    def _version_key(cls, scope, identifier=''):
+        return f"{cls.KEY_PREFIX}:v:{scope}:{identifier}"
+
+    @staticmethod
+    def _bump(key):
+        # Después del commit: si se incrementa antes, otro worker puede
+        # recargar los datos sin confirmar y dejarlos cacheados con la
+        # versión nueva
+        transaction.on_commit(lambda: VersionedCache._incr(key))
+
+    @staticmethod
+    def _incr(key):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # La llave no existe todavía (o expiró del cache)
+            cache.set(key, VersionedCache._seed(), None)
+        # El proceso que invalida no espera a que expire su copia
+        VersionedCache._versions.pop(key, None)
+
+    @staticmethod
+    def _seed():
+        # Valor inicial distinto de cualquier versión anterior de la llave
+        return time.time_ns() // 1000
+
+    @staticmethod
+    def _read_versions(keys):
+        """
+        Versiones actuales de las llaves (tupla en el mismo orden)
+
+        Se reutilizan las leídas por el proceso hace menos de VERSION_TTL
+        segundos; las demás se leen del cache compartido en una sola
+        consulta. Una llave que no existe (nunca incrementada o descartada
+        por el cache) se crea con un valor nuevo en lugar de leerse como 0:
+        si se leyera 0, las entradas construidas antes del primer incremento
+        volverían a coincidir.
+        """
+        now = time.monotonic()
+        memo = VersionedCache._versions
+        values = {}
+        missing = []
+
+        for key in keys:
+            entry = memo.get(key)
+            if entry and entry[1] > now:
+                values[key] = entry[0]
+            else:
+                missing.append(key)
+
+        if missing:
+            fetched = cache.get_many(missing)
+            for key in missing:
+                if key not in fetched:
+                    cache.add(key, VersionedCache._seed(), None)
+                    fetched[key] = cache.get(key)
+                values[key] = fetched[key]
+                memo[key] = (fetched[key], now + VersionedCache.VERSION_TTL)
+
+        return tuple(values[key] for key in keys)
+
+    @classmethod
+    def _get_version(cls, scope, identifier=''):
+        return cls._read_versions([cls._version_key(scope, identifier)])[0]
+
+    @classmethod
+    def _get_versions(cls, user_id, role_id):
+        return cls._read_versions([
+            cls._version_key('global'),
+            cls._version_key('role', role_id),
+            cls._version_key('user', user_id),
+        ])
+
+    @classmethod
+    def _resolve(cls, user, loader):
+        """
+        Obtener el conjunto resuelto del usuario desde el request,
+        la memoria del proceso o el cache compartido (en ese orden)
+        """
+        role_id = user.role_id
+        attr = f"_{cls.KEY_PREFIX}_set"
+
+        # 1. Cache del request
+        request_cache = getattr(user, attr, None)
+        if request_cache and request_cache[0] == role_id:
+            return request_cache[1]
+
+        local_key = (user.id, role_id)
+        versions = cls._get_versions(user.id, role_id)
+        now = time.monotonic()
+
+        # 2. Memoria del proceso
+        entry = cls._local.get(local_key)
+        if entry and entry[0] == versions and entry[1] > now:
+            resolved = entry[2]
+        else:
+            # 3. Cache compartido
+            shared_key = f"{cls.KEY_PREFIX}:set:{user.id}:{role_id}:" + ':'.join(map(str, versions))
+            resolved = cache.get(shared_key)
+
+            if resolved is None:
+                resolved = loader(user.id, role_id)
+                cache.set(shared_key, resolved, cls.CACHE_TIMEOUT)
+                logger.debug(f"[{cls.KEY_PREFIX.upper()}] Conjunto resuelto para {user.id}: {len(resolved)}")
+
+            cls._local[local_key] = (versions, now + cls.CACHE_TIMEOUT, resolved)
+
+        setattr(user, attr, (role_id, resolved))
+        return resolved
+
+    # ===== Invalidación =====
+
+    @classmethod
+    def invalidate_user(cls, user_id):
+        """Invalidar el conjunto de un usuario (restricciones personalizadas)"""
+        cls._bump(cls._version_key('user', user_id))
+
+    @classmethod
+    def invalidate_role(cls, role_id):
+        """Invalidar el conjunto de todos los usuarios de un rol"""
+        cls._bump(cls._version_key('role', role_id))
+
+    @classmethod
+    def invalidate_all(cls):
+        """Invalidar todos los conjuntos del namespace"""
+        cls._bump(cls._version_key('global'))
+        cls._local.clear()
+
+
+class PermissionCache(VersionedCache):
+    """
+    Cache de permisos resueltos por usuario
+
+    El conjunto de permisos (resource, action) de un usuario se resuelve en
+    una sola consulta y se guarda en el propio objeto user (dura lo que dura
+    el request), en memoria del proceso y en el cache de Django.
+    """
+
+    KEY_PREFIX = 'perms'
+
+    # {(user_id, role_id): (versions, expires_at, permissions)}
+    _local = {}
+
+    @staticmethod
+    def _load_permissions(user_id, role_id):
+        """
+        Permisos efectivos = permisos concedidos al rol
+        menos las restricciones del usuario (is_granted=False)
+        """
+        revoked = UserPermission.objects.filter(
+            user_id=user_id,
+            is_granted=False
+        ).values('permission_id')
+
+        rows = RolePermission.objects.filter(
+            role_id=role_id,
+            is_granted=True
+        ).exclude(
+            permission_id__in=revoked
+        ).values_list('permission__resource', 'permission__action')
+
+        return frozenset(rows)
+
+    @classmethod
+    def get_permissions(cls, user):
+        """Obtener el conjunto de permisos (resource, action) del usuario"""
+        return cls._resolve(user, cls._load_permissions)
+
+
+class PageAccessCache(VersionedCache):
+    """
+    Cache de acceso a páginas frontend
+
+    Mantiene un índice de rutas de páginas registradas (una vez por proceso,
+    recargado solo cuando cambia la tabla de páginas) y el conjunto de rutas
+    permitidas por usuario, con la misma invalidación por versión que
+    PermissionCache. El índice compara la versión global del cache
+    compartido en cada request, así que un cambio en la tabla de páginas
+    lo recargan todos los procesos.
+    """
+
+    KEY_PREFIX = 'pages'
+
+    # {(user_id, role_id): (versions, expires_at, routes)}
+    _local = {}
+
+    # Índice de rutas: (version, frozenset de rutas)
+    _routes = (None, frozenset())
+
+    @classmethod
+    def get_routes(cls):
+        """Rutas registradas en la tabla de páginas"""
+        version = cls._get_version('global')
+
+        if cls._routes[0] != version:
+            routes = frozenset(Page.objects.values_list('route', flat=True))
+            cls._routes = (version, routes)
+            logger.info(f"[PERMISOS] Índice de páginas cargado: {len(routes)} rutas")
+
+        return cls._routes[1]
+
+    @staticmethod
+    def _load_allowed_routes(user_id, role_id):
+        """
+        Rutas permitidas = páginas con acceso del rol
+        menos las restricciones del usuario (can_access=False)
+        """
+        restricted = UserPageAccess.objects.filter(
+            user_id=user_id,
+            can_access=False
+        ).values('page_id')
+
+        rows = RolePageAccess.objects.filter(
+            role_id=role_id,
+            can_access=True
+        ).exclude(
+            page_id__in=restricted
+        ).values_list('page__route', flat=True)
+
+        return frozenset(rows)
+
+    @classmethod
+    def get_allowed_routes(cls, user):
+        """Obtener el conjunto de rutas a las que el usuario tiene acceso"""
+        return cls._resolve(user, cls._load_allowed_routes)
@@ -0,0 +1,366 @@
+# api/utils/product_import.py
+
+from django.db import transaction, IntegrityError
+from django.utils import timezone
+from api.models import Product
+from api.utils.barcode_index import BarcodeIndex
+from api.utils.catalog_sync import CatalogSync
+from api.utils.category_tree import CategoryTree
+from api.utils.inventory_valuation import InventoryValuation
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ProductImporter:
+    """
+    Importación masiva de productos (upsert por código de barras)
+
+    Las filas se procesan en bloques de tamaño fijo: cada bloque se valida,
+    consulta una sola vez los códigos existentes y se guarda con
+    bulk_create / bulk_update en su propia transacción. Un bloque con error
+    no revierte los bloques anteriores.
+    """
+
+    CHUNK_SIZE = 1000
+    BATCH_SIZE = 500
+    UPDATE_BATCH_SIZE = 100  # bulk_update genera un CASE por campo: lotes chicos
+
+    TRUE_VALUES = ('sí', 'si', 'yes', 'true', '1')
+    FALSE_VALUES = ('no', 'false', '0')
+
+    # Columnas de la planilla (mismo orden que ExcelExporter.export_products)
+    # (índice, campo, tipo, requerido)
+    COLUMNS = [
+        (0, 'barcode', 'text', True),
+        (1, 'barcode_package', 'text', False),
+        (2, 'name', 'text', True),
+        (3, 'department', 'department', False),
+        (4, 'stock_units', 'decimal', False),
+        (5, 'min_stock', 'decimal', False),
+        (6, 'is_package', 'bool', False),
+        (7, 'units_per_package', 'int', False),
+        (8, 'unit_price', 'decimal', True),
+        (9, 'package_price', 'decimal', False),
+        (10, 'tray_price', 'decimal', False),
+        (11, 'is_tax_exempt', 'tax', False),
+        (12, 'variable_tax_rate', 'rate', False),
+        (13, 'has_returnable_container', 'bool', False),
+        (14, 'is_active', 'status', False),
+    ]
+
+    MAX_LENGTHS = {'barcode': 50, 'barcode_package': 50, 'name': 200}
+
+    UPDATE_FIELDS = [
+        'barcode_package', 'name', 'department', 'stock_units', 'min_stock',
+        'is_package', 'units_per_package', 'unit_price', 'package_price',
+        'tray_price', 'is_tax_exempt', 'variable_tax_rate',
+        'has_returnable_container', 'is_active', 'updated_at'
+    ]
+
+    # ===== Validación =====
+
+    @staticmethod
+    def _convert(kind, value, department_map):
+        """Convertir una celda al tipo del campo (ValueError si no es válida)"""
+        if kind == 'text':
+            return str(value).strip() or None
+
+        if kind == 'department':
+            dept = department_map.get(str(value).strip().lower())
+            if dept is None:
+                raise ValueError(f"departamento '{value}' no existe")
+            return dept
+
+        if kind in ('decimal', 'rate'):
+            try:
+                number = Decimal(str(value).strip().replace(',', '.'))
+            except InvalidOperation:
+                raise ValueError(f"'{value}' no es un número")
+            # Los campos numéricos del producto no tienen decimales (máx. 10 dígitos)
+            if not number.is_finite() or number < 0 or number >= Decimal('1e10'):
+                raise ValueError(f"'{value}' no es un número válido")
+            number = number.quantize(Decimal('1'))
+            if kind == 'rate' and number > 100:
+                raise ValueError(f"'{value}' no es un porcentaje válido")
+            # IVA 0 en la planilla = sin tasa especial (usa el IVA estándar)
+            if kind == 'rate' and number == 0:
+                return None
+            return number
+
+        if kind == 'int':
+            try:
+                number = int(Decimal(str(value).strip()))
+            except InvalidOperation:
+                raise ValueError(f"'{value}' no es un entero")
+            if number < 0:
+                raise ValueError(f"'{value}' no es un entero válido")
+            return number
+
+        text = str(value).strip().lower()
+
+        if kind == 'bool':
+            return text in ProductImporter.TRUE_VALUES
+
+        if kind == 'tax':
+            # Columna 'Tiene IVA': "No" = exento
+            return text in ProductImporter.FALSE_VALUES
+
+        if kind == 'status':
+            return text != 'inactivo'
+
+        raise ValueError(f"tipo de columna desconocido: {kind}")
+
+    @staticmethod
+    def parse_row(row, department_map):
+        """
+        Validar una fila de la planilla
+        Retorna (datos, None) o (None, mensaje de error)
+        """
+        data = {}
+        problems = []
+
+        for index, field, kind, required in ProductImporter.COLUMNS:
+            value = row[index] if index < len(row) else None
+
+            if value is None or (isinstance(value, str) and not value.strip()):
+                if required:
+                    problems.append(f"falta {field}")
+                continue
+
+            try:
+                data[field] = ProductImporter._convert(kind, value, department_map)
+            except ValueError as e:
+                problems.append(f"{field}: {e}")
+                continue
+
+            max_length = ProductImporter.MAX_LENGTHS.get(field)
+            if max_length and data[field] and len(data[field]) > max_length:
+                problems.append(f"{field}: máximo {max_length} caracteres")
+
+        if problems:
+            return None, ', '.join(problems)
+
+        return data, None
+
+    # ===== Importación =====
+
+    @staticmethod
+    def _build(company, data, product_id=None):
+        """
+        Instancia con todos los campos de la planilla (valores por defecto si faltan)
+        Al actualizar solo se guardan los campos presentes en la fila
+        """
+        now = timezone.now()
+        product = Product(
+            company=company,
+            barcode=data['barcode'],
+            barcode_package=data.get('barcode_package'),
+            name=data['name'],
+            department=data.get('department'),
+            stock_units=data.get('stock_units', Decimal('0')),
+            min_stock=data.get('min_stock', Decimal('0')),
+            is_package=data.get('is_package', False),
+            units_per_package=data.get('units_per_package'),
+            unit_price=data['unit_price'],
+            package_price=data.get('package_price'),
+            tray_price=data.get('tray_price'),
+            is_tax_exempt=data.get('is_tax_exempt', False),
+            variable_tax_rate=data.get('variable_tax_rate'),
+            has_returnable_container=data.get('has_returnable_container', False),
+            is_active=data.get('is_active', True),
+            updated_at=now,
+            catalog_updated_at=now
+        )
+        if product_id is not None:
+            product.id = product_id
+            # Fila existente: save() debe hacer UPDATE (el id tiene default y Django forzaría INSERT)
+            product._state.adding = False
+        return product
+
+    @staticmethod
+    def _build_update(company, data, current):
+        """
+        Instancia de un producto existente: los campos ausentes en la fila
+        conservan el valor guardado (current: {columna: valor})
+        """
+        product = ProductImporter._build(company, data, current['id'])
+        for field, column in ProductImporter._columns():
+            if field not in data:
+                setattr(product, column, current[column])
+        return product
+
+    @staticmethod
+    def _columns():
+        """[(campo, columna)] de los campos que vienen en la planilla"""
+        return [
+            (field, Product._meta.get_field(field).attname)
+            for field in ProductImporter.UPDATE_FIELDS if field != 'updated_at'
+        ]
+
+    @staticmethod
+    def _present_fields(data):
+        """Campos con valor en la fila: una celda vacía no modifica un producto existente"""
+        return [field for field in ProductImporter.UPDATE_FIELDS if field in data]
+
+    @staticmethod
+    def _changed_fields(product, current, data):
+        """
+        Campos presentes en la fila cuyo valor difiere del guardado
+        (current: {columna: valor})
+        """
+        return tuple(
+            field for field, column in ProductImporter._columns()
+            if field in data and getattr(product, column) != current[column]
+        )
+
+    @staticmethod
+    def _save_chunk(company, parsed, result):
+        """
+        Guardar un bloque de filas válidas [(fila, datos)] en una transacción
+
+        Los códigos existentes (con sus valores actuales) se consultan una
+        sola vez por bloque. Los productos sin cambios no se escriben y los
+        modificados se agrupan por campos cambiados: bulk_update arma un
+        CASE por campo, así que actualizar solo lo que cambió es mucho más barato.
+        """
+        columns = [column for _, column in ProductImporter._columns()]
+        existing = {
+            row['barcode']: row
+            for row in Product.objects.filter(
+                barcode__in=[data['barcode'] for _, data in parsed]
+            ).values('barcode', 'id', 'company_id', *columns)
+        }
+
+        to_create = []
+        to_update = {}  # {campos cambiados: [productos]}
+        pending = []
+
+        for idx, data in parsed:
+            current = existing.get(data['barcode'])
+
+            if current is None:
+                to_create.append(ProductImporter._build(company, data))
+            elif current['company_id'] != company.id:
+                # barcode es único global: no se puede usar en otra empresa
+                result['errors'].append(f"Fila {idx}: El código {data['barcode']} pertenece a otra empresa")
+                continue
+            else:
+                product = ProductImporter._build_update(company, data, current)
+                changed = ProductImporter._changed_fields(product, current, data)
+
+                if not changed:
+                    result['unchanged'] += 1
+                    continue
+
+                to_update.setdefault(changed, []).append(product)
+
+            pending.append((idx, data))
+
+        try:
+            with transaction.atomic():
+                Product.objects.bulk_create(
+                    to_create,
+                    batch_size=ProductImporter.BATCH_SIZE
+                )
+                for changed, products in to_update.items():
+                    fields = list(changed) + ['updated_at']
+                    if Product.touches_catalog(changed):
+                        fields.append('catalog_updated_at')
+                    Product.objects.bulk_update(
+                        products,
+                        fields,
+                        batch_size=ProductImporter.UPDATE_BATCH_SIZE
+                    )
+                # bulk_create / bulk_update no emiten post_save
+                BarcodeIndex.sync_products(
+                    to_create + [product for products in to_update.values() for product in products]
+                )
+        except IntegrityError as e:
+            # Otro proceso creó alguno de los códigos: reintentar fila por fila
+            logger.warning(f"[IMPORT] Bloque con conflicto, reintentando por fila: {str(e)}")
+            ProductImporter._save_rows(company, pending, result)
+            return
+
+        if to_create or to_update:
+            BarcodeIndex.invalidate_company(company.id)
+            CategoryTree.invalidate_company(company.id)
+            CatalogSync.invalidate_company(company.id)
+            InventoryValuation.invalidate_company(company.id)
+
+        result['created'] += len(to_create)
+        result['updated'] += sum(len(products) for products in to_update.values())
+
+    @staticmethod
+    def _save_rows(company, parsed, result):
+        """Respaldo fila por fila (cada fila en su propia transacción)"""
+        for idx, data in parsed:
+            try:
+                with transaction.atomic():
+                    current = Product.objects.select_for_update().filter(
+                        barcode=data['barcode']
+                    ).values('id', 'company_id', *[column for _, column in ProductImporter._columns()]).first()
+
+                    if current is None:
+                        ProductImporter._build(company, data).save(force_insert=True)
+                        result['created'] += 1
+                    elif current['company_id'] != company.id:
+                        result['errors'].append(f"Fila {idx}: El código {data['barcode']} pertenece a otra empresa")
+                    else:
+                        product = ProductImporter._build_update(company, data, current)
+                        product.save(
+                            update_fields=ProductImporter._present_fields(data) + ['updated_at']
+                        )
+                        result['updated'] += 1
+            except Exception as e:
+                result['errors'].append(f"Fila {idx}: Error guardando producto - {str(e)}")
+
+    @staticmethod
+    def import_rows(rows, company, department_map, progress=None):
+        """
+        Importar filas [(número de fila, valores)] en bloques
+        progress: callback opcional con la cantidad de filas procesadas
+
+        Retorna {'created', 'updated', 'unchanged', 'errors'} con un error
+        por fila rechazada.
+        """
+        result = {'created': 0, 'updated': 0, 'unchanged': 0, 'errors': []}
+        seen = set()
+        processed = 0
+        rows = iter(rows)
+
+        while True:
+            chunk = list(islice(rows, ProductImporter.CHUNK_SIZE))
+            if not chunk:
+                break
+
+            parsed = []
+            for idx, row in chunk:
+                data, error = ProductImporter.parse_row(row, department_map)
+
+                if error:
+                    result['errors'].append(f"Fila {idx}: {error}")
+                    continue
+
+                if data['barcode'] in seen:
+                    result['errors'].append(f"Fila {idx}: Código {data['barcode']} repetido en el archivo")
+                    continue
+
+                seen.add(data['barcode'])
+                parsed.append((idx, data))
+
+            if parsed:
+                ProductImporter._save_chunk(company, parsed, result)
+
+            processed += len(chunk)
+            if progress:
+                progress(processed)
+
+        logger.info(
+            f"[IMPORT] Productos: {result['created']} creados, "
+            f"{result['updated']} actualizados, {result['unchanged']} sin cambios, "
+            f"{len(result['errors'])} errores"
+        )
+        return result
@@ -0,0 +1,193 @@
+# api/utils/promotion_engine.py
+
+from django.utils import timezone
+from api.models import Promotion, PromotionProduct
+from api.utils.permission_cache import VersionedCache
+from decimal import Decimal
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PromotionEngine(VersionedCache):
+    """
+    Evaluación de promociones por canasta
+
+    Las promociones activas de la empresa se compilan en memoria del
+    proceso como un índice producto -> reglas. El índice se reconstruye
+    cuando cambia la versión de la empresa (promoción guardada o eliminada)
+    o al llegar el próximo inicio / fin de vigencia de alguna promoción.
+    La versión se lee del cache compartido en cada consulta del índice,
+    así que un cambio hecho en otro worker se aplica en la siguiente venta.
+    Cada línea recibe la regla que da el mayor descuento.
+    """
+
+    CACHE_TIMEOUT = 300  # 5 minutos en memoria del proceso
+    KEY_PREFIX = 'promotions'
+
+    RULE_FIELDS = [
+        'id', 'name', 'description', 'promotion_type', 'start_date', 'end_date',
+        'min_quantity', 'discount_percentage', 'buy_quantity', 'free_quantity', 'fixed_price',
+    ]
+
+    CENT = Decimal('0.01')
+
+    # {company_id: (version, expires_at, valid_until, {product_id: [reglas]})}
+    _local = {}
+    _lock = threading.Lock()
+
+    # ===== Índice =====
+
+    @staticmethod
+    def _compile(company_id, now):
+        """Índice {product_id: [reglas vigentes]} y el instante en que deja de ser válido"""
+        promotions = Promotion.objects.filter(
+            company_id=company_id,
+            is_active=True,
+            end_date__gte=now
+        ).values(*PromotionEngine.RULE_FIELDS)
+
+        rules = {}
+        boundaries = []
+        for promotion in promotions:
+            if promotion['start_date'] > now:
+                # Aún no comienza: solo marca el próximo cambio
+                boundaries.append(promotion['start_date'])
+                continue
+            boundaries.append(promotion['end_date'])
+            rules[promotion['id']] = promotion
+
+        index = {}
+        if rules:
+            for promotion_id, product_id in PromotionProduct.objects.filter(
+                promotion_id__in=list(rules)
+            ).values_list('promotion_id', 'product_id'):
+                index.setdefault(str(product_id), []).append(rules[promotion_id])
+
+        return index, min(boundaries) if boundaries else None
+
+    @classmethod
+    def get_index(cls, company_id):
+        """Índice compilado de la empresa (desde memoria del proceso si sigue vigente)"""
+        version = cls._get_version('company', company_id)
+        now = timezone.now()
+        monotonic = time.monotonic()
+
+        entry = cls._local.get(company_id)
+        if entry and entry[0] == version and entry[1] > monotonic and (entry[2] is None or entry[2] > now):
+            return entry[3]
+
+        index, valid_until = cls._compile(company_id, now)
+        with cls._lock:
+            cls._local[company_id] = (version, monotonic + cls.CACHE_TIMEOUT, valid_until, index)
+
+        logger.debug(f"[PROMOTIONS] Índice compilado para {company_id}: {len(index)} productos")
+        return index
+
+    @classmethod
+    def invalidate_company(cls, company_id):
+        """Invalidar el índice de la empresa al confirmar la transacción en curso"""
+        cls._bump(cls._version_key('company', company_id))
+
+    # ===== Reglas =====
+
+    @staticmethod
+    def rule_from_promotion(promotion):
+        """Regla a partir de una instancia de Promotion"""
+        return {field: getattr(promotion, field) for field in PromotionEngine.RULE_FIELDS}
+
+    @staticmethod
+    def evaluate(rule, unit_price, quantity):
+        """
+        Descuento de una regla sobre una línea (precio unitario x cantidad)
+        Retorna (descuento, unidades gratis)
+        """
+        original = unit_price * quantity
+        discount = Decimal('0')
+        free_units = 0
+        promotion_type = rule['promotion_type']
+
+        if promotion_type == 'quantity_discount':
+            if rule['min_quantity'] and rule['discount_percentage'] and quantity >= rule['min_quantity']:
+                discount = original * (rule['discount_percentage'] / 100)
+
+        elif promotion_type == 'free_units':
+            # Ejemplo: 2x1 (buy_quantity=2, free_quantity=1)
+            if rule['buy_quantity'] and rule['free_quantity']:
+                sets = int(quantity // rule['buy_quantity'])
+                free_units = sets * rule['free_quantity']
+                discount = unit_price * free_units
+
+        elif promotion_type == 'percentage':
+            if rule['discount_percentage']:
+                discount = original * (rule['discount_percentage'] / 100)
+
+        elif promotion_type == 'fixed_price':
+            if rule['fixed_price'] is not None:
+                discount = original - rule['fixed_price'] * quantity
+
+        discount = min(max(discount, Decimal('0')), original)
+        return discount.quantize(PromotionEngine.CENT), free_units
+
+    @staticmethod
+    def best(rules, unit_price, quantity):
+        """Mejor regla para la línea: (regla, descuento, unidades gratis) o (None, 0, 0)"""
+        best = (None, Decimal('0'), 0)
+
+        for rule in rules:
+            discount, free_units = PromotionEngine.evaluate(rule, unit_price, quantity)
+            if discount > best[1]:
+                best = (rule, discount, free_units)
+
+        return best
+
+    # ===== Canasta =====
+
+    @staticmethod
+    def price_basket(company_id, lines):
+        """
+        Aplicar promociones a una canasta en una pasada
+
+        lines: [{'product_id', 'quantity', 'unit_price'}] (Decimal)
+        Las líneas del mismo producto se evalúan juntas (ej: 2x1 en dos
+        escaneos) y el descuento se reparte según el monto de cada línea.
+        Retorna una lista paralela de {'discount', 'promotion', 'free_units'}
+        """
+        index = PromotionEngine.get_index(company_id)
+        results = [{'discount': Decimal('0'), 'promotion': None, 'free_units': 0} for _ in lines]
+
+        groups = {}
+        for position, line in enumerate(lines):
+            product_id = str(line['product_id']) if line.get('product_id') else None
+            if product_id in index:
+                groups.setdefault(product_id, []).append(position)
+
+        for product_id, positions in groups.items():
+            quantity = sum(lines[position]['quantity'] for position in positions)
+            original = sum(lines[position]['quantity'] * lines[position]['unit_price'] for position in positions)
+            if quantity <= 0 or original <= 0:
+                continue
+
+            rule, discount, free_units = PromotionEngine.best(index[product_id], original / quantity, quantity)
+            if rule is None:
+                continue
+
+            # Repartir el descuento; la última línea recibe el resto del redondeo
+            remaining = discount
+            for number, position in enumerate(positions, start=1):
+                line = lines[position]
+                if number == len(positions):
+                    share = remaining
+                else:
+                    share = (discount * line['quantity'] * line['unit_price'] / original).quantize(PromotionEngine.CENT)
+                    remaining -= share
+
+                results[position] = {
+                    'discount': share,
+                    'promotion': rule,
+                    'free_units': free_units if number == 1 else 0,
+                }
+
+        return results
@@ -3,7 +3,10 @@
 from decimal import Decimal
 from datetime import datetime, timedelta
 from django.utils import timezone
-from typing import Dict, List, Tuple
+from django.db.models import Case, When, Value, F, Q, Sum, Count, DecimalField
+from django.db.models.functions import Coalesce, NullIf
+from api.models import SaleItem
+from typing import Dict, Iterable, List, Optional, Tuple
 
 
 class IVACalculator:
@@ -68,6 +71,185 @@ class IVACalculator:
             'exento': f"${breakdown.get('total_exempt', 0):,.2f}",
             'total_con_iva': f"${breakdown.get('total_with_iva', 0):,.2f}"
         }
+    
+    @staticmethod
+    def effective_rate(is_tax_exempt: bool, variable_tax_rate: Optional[Decimal]) -> Optional[Decimal]:
+        """
+        Tasa efectiva de un producto (None = exento)
+        Productos sin tasa variable (o con tasa 0) usan el IVA estándar
+        """
+        if is_tax_exempt:
+            return None
+        return Decimal(str(variable_tax_rate)) if variable_tax_rate else IVACalculator.IVA_STANDARD
+    
+    @staticmethod
+    def breakdown_from_rate_totals(rate_totals: Dict[Optional[Decimal], Decimal]) -> Dict:
+        """
+        Desglose de IVA a partir de totales (con IVA incluido) agrupados por tasa
+        
+        Args:
+            rate_totals: {tasa: total}; la llave None agrupa los montos exentos
+        
+        Returns:
+            Diccionario con total con IVA, exento, base imponible e IVA por tipo
+        """
+        total_with_iva = Decimal('0')
+        total_exempt = Decimal('0')
+        iva_19_total = Decimal('0')
+        iva_variable_total = Decimal('0')
+        
+        for rate, total in rate_totals.items():
+            total = Decimal(str(total or 0))
+            
+            if rate is None:
+                total_exempt += total
+                continue
+            
+            rate = Decimal(str(rate))
+            _, iva_amount = IVACalculator.calculate_base_and_iva(total, rate)
+            
+            if rate == IVACalculator.IVA_STANDARD:
+                iva_19_total += iva_amount
+            else:
+                iva_variable_total += iva_amount
+            
+            total_with_iva += total
+        
+        total_base = total_with_iva - (iva_19_total + iva_variable_total)
+        
+        return {
+            'total_with_iva': float(total_with_iva),
+            'total_exempt': float(total_exempt),
+            'total_base_imponible': float(total_base),
+            'iva_19_percent': float(iva_19_total),
+            'iva_variable': float(iva_variable_total),
+            'total_iva': float(iva_19_total + iva_variable_total)
+        }
+    
+    @staticmethod
+    def breakdown_for_sales(sales) -> Dict:
+        """
+        Desglose de IVA de un queryset de ventas en una sola consulta agrupada
+        
+        Los items se agrupan en la base de datos por tasa efectiva
+        (exento / variable_tax_rate / 19%), sin recorrer ventas ni items.
+        """
+        return IVACalculator.breakdown_grouped(
+            SaleItem.objects.filter(sale__in=sales),
+            F('quantity') * F('unit_price')
+        )
+    
+    @staticmethod
+    def breakdown_grouped(queryset, amount) -> Dict:
+        """
+        Desglose de IVA de cualquier queryset con FK a product
+        
+        Args:
+            queryset: Queryset de filas con campo product (items, rollups)
+            amount: Expresión o campo con el monto con IVA incluido de cada fila
+        """
+        return IVACalculator.breakdown_from_rate_totals(
+            IVACalculator.rate_totals(queryset, amount)
+        )
+    
+    @staticmethod
+    def rate_totals(queryset, amount) -> Dict[Optional[Decimal], Decimal]:
+        """
+        Totales con IVA incluido agrupados por tasa efectiva en una consulta
+        ({tasa: total}; la llave None agrupa los montos exentos)
+        """
+        rate_field = DecimalField(max_digits=5, decimal_places=2)
+        
+        rows = queryset.annotate(
+            rate=Case(
+                When(product__is_tax_exempt=True, then=Value(None, output_field=rate_field)),
+                default=Coalesce(
+                    NullIf('product__variable_tax_rate', Value(0)),
+                    Value(IVACalculator.IVA_STANDARD),
+                    output_field=rate_field
+                ),
+                output_field=rate_field
+            )
+        ).values('rate').annotate(
+            total=Sum(amount, output_field=DecimalField(max_digits=16, decimal_places=2))
+        ).order_by()
+        
+        return {row['rate']: row['total'] for row in rows}
+
+    
+    @staticmethod
+    def breakdown_from_lines(lines: Iterable[Tuple]) -> Dict:
+        """
+        Desglose de IVA para fuentes que no son SQL (archivos, caches, APIs)
+        
+        Mismo agrupamiento por tasa efectiva que rate_totals, en Python y
+        con Decimal (sin redondeos de punto flotante): el resultado coincide
+        con el de la consulta agrupada para las mismas líneas.
+        
+        Args:
+            lines: Iterable de (total_linea, is_tax_exempt, variable_tax_rate)
+        
+        Returns:
+            Mismo formato que breakdown_for_sales
+        """
+        rate_totals = {}
+        
+        for line_total, is_tax_exempt, variable_tax_rate in lines:
+            rate = IVACalculator.effective_rate(is_tax_exempt, variable_tax_rate)
+            rate_totals[rate] = rate_totals.get(rate, Decimal('0')) + Decimal(str(line_total))
+        
+        return IVACalculator.breakdown_from_rate_totals(rate_totals)
+
+class AggregationHelper:
+    """
+    Agregaciones condicionales para reportes
+
+    Permite calcular varias sumas y conteos de una misma tabla en un solo
+    aggregate(), usando Sum(..., filter=Q(...)) en lugar de una consulta
+    por método de pago, tipo de movimiento o columna.
+
+    Ejemplo:
+        AggregationHelper.aggregate(
+            payments,
+            cash=AggregationHelper.sum('amount', payment_method='cash'),
+            card=AggregationHelper.sum('amount', payment_method__in=['debit', 'credit_card']),
+        )
+    """
+    
+    @staticmethod
+    def _condition(condition: Optional[Q], lookups: Dict) -> Optional[Q]:
+        if lookups:
+            condition = (condition or Q()) & Q(**lookups)
+        return condition
+    
+    @staticmethod
+    def sum(field: str, condition: Optional[Q] = None, **lookups):
+        """Suma de un campo (0 si no hay filas), opcionalmente filtrada"""
+        return Coalesce(
+            Sum(field, filter=AggregationHelper._condition(condition, lookups)),
+            Value(Decimal('0')),
+            output_field=DecimalField(max_digits=16, decimal_places=2)
+        )
+    
+    @staticmethod
+    def count(field: str = 'id', condition: Optional[Q] = None, **lookups):
+        """Conteo de filas, opcionalmente filtrado"""
+        return Count(field, filter=AggregationHelper._condition(condition, lookups))
+    
+    @staticmethod
+    def sums_by(field: str, key: str, values: Iterable) -> Dict:
+        """Una suma filtrada por cada valor de key: {valor: expresión}"""
+        return {
+            str(value): AggregationHelper.sum(field, **{key: value})
+            for value in values
+        }
+    
+    @staticmethod
+    def aggregate(queryset, **expressions) -> Dict:
+        """Evaluar todas las expresiones en una sola consulta"""
+        if not expressions:
+            return {}
+        return queryset.order_by().aggregate(**expressions)
 
 
 class DateRangeHelper:
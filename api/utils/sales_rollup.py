@@ -0,0 +1,454 @@
+# api/utils/sales_rollup.py
+
+from django.db import transaction
+from django.db.models import Sum, Count, F, Q, DecimalField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from api.models import Sale, SaleItem, SalePayment
+from api.models.sale import SalesRollupDay, DailySalesRollup, DailyPaymentRollup, DailyProductRollup
+from api.utils.report_utils import IVACalculator
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SalesRollup:
+    """
+    Rollups diarios de ventas por empresa
+
+    Las ventas completadas o anuladas solo marcan su día como modificado
+    (al confirmar la transacción). Los reportes no recalculan: leen de los
+    rollups los días ya recalculados y calculan los días marcados
+    directamente desde las ventas (ver SalesRollupReader). Los días marcados,
+    incluido el actual, se reconstruyen fuera del request con
+    `rebuild_sales_rollups --dirty-only` (tarea programada), así ni el
+    checkout ni los reportes esperan el bloqueo del recalculo.
+
+    El día actual se lee de los rollups cuando ya está recalculado, igual
+    que los demás; sin fila del día se calcula en vivo. Entre el commit de
+    una venta y su marcado (on_commit del mismo request) un reporte puede
+    leer el día sin esa venta.
+    """
+
+    # ===== Fechas =====
+
+    @staticmethod
+    def parse_day(value):
+        """Convertir un parámetro de fecha a date (None si no es una fecha simple)"""
+        if isinstance(value, datetime):
+            return None
+        if isinstance(value, date):
+            return value
+        if isinstance(value, str) and len(value) == 10:
+            try:
+                return date.fromisoformat(value)
+            except ValueError:
+                return None
+        return None
+
+    @staticmethod
+    def day_bounds(day):
+        """Rango [inicio, fin) del día en la zona horaria local"""
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+        return start, end
+
+    @staticmethod
+    def sale_date_filters(start_date, end_date):
+        """
+        Filtros de sale_date para un rango de reporte
+        Las fechas simples se toman como días completos (fecha fin incluida),
+        igual que en los rollups
+        """
+        filters = {}
+
+        start_day = SalesRollup.parse_day(start_date)
+        if start_day:
+            filters['sale_date__gte'] = SalesRollup.day_bounds(start_day)[0]
+        elif start_date:
+            filters['sale_date__gte'] = start_date
+
+        end_day = SalesRollup.parse_day(end_date)
+        if end_day:
+            filters['sale_date__lt'] = SalesRollup.day_bounds(end_day)[1]
+        elif end_date:
+            filters['sale_date__lte'] = end_date
+
+        return filters
+
+    # ===== Marcado de días modificados =====
+
+    @staticmethod
+    def mark_day(company_id, day):
+        """Marcar el día de una empresa para recalcular"""
+        days = SalesRollupDay.objects.filter(company_id=company_id, date=day)
+
+        if not days.update(version=F('version') + 1):
+            _, created = SalesRollupDay.objects.get_or_create(company_id=company_id, date=day)
+            if not created:
+                days.update(version=F('version') + 1)
+
+    @staticmethod
+    def mark_sale(sale):
+        """Marcar el día de la venta, una vez confirmada la transacción actual"""
+        company_id = sale.company_id
+        day = timezone.localdate(sale.sale_date)
+
+        def mark():
+            # La venta ya está confirmada: un error aquí no debe llegar al request
+            try:
+                SalesRollup.mark_day(company_id, day)
+            except Exception as e:
+                logger.error(f"[ROLLUP] No se pudo marcar el día {day} de {company_id}: {str(e)}")
+
+        transaction.on_commit(mark)
+
+    # ===== Recalculo =====
+
+    @staticmethod
+    def refresh_day(company_id, day):
+        """Reconstruir los rollups de un día desde ventas, pagos e items"""
+        with transaction.atomic():
+            SalesRollupDay.objects.get_or_create(company_id=company_id, date=day)
+
+            # Bloquear el día: las ventas que se confirmen mientras tanto
+            # incrementan version después y el día vuelve a quedar pendiente
+            state = SalesRollupDay.objects.select_for_update().get(company_id=company_id, date=day)
+            version = state.version
+
+            start, end = SalesRollup.day_bounds(day)
+            sales = Sale.objects.filter(
+                company_id=company_id,
+                status='completed',
+                sale_date__gte=start,
+                sale_date__lt=end
+            )
+
+            for model in (DailySalesRollup, DailyPaymentRollup, DailyProductRollup):
+                model.objects.filter(company_id=company_id, date=day).delete()
+
+            sales_rows = sales.values('created_by').annotate(
+                sales_count=Count('id'),
+                subtotal=Sum('subtotal'),
+                discount_amount=Sum('discount_amount'),
+                tax_amount=Sum('tax_amount'),
+                total=Sum('total')
+            ).order_by()
+
+            DailySalesRollup.objects.bulk_create([
+                DailySalesRollup(
+                    company_id=company_id,
+                    date=day,
+                    cashier_id=row['created_by'],
+                    sales_count=row['sales_count'],
+                    subtotal=row['subtotal'] or 0,
+                    discount_amount=row['discount_amount'] or 0,
+                    tax_amount=row['tax_amount'] or 0,
+                    total=row['total'] or 0
+                )
+                for row in sales_rows
+            ])
+
+            payment_rows = SalePayment.objects.filter(sale__in=sales).values(
+                'sale__created_by', 'payment_method'
+            ).annotate(
+                payments_count=Count('id'),
+                amount=Sum('amount')
+            ).order_by()
+
+            DailyPaymentRollup.objects.bulk_create([
+                DailyPaymentRollup(
+                    company_id=company_id,
+                    date=day,
+                    cashier_id=row['sale__created_by'],
+                    payment_method=row['payment_method'],
+                    payments_count=row['payments_count'],
+                    amount=row['amount'] or 0
+                )
+                for row in payment_rows
+            ])
+
+            product_rows = SaleItem.objects.filter(sale__in=sales).values(
+                'sale__created_by', 'product'
+            ).annotate(
+                items=Count('id'),
+                quantity_sold=Sum('quantity'),
+                revenue=Sum(F('quantity') * F('unit_price'), output_field=DecimalField(max_digits=16, decimal_places=2))
+            ).order_by()
+
+            DailyProductRollup.objects.bulk_create([
+                DailyProductRollup(
+                    company_id=company_id,
+                    date=day,
+                    cashier_id=row['sale__created_by'],
+                    product_id=row['product'],
+                    items_count=row['items'],
+                    quantity=row['quantity_sold'] or 0,
+                    amount=row['revenue'] or 0
+                )
+                for row in product_rows
+            ], batch_size=1000)
+
+            state.refreshed_version = version
+            state.refreshed_at = timezone.now()
+            state.save(update_fields=['refreshed_version', 'refreshed_at'])
+
+        logger.debug(f"[ROLLUP] Día recalculado {day} para {company_id}")
+
+    # ===== Lectura =====
+
+    @staticmethod
+    def covers(company_id, start_day):
+        """
+        Los rollups cubren desde el primer día registrado; los días sin fila
+        no tuvieron ventas. Antes de ese día solo hay cobertura si no existen ventas.
+        """
+        first_day = SalesRollupDay.objects.filter(
+            company_id=company_id
+        ).order_by('date').values_list('date', flat=True).first()
+
+        if first_day is None:
+            return False
+
+        if start_day >= first_day:
+            return True
+
+        return not Sale.objects.filter(
+            company_id=company_id,
+            sale_date__lt=SalesRollup.day_bounds(first_day)[0]
+        ).exists()
+
+    @staticmethod
+    def reader(company, start_date, end_date, cashier_id=None):
+        """
+        Lector de rollups para el rango, o None si el rango no está cubierto
+        (fechas no simples, sin rango o anterior a los rollups)
+        """
+        start_day = SalesRollup.parse_day(start_date)
+        end_day = SalesRollup.parse_day(end_date)
+
+        if not start_day or not end_day or start_day > end_day:
+            return None
+
+        if not SalesRollup.covers(company.id, start_day):
+            return None
+
+        # Días pendientes de recalcular: se leen de las ventas
+        live_days = set(SalesRollupDay.objects.filter(
+            company_id=company.id,
+            date__gte=start_day,
+            date__lte=end_day,
+            refreshed_version__lt=F('version')
+        ).values_list('date', flat=True))
+
+        # El día actual, además, si todavía no tiene fila (ver SalesRollup)
+        today = timezone.localdate()
+        if start_day <= today <= end_day and today not in live_days:
+            if not SalesRollupDay.objects.filter(company_id=company.id, date=today).exists():
+                live_days.add(today)
+
+        return SalesRollupReader(company.id, start_day, end_day, cashier_id, live_days)
+
+
+class SalesRollupReader:
+    """
+    Consultas de reportes sobre un rango de días
+
+    Los días recalculados salen de los rollups y los días en vivo
+    (pendientes, y el actual mientras no tenga fila) de las ventas, con las mismas agrupaciones; los
+    resultados se suman por llave. Cada método retorna filas con los mismos
+    campos que las consultas sobre ventas de los reportes.
+    """
+
+    ZERO = Decimal('0')
+
+    def __init__(self, company_id, start_day, end_day, cashier_id=None, live_days=()):
+        self.company_id = company_id
+        self.start_day = start_day
+        self.end_day = end_day
+        self.cashier_id = cashier_id
+        self.live_days = sorted(live_days)
+
+    def _rows(self, model):
+        rows = model.objects.filter(
+            company_id=self.company_id,
+            date__gte=self.start_day,
+            date__lte=self.end_day
+        )
+        if self.live_days:
+            rows = rows.exclude(date__in=self.live_days)
+        if self.cashier_id:
+            rows = rows.filter(cashier_id=self.cashier_id)
+        return rows
+
+    def _sales(self):
+        """Ventas completadas de los días en vivo (None si no hay días en vivo)"""
+        if not self.live_days:
+            return None
+
+        days = Q()
+        for day in self.live_days:
+            start, end = SalesRollup.day_bounds(day)
+            days |= Q(sale_date__gte=start, sale_date__lt=end)
+
+        sales = Sale.objects.filter(days, company_id=self.company_id, status='completed')
+        if self.cashier_id:
+            sales = sales.filter(created_by_id=self.cashier_id)
+        return sales
+
+    def _items(self, sales):
+        return SaleItem.objects.filter(sale__in=sales)
+
+    @staticmethod
+    def _line_amount():
+        return Sum(F('quantity') * F('unit_price'), output_field=DecimalField(max_digits=16, decimal_places=2))
+
+    @staticmethod
+    def _merge(keys, fields, *sources, order_by=None):
+        """Sumar fields de las filas con la misma llave (keys) de varias fuentes"""
+        merged = {}
+        for rows in sources:
+            for row in rows:
+                key = tuple(row[field] for field in keys)
+                current = merged.get(key)
+                if current is None:
+                    merged[key] = dict(row)
+                    continue
+                for field in fields:
+                    current[field] = (current[field] or 0) + (row[field] or 0)
+
+        rows = list(merged.values())
+        if order_by:
+            field = order_by.lstrip('-')
+            rows.sort(key=lambda row: row[field] or 0, reverse=order_by.startswith('-'))
+        return rows
+
+    def totals(self):
+        """Cantidad de ventas y montos totales"""
+        zero = self.ZERO
+        totals = self._rows(DailySalesRollup).aggregate(
+            sales_count=Coalesce(Sum('sales_count'), 0),
+            subtotal=Coalesce(Sum('subtotal'), zero),
+            discount_amount=Coalesce(Sum('discount_amount'), zero),
+            tax_amount=Coalesce(Sum('tax_amount'), zero),
+            total=Coalesce(Sum('total'), zero)
+        )
+
+        sales = self._sales()
+        if sales is not None:
+            live = sales.aggregate(
+                sales_count=Count('id'),
+                subtotal=Coalesce(Sum('subtotal'), zero),
+                discount_amount=Coalesce(Sum('discount_amount'), zero),
+                tax_amount=Coalesce(Sum('tax_amount'), zero),
+                total=Coalesce(Sum('total'), zero)
+            )
+            totals = {field: totals[field] + live[field] for field in totals}
+
+        return totals
+
+    def payment_methods(self):
+        """Pagos por método: payment_method, count, total"""
+        rows = self._rows(DailyPaymentRollup).values('payment_method').annotate(
+            count=Sum('payments_count'),
+            total=Sum('amount')
+        ).order_by('-total')
+
+        sales = self._sales()
+        if sales is None:
+            return list(rows)
+
+        live = SalePayment.objects.filter(sale__in=sales).values('payment_method').annotate(
+            count=Count('id'),
+            total=Sum('amount')
+        ).order_by()
+        return self._merge(['payment_method'], ['count', 'total'], rows, live, order_by='-total')
+
+    def payment_totals(self):
+        """{payment_method: monto}"""
+        return {row['payment_method']: row['total'] for row in self.payment_methods()}
+
+    def departments(self):
+        """Ventas por departamento: department_name, count, total"""
+        rows = self._rows(DailyProductRollup).values(
+            department_name=F('product__department__name')
+        ).annotate(
+            count=Sum('items_count'),
+            total=Sum('amount')
+        ).order_by('-total')
+
+        sales = self._sales()
+        if sales is None:
+            return list(rows)
+
+        live = self._items(sales).values(
+            department_name=F('product__department__name')
+        ).annotate(
+            count=Count('id'),
+            total=self._line_amount()
+        ).order_by()
+        return self._merge(['department_name'], ['count', 'total'], rows, live, order_by='-total')
+
+    def products(self, order_by='-quantity_sold', limit=None):
+        """
+        Ventas por producto: product__name, product__barcode, quantity_sold, revenue
+        Ordenadas por order_by y limitadas a limit filas
+        """
+        rows = self._rows(DailyProductRollup).values(
+            'product__name', 'product__barcode'
+        ).annotate(
+            quantity_sold=Sum('quantity'),
+            revenue=Sum('amount')
+        )
+
+        sales = self._sales()
+        if sales is None:
+            rows = rows.order_by(order_by)
+            return list(rows[:limit] if limit else rows)
+
+        live = self._items(sales).values(
+            'product__name', 'product__barcode'
+        ).annotate(
+            quantity_sold=Sum('quantity'),
+            revenue=self._line_amount()
+        ).order_by()
+        rows = self._merge(
+            ['product__name', 'product__barcode'], ['quantity_sold', 'revenue'],
+            rows.order_by(), live, order_by=order_by
+        )
+        return rows[:limit] if limit else rows
+
+    def cashiers(self):
+        """Ventas por cajero: cashier_name, sales_count, total_revenue"""
+        rows = self._rows(DailySalesRollup).values(
+            cashier_name=F('cashier__username')
+        ).annotate(
+            sales_count=Sum('sales_count'),
+            total_revenue=Sum('total')
+        ).order_by('-total_revenue')
+
+        sales = self._sales()
+        if sales is None:
+            return list(rows)
+
+        live = sales.values(
+            cashier_name=F('created_by__username')
+        ).annotate(
+            sales_count=Count('id'),
+            total_revenue=Sum('total')
+        ).order_by()
+        return self._merge(['cashier_name'], ['sales_count', 'total_revenue'], rows, live, order_by='-total_revenue')
+
+    def iva_breakdown(self):
+        """Desglose de IVA (misma salida que IVACalculator.breakdown_for_sales)"""
+        rate_totals = IVACalculator.rate_totals(self._rows(DailyProductRollup), F('amount'))
+
+        sales = self._sales()
+        if sales is not None:
+            live = IVACalculator.rate_totals(self._items(sales), F('quantity') * F('unit_price'))
+            for rate, total in live.items():
+                rate_totals[rate] = rate_totals.get(rate, self.ZERO) + (total or self.ZERO)
+
+        return IVACalculator.breakdown_from_rate_totals(rate_totals)
@@ -0,0 +1,151 @@
+# api/utils/sequences.py
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from api.models import Sale, Consignment, Shift
+from api.models.company import DocumentSequence
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class SequenceAllocator:
+    """
+    Asignador de correlativos por empresa y tipo de documento
+
+    Los números se reservan con un UPDATE atómico sobre document_sequences,
+    sin leer el último documento. Para los tipos con bloque > 1 se reservan
+    varios números de una vez por caja (el turno abierto) y se entregan
+    desde memoria del proceso; un bloque no usado al cerrar el turno o
+    reiniciar el proceso deja un salto en la numeración.
+
+    La fila del correlativo queda bloqueada hasta que confirma la
+    transacción que hizo la reserva. Las vistas llaman a prefetch() antes
+    de abrir su transacción, así la reserva confirma de inmediato y el
+    documento toma su número del bloque sin volver a la tabla.
+    """
+
+    # Tipo de documento: (prefijo, dígitos, modelo, campo)
+    FORMATS = {
+        'sale': ('VTA', 8, Sale, 'sale_number'),
+        'consignment': ('CONS', 6, Consignment, 'consignment_number'),
+        'shift': ('TUR', 6, Shift, 'shift_number'),
+    }
+
+    # Números reservados por cada acceso a la tabla
+    BLOCK_SIZES = {
+        'sale': 20,
+        'consignment': 1,
+        'shift': 1,
+    }
+
+    # {(company_id, document_type, register): [siguiente, último]}
+    _blocks = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def next_number(cls, company, document_type, register=None):
+        """Obtener el siguiente número formateado, ej: VTA-00000001"""
+        prefix, digits = cls.FORMATS[document_type][:2]
+        value = cls.next_value(company, document_type, register)
+        return f"{prefix}-{value:0{digits}d}"
+
+    @classmethod
+    def next_value(cls, company, document_type, register=None):
+        """Obtener el siguiente valor numérico del correlativo"""
+        key = (str(company.id), document_type, str(register) if register else None)
+
+        value = cls._take(key)
+        if value is not None:
+            return value
+
+        # Sin bloque en memoria (no se llamó a prefetch o ya se agotó)
+        start, end = cls._reserve(company, document_type, cls.BLOCK_SIZES.get(document_type, 1))
+
+        if end > start:
+            cls._install(key, start + 1, end)
+
+        return start
+
+    @classmethod
+    def prefetch(cls, company, document_type, register=None):
+        """
+        Dejar un bloque disponible en memoria para la caja
+
+        Se llama fuera de transaction.atomic(): la reserva confirma en su
+        propia transacción y no bloquea el correlativo durante la venta.
+        """
+        key = (str(company.id), document_type, str(register) if register else None)
+
+        with cls._lock:
+            block = cls._blocks.get(key)
+            if block and block[0] <= block[1]:
+                return
+
+        start, end = cls._reserve(company, document_type, cls.BLOCK_SIZES.get(document_type, 1))
+        cls._install(key, start, end)
+
+    @classmethod
+    def _take(cls, key):
+        """Siguiente número del bloque en memoria (None si no queda)"""
+        with cls._lock:
+            block = cls._blocks.get(key)
+            if block and block[0] <= block[1]:
+                value = block[0]
+                block[0] += 1
+                return value
+        return None
+
+    @classmethod
+    def _install(cls, key, start, end):
+        """
+        Dejar [start, end] como bloque de la caja
+
+        Solo si la reserva se confirma; si la transacción se revierte otro
+        proceso puede volver a reservar esos números
+        """
+        def install_block():
+            with cls._lock:
+                cls._blocks[key] = [start, end]
+
+        transaction.on_commit(install_block)
+
+    @classmethod
+    def _reserve(cls, company, document_type, size):
+        """Reservar un bloque de números; retorna (primero, último)"""
+        with transaction.atomic():
+            sequences = DocumentSequence.objects.filter(company=company, document_type=document_type)
+
+            updated = sequences.update(last_value=F('last_value') + size, updated_at=timezone.now())
+
+            if not updated:
+                DocumentSequence.objects.get_or_create(
+                    company=company,
+                    document_type=document_type,
+                    defaults={'last_value': cls._current_value(company, document_type)}
+                )
+                sequences.update(last_value=F('last_value') + size, updated_at=timezone.now())
+
+            end = sequences.values_list('last_value', flat=True).get()
+
+        logger.debug(f"[SEQUENCE] {document_type} reservado {end - size + 1}-{end} para {company.id}")
+        return end - size + 1, end
+
+    @classmethod
+    def _current_value(cls, company, document_type):
+        """
+        Último número emitido antes de existir el correlativo
+        (solo se consulta al crear la fila de la empresa)
+        """
+        model, field = cls.FORMATS[document_type][2:]
+
+        last_number = model.objects.filter(
+            company=company
+        ).order_by('-created_at').values_list(field, flat=True).first()
+
+        try:
+            return int(last_number.split('-')[-1]) if last_number else 0
+        except ValueError:
+            return 0
@@ -0,0 +1,107 @@
+# api/utils/stock_alerts.py
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from api.models import Product, SystemAlert, UserAlert, User
+from itertools import islice
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class LowStockAlerts:
+    """
+    Generación de alertas de stock bajo por lotes
+
+    Una consulta obtiene los productos en o bajo el mínimo que no tienen
+    alerta sin leer; las alertas y su envío a los administradores se
+    insertan con bulk_create. Con product_ids solo se revisan esos
+    productos (ej: los que acaban de cruzar el mínimo en una venta).
+    """
+
+    BATCH_SIZE = 500
+    RECIPIENT_ROLES = ['admin', 'master_admin']
+
+    @staticmethod
+    def crossed_min_stock(products, quantities):
+        """
+        Productos que quedan en o bajo el mínimo al descontar las cantidades
+        products: {product_id: producto con el stock previo}, quantities: {product_id: cantidad}
+        """
+        crossed = []
+        for product_id, quantity in quantities.items():
+            product = products[product_id]
+            if product.stock_units > product.min_stock >= product.stock_units - quantity:
+                crossed.append(product.id)
+        return crossed
+
+    @staticmethod
+    def generate(company, product_ids=None):
+        """Crear las alertas pendientes; retorna la cantidad de alertas creadas"""
+        if product_ids is not None and not product_ids:
+            return 0
+
+        products = Product.objects.filter(
+            company=company,
+            is_active=True,
+            stock_units__lte=F('min_stock')
+        ).exclude(
+            Exists(SystemAlert.objects.filter(
+                company=company,
+                alert_type='low_stock',
+                status='unread',
+                product_id=OuterRef('id')
+            ))
+        ).order_by().values('id', 'name', 'barcode', 'stock_units', 'min_stock')
+
+        if product_ids is not None:
+            products = products.filter(id__in=product_ids)
+
+        products = list(products)
+        if not products:
+            return 0
+
+        recipients = list(User.objects.filter(
+            company=company,
+            role__name__in=LowStockAlerts.RECIPIENT_ROLES,
+            is_active=True
+        ).values_list('id', flat=True))
+
+        created = 0
+        products = iter(products)
+
+        while True:
+            batch = list(islice(products, LowStockAlerts.BATCH_SIZE))
+            if not batch:
+                break
+
+            # ids generados aquí para enlazar las alertas de usuario sin releer
+            alerts = [
+                SystemAlert(
+                    id=uuid.uuid4(),
+                    company=company,
+                    alert_type='low_stock',
+                    title=f"Stock bajo: {product['name']}",
+                    message=f"El producto {product['name']} (código: {product['barcode']}) "
+                            f"tiene stock bajo. Stock actual: {product['stock_units']}, "
+                            f"mínimo: {product['min_stock']}",
+                    product_id=product['id'],
+                    status='unread'
+                )
+                for product in batch
+            ]
+
+            with transaction.atomic():
+                SystemAlert.objects.bulk_create(alerts, batch_size=LowStockAlerts.BATCH_SIZE)
+                UserAlert.objects.bulk_create(
+                    [UserAlert(user_id=user_id, alert_id=alert.id) for alert in alerts for user_id in recipients],
+                    batch_size=LowStockAlerts.BATCH_SIZE
+                )
+
+            created += len(alerts)
+
+        if created:
+            logger.info(f"Alertas de stock bajo creadas: {created} ({len(recipients)} destinatarios)")
+
+        return created
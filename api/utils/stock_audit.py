@@ -0,0 +1,144 @@
+# api/utils/stock_audit.py
+
+from django.db import transaction
+from django.utils import timezone
+from api.models import Product, StockAudit
+from api.models.ticket import StockAuditLine
+from decimal import Decimal
+from itertools import islice
+import csv
+import gzip
+import io
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class StockAuditLog:
+    """
+    Auditoría de cambios de stock
+
+    El encabezado (StockAudit) guarda solo un resumen; el cambio de cada
+    producto va en StockAuditLine y se escribe con bulk_create. Las
+    auditorías antiguas se archivan como CSV comprimido en el mismo
+    encabezado y sus líneas se eliminan.
+    """
+
+    BATCH_SIZE = 1000
+    ARCHIVE_COLUMNS = ['product_id', 'old_stock', 'new_stock']
+
+    # ===== Escritura =====
+
+    @staticmethod
+    def start(company, action_type, description, user, ip_address=None, user_agent='', **extra):
+        """Crear el encabezado de la auditoría (las líneas se agregan con add_lines)"""
+        return StockAudit.objects.create(
+            company=company,
+            action_type=action_type,
+            description=description,
+            performed_by=user,
+            ip_address=ip_address,
+            user_agent=user_agent[:500],
+            **extra
+        )
+
+    @staticmethod
+    def add_lines(audit, changes):
+        """
+        Agregar líneas [(product_id, stock anterior, stock nuevo)] en lotes
+        Retorna la cantidad de líneas escritas
+        """
+        changes = iter(changes)
+        count = 0
+
+        while True:
+            batch = [
+                StockAuditLine(audit=audit, product_id=product_id, old_stock=old_stock, new_stock=new_stock)
+                for product_id, old_stock, new_stock in islice(changes, StockAuditLog.BATCH_SIZE)
+            ]
+            if not batch:
+                break
+
+            StockAuditLine.objects.bulk_create(batch)
+            count += len(batch)
+
+        return count
+
+    @staticmethod
+    def finish(audit, affected_count):
+        """Registrar la cantidad final de productos afectados"""
+        audit.affected_products_count = affected_count
+        audit.save(update_fields=['affected_products_count'])
+
+    # ===== Lectura =====
+
+    @staticmethod
+    def lines(audit):
+        """
+        Líneas de la auditoría como dicts (product_id, old_stock, new_stock)
+        QuerySet si están en la tabla, lista si la auditoría está archivada
+        """
+        if audit.archived_at:
+            return StockAuditLog._read_archive(audit.lines_archive)
+
+        return StockAuditLine.objects.filter(audit=audit).order_by('product__barcode').values(*StockAuditLog.ARCHIVE_COLUMNS)
+
+    @staticmethod
+    def with_products(lines):
+        """Completar una página de líneas con código y nombre del producto (una consulta)"""
+        lines = list(lines)
+        products = Product.objects.filter(
+            id__in={line['product_id'] for line in lines}
+        ).in_bulk(field_name='id')
+
+        for line in lines:
+            product = products.get(line['product_id'])
+            line['product_id'] = str(line['product_id'])
+            line['barcode'] = product.barcode if product else None
+            line['name'] = product.name if product else None
+            line['old_stock'] = float(line['old_stock'])
+            line['new_stock'] = float(line['new_stock'])
+
+        return lines
+
+    # ===== Archivo =====
+
+    @staticmethod
+    def _read_archive(data):
+        text = gzip.decompress(bytes(data)).decode('utf-8')
+        return [
+            {
+                'product_id': uuid.UUID(row['product_id']),
+                'old_stock': Decimal(row['old_stock']),
+                'new_stock': Decimal(row['new_stock'])
+            }
+            for row in csv.DictReader(io.StringIO(text))
+        ]
+
+    @staticmethod
+    def archive(audit):
+        """Comprimir las líneas de la auditoría en el encabezado y eliminarlas"""
+        if audit.archived_at:
+            return 0
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(StockAuditLog.ARCHIVE_COLUMNS)
+
+        lines = StockAuditLine.objects.filter(audit=audit).order_by('product__barcode').values_list(
+            *StockAuditLog.ARCHIVE_COLUMNS
+        )
+        count = 0
+        for row in lines.iterator(chunk_size=StockAuditLog.BATCH_SIZE):
+            writer.writerow(row)
+            count += 1
+
+        with transaction.atomic():
+            audit.lines_archive = gzip.compress(buffer.getvalue().encode('utf-8'))
+            audit.archived_at = timezone.now()
+            audit.save(update_fields=['lines_archive', 'archived_at'])
+            StockAuditLine.objects.filter(audit=audit).delete()
+
+        logger.info(f"[AUDIT] Auditoría {audit.id} archivada: {count} líneas, {len(audit.lines_archive)} bytes")
+        return count
@@ -0,0 +1,227 @@
+# api/utils/stock_updates.py
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from api.models import Product
+from api.utils.inventory_valuation import InventoryValuation
+from api.utils.stock_audit import StockAuditLog
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+import codecs
+import csv
+import json
+import logging
+import os
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class StockUpdater:
+    """
+    Actualización masiva de stock (conteos de inventario físico)
+
+    Las entradas se procesan en bloques, cada uno en su propia transacción
+    y todos bajo la misma auditoría: el bloque bloquea sus productos con un
+    único SELECT ... FOR UPDATE (en orden de id), escribe los nuevos stocks
+    con bulk_update y las líneas de auditoría (stock anterior de esa misma
+    lectura) con bulk_create. Así una transacción nunca retiene los
+    bloqueos de un bloque anterior mientras pide los del siguiente (el
+    orden de bloqueo es siempre creciente, igual que en el checkout). Si la
+    carga falla a mitad, la auditoría registra los bloques ya confirmados.
+    """
+
+    CHUNK_SIZE = 1000
+    BATCH_SIZE = 500
+
+    FILE_FORMATS = {
+        '.csv': 'csv',
+        '.jsonl': 'jsonl',
+        '.ndjson': 'jsonl',
+    }
+
+    # ===== Lectura de archivos =====
+
+    @staticmethod
+    def read_file(file):
+        """
+        Entradas [(línea, {'product_id'|'barcode', 'new_stock'})] de un archivo
+        CSV (con encabezado) o JSON lines, leído de forma incremental
+        ValueError si el formato no es soportado
+        """
+        extension = os.path.splitext(file.name)[1].lower()
+        file_format = StockUpdater.FILE_FORMATS.get(extension)
+
+        if file_format == 'csv':
+            return StockUpdater._read_csv(file)
+        if file_format == 'jsonl':
+            return StockUpdater._read_jsonl(file)
+
+        raise ValueError('El archivo debe ser .csv o .jsonl')
+
+    @staticmethod
+    def _read_csv(file):
+        lines = codecs.iterdecode(file, 'utf-8-sig')
+        header = next(lines, '')
+        # Excel en español separa con punto y coma
+        delimiter = ';' if header.count(';') > header.count(',') else ','
+        columns = [name.strip().lower() for name in next(csv.reader([header], delimiter=delimiter), [])]
+
+        for line, values in enumerate(csv.reader(lines, delimiter=delimiter), start=2):
+            if not any(value.strip() for value in values):
+                continue
+            yield line, dict(zip(columns, values))
+
+    @staticmethod
+    def _read_jsonl(file):
+        for line, raw in enumerate(codecs.iterdecode(file, 'utf-8-sig'), start=1):
+            if not raw.strip():
+                continue
+            try:
+                entry = json.loads(raw)
+            except ValueError:
+                entry = None
+            yield line, entry if isinstance(entry, dict) else {'_invalid': raw}
+
+    # ===== Validación =====
+
+    @staticmethod
+    def parse_entry(entry):
+        """
+        Validar una entrada
+        Retorna ((campo, valor), nuevo stock, None) o (None, None, mensaje de error)
+        """
+        if '_invalid' in entry:
+            return None, None, 'línea no es un objeto JSON válido'
+
+        product_id = str(entry.get('product_id') or '').strip()
+        barcode = str(entry.get('barcode') or '').strip()
+
+        if product_id:
+            try:
+                key = ('id', uuid.UUID(product_id))
+            except ValueError:
+                return None, None, f"product_id '{product_id}' no es válido"
+        elif barcode:
+            key = ('barcode', barcode)
+        else:
+            return None, None, 'falta product_id o barcode'
+
+        value = entry.get('new_stock')
+        try:
+            new_stock = Decimal(str(value).strip().replace(',', '.'))
+        except InvalidOperation:
+            return None, None, f"new_stock '{value}' no es un número"
+
+        # stock_units no tiene decimales (máx. 10 dígitos)
+        if not new_stock.is_finite() or new_stock < 0 or new_stock >= Decimal('1e10'):
+            return None, None, f"new_stock '{value}' no es un número válido"
+
+        return key, new_stock.quantize(Decimal('1')), None
+
+    # ===== Actualización =====
+
+    @staticmethod
+    def _lock(company, keys):
+        """Bloquear y leer los productos del bloque: {('id'|'barcode', valor): fila}"""
+        ids = [value for field, value in keys if field == 'id']
+        barcodes = [value for field, value in keys if field == 'barcode']
+
+        rows = Product.objects.select_for_update().filter(
+            Q(id__in=ids) | Q(barcode__in=barcodes),
+            company=company
+        ).order_by('id').values('id', 'barcode', 'stock_units')
+
+        snapshot = {}
+        for row in rows:
+            snapshot[('id', row['id'])] = row
+            snapshot[('barcode', row['barcode'])] = row
+        return snapshot
+
+    @staticmethod
+    def apply(company, entries, user, reason, ip_address=None, user_agent=''):
+        """
+        Aplicar entradas [(línea, dict)] y registrar la auditoría
+
+        Retorna {'audit_id', 'updated', 'unchanged', 'errors'}; las entradas
+        inválidas, repetidas o de productos inexistentes se informan como
+        error de su línea y no detienen el resto.
+        """
+        result = {'audit_id': None, 'updated': 0, 'unchanged': 0, 'errors': []}
+        seen = set()
+        entries = iter(entries)
+
+        audit = StockAuditLog.start(
+            company, 'bulk_update', f"Actualización masiva de stock. Razón: {reason}", user,
+            ip_address=ip_address,
+            user_agent=user_agent
+        )
+
+        try:
+            while True:
+                chunk = list(islice(entries, StockUpdater.CHUNK_SIZE))
+                if not chunk:
+                    break
+
+                parsed = []
+                for line, entry in chunk:
+                    key, new_stock, error = StockUpdater.parse_entry(entry)
+                    if error:
+                        result['errors'].append(f"Línea {line}: {error}")
+                    else:
+                        parsed.append((line, key, new_stock))
+
+                with transaction.atomic():
+                    snapshot = StockUpdater._lock(company, [key for _, key, _ in parsed])
+                    now = timezone.now()
+                    to_update = []
+                    changes = []
+                    unchanged = 0
+                    errors = []
+                    chunk_seen = set()
+
+                    for line, key, new_stock in parsed:
+                        row = snapshot.get(key)
+
+                        if row is None:
+                            errors.append(f"Línea {line}: Producto {key[1]} no encontrado")
+                            continue
+
+                        if row['id'] in seen or row['id'] in chunk_seen:
+                            errors.append(f"Línea {line}: Producto {row['barcode']} repetido en la carga")
+                            continue
+                        chunk_seen.add(row['id'])
+
+                        if row['stock_units'] == new_stock:
+                            unchanged += 1
+                            continue
+
+                        to_update.append(Product(id=row['id'], stock_units=new_stock, updated_at=now))
+                        changes.append((row['id'], row['stock_units'], new_stock))
+
+                    Product.objects.bulk_update(
+                        to_update,
+                        ['stock_units', 'updated_at'],
+                        batch_size=StockUpdater.BATCH_SIZE
+                    )
+                    StockAuditLog.add_lines(audit, changes)
+                    if to_update:
+                        InventoryValuation.invalidate_company(company.id)
+
+                # Contar el bloque solo cuando quedó confirmado
+                seen |= chunk_seen
+                result['errors'].extend(errors)
+                result['unchanged'] += unchanged
+                result['updated'] += len(to_update)
+        finally:
+            StockAuditLog.finish(audit, result['updated'])
+
+        result['audit_id'] = str(audit.id)
+
+        logger.info(
+            f"Actualización masiva de stock: {result['updated']} productos, "
+            f"{result['unchanged']} sin cambios, {len(result['errors'])} errores. "
+            f"Realizado por: {user.email}"
+        )
+        return result
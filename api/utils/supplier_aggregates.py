@@ -0,0 +1,60 @@
+# api/utils/supplier_aggregates.py
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from decimal import Decimal
+
+
+class SupplierAggregates:
+    """
+    Compras, órdenes pendientes y deuda por proveedor calculadas en la base de datos
+
+    Los listados anotan los tres valores en la misma consulta de
+    proveedores (una sola unión con purchase_orders); se leen siempre de
+    las órdenes, así que crear, cancelar o pagar una orden no requiere
+    mantener columnas adicionales.
+    """
+
+    PURCHASED_STATUSES = ['completed', 'paid']
+    DEBT_STATUSES = ['pending', 'partial', 'paid']
+
+    FIELDS = ['purchases_count', 'pending_count', 'debt_amount']
+
+    @staticmethod
+    def _expressions(prefix=''):
+        amount = DecimalField(max_digits=14, decimal_places=2)
+        return {
+            'purchases_count': Count(
+                f'{prefix}id',
+                filter=Q(**{f'{prefix}status__in': SupplierAggregates.PURCHASED_STATUSES})
+            ),
+            'pending_count': Count(
+                f'{prefix}id',
+                filter=Q(**{f'{prefix}status': 'pending'})
+            ),
+            'debt_amount': Coalesce(
+                Sum(
+                    ExpressionWrapper(F(f'{prefix}total_amount') - F(f'{prefix}paid_amount'), output_field=amount),
+                    filter=Q(**{f'{prefix}status__in': SupplierAggregates.DEBT_STATUSES})
+                ),
+                Value(Decimal('0'), output_field=amount)
+            ),
+        }
+
+    @staticmethod
+    def annotate(suppliers):
+        """Queryset de proveedores con purchases_count, pending_count y debt_amount"""
+        return suppliers.annotate(**SupplierAggregates._expressions('purchase_orders__'))
+
+    @staticmethod
+    def of(supplier):
+        """
+        Agregados de una instancia: usa la anotación si viene en ella;
+        si no, los calcula con una consulta y los guarda en la instancia
+        """
+        if not hasattr(supplier, 'debt_amount'):
+            totals = supplier.purchase_orders.aggregate(**SupplierAggregates._expressions())
+            for field in SupplierAggregates.FIELDS:
+                setattr(supplier, field, totals[field])
+
+        return {field: getattr(supplier, field) for field in SupplierAggregates.FIELDS}
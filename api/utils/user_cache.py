@@ -0,0 +1,61 @@
+# api/utils/user_cache.py
+
+from django.core.cache import cache
+from api.models import User
+from api.utils.permission_cache import VersionedCache
+import copy
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache(VersionedCache):
+    """
+    Cache de usuarios autenticados (con company y role)
+
+    Evita consultar el usuario en cada request autenticado. Se guarda en
+    memoria del proceso y en el cache de Django; al guardar o eliminar un
+    usuario (actualización, desactivación) se incrementa su versión al
+    confirmar la transacción. La copia en memoria se valida contra las
+    versiones (leídas del cache compartido a lo más cada VERSION_TTL
+    segundos), así que puede durar tanto como la del cache compartido: en
+    estado estable el request no consulta la base de datos ni el cache.
+    Con DatabaseCache cada lectura del cache compartido es una consulta
+    (ver CACHES en settings).
+    """
+
+    CACHE_TIMEOUT = 300  # 5 minutos en cache compartido
+    LOCAL_TIMEOUT = 300  # 5 minutos en memoria del proceso (validada por versión)
+    KEY_PREFIX = 'auth_user'
+
+    # {user_id: (versions, expires_at, user)}
+    _local = {}
+
+    @classmethod
+    def get_user(cls, user_id):
+        """
+        Obtener usuario con company y role
+        Lanza User.DoesNotExist si no existe
+        """
+        user_id = str(user_id)
+        versions = cls._read_versions([cls._version_key('global'), cls._version_key('user', user_id)])
+        now = time.monotonic()
+
+        entry = cls._local.get(user_id)
+        if entry and entry[0] == versions and entry[1] > now:
+            user = entry[2]
+        else:
+            shared_key = f"{cls.KEY_PREFIX}:obj:{user_id}:" + ':'.join(map(str, versions))
+            user = cache.get(shared_key)
+
+            if user is None:
+                user = User.objects.select_related('company', 'role').get(id=user_id)
+                cache.set(shared_key, user, cls.CACHE_TIMEOUT)
+                logger.debug(f"[AUTH] Usuario cargado en cache: {user.email}")
+
+            cls._local[user_id] = (versions, now + cls.LOCAL_TIMEOUT, user)
+
+        # Copia por request: los caches del request (permisos, páginas)
+        # se guardan como atributos del usuario y no deben compartirse
+        return copy.copy(user)
@@ -11,6 +11,7 @@ from api.serializers.payment_serializers import (
 )
 from api.middleware.permission_middleware import PermissionMiddleware
 from api.utils.pagination import Paginator
+from api.utils.stock_alerts import LowStockAlerts
 from django.db.models import Q
 from django.db import transaction
 from django.utils import timezone
@@ -290,44 +291,7 @@ def create_low_stock_alert(product):
     Esta función se llama automáticamente cuando el stock baja del mínimo
     """
     try:
-        # Verificar si ya existe una alerta activa para este producto
-        existing = SystemAlert.objects.filter(
-            company=product.company,
-            alert_type='low_stock',
-            product=product,
-            status='unread'
-        ).exists()
-        
-        if existing:
-            return  # Ya hay una alerta activa
-        
-        # Crear alerta del sistema
-        system_alert = SystemAlert.objects.create(
-            company=product.company,
-            alert_type='low_stock',
-            title=f'Stock bajo: {product.name}',
-            message=f'El producto {product.name} (código: {product.barcode}) '
-                   f'tiene stock bajo. Stock actual: {product.stock_units}, '
-                   f'mínimo: {product.min_stock}',
-            product=product,
-            status='unread'
-        )
-        
-        # Enviar a administradores
-        admins = User.objects.filter(
-            company=product.company,
-            role__name__in=['admin', 'master_admin'],
-            is_active=True
-        )
-        
-        user_alerts = [
-            UserAlert(user=admin, alert=system_alert)
-            for admin in admins
-        ]
-        UserAlert.objects.bulk_create(user_alerts)
-        
-        logger.info(f"Alerta de stock bajo creada para: {product.name}")
-        
+        LowStockAlerts.generate(product.company, [product.id])
     except Exception as e:
         logger.error(f"Error creando alerta de stock bajo: {str(e)}")
 
@@ -380,25 +344,8 @@ def check_and_create_low_stock_alerts(request):
     if not PermissionMiddleware.check_permission(request.user, 'alerts', 'create'):
         return Response({'error': 'Sin permisos'}, status=403)
     
-    # Buscar productos con stock bajo sin alertas activas
-    from django.db.models import F
-    
-    low_stock_products = Product.objects.filter(
-        company=request.user.company,
-        is_active=True,
-        stock_units__lte=F('min_stock')
-    ).exclude(
-        id__in=SystemAlert.objects.filter(
-            company=request.user.company,
-            alert_type='low_stock',
-            status='unread'
-        ).values_list('product_id', flat=True)
-    )
-    
-    created_count = 0
-    for product in low_stock_products:
-        create_low_stock_alert(product)
-        created_count += 1
+    # Productos con stock bajo sin alertas activas (una consulta y inserciones por lote)
+    created_count = LowStockAlerts.generate(request.user.company)
     
     return Response({
         'message': f'{created_count} alerta(s) de stock bajo creada(s)',
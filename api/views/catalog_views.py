@@ -0,0 +1,68 @@
+# api/views/catalog_views.py
+
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from api.middleware.permission_middleware import PermissionMiddleware
+from api.utils.catalog_sync import CatalogSync
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+import gzip
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@api_view(['GET'])
+def catalog_snapshot(request):
+    """
+    Catálogo completo para la caja (productos activos y promociones vigentes)
+
+    Se entrega como JSON comprimido con gzip junto a un ETag; con
+    If-None-Match igual al ETag responde 304 sin cuerpo. El campo 'version'
+    se usa luego en catalog/delta/?since=<version>.
+    """
+    if not PermissionMiddleware.check_permission(request.user, 'products', 'view'):
+        return Response({'error': 'Sin permisos'}, status=403)
+
+    etag, data = CatalogSync.snapshot(request.user.company)
+    etag = f'"{etag}"'
+
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        response = HttpResponse(status=304)
+    elif 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        response = HttpResponse(data, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(gzip.decompress(data), content_type='application/json')
+
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+@api_view(['GET'])
+def catalog_delta(request):
+    """
+    Cambios del catálogo desde una versión
+
+    Query Parameters:
+        since (str): Versión del catálogo local (snapshot o delta anterior)
+
+    Retorna productos y promociones modificados (incluidos los desactivados)
+    e ids eliminados. Si la versión es más antigua que la retención de
+    eliminaciones responde 410 y la caja debe descargar el catálogo completo.
+    """
+    if not PermissionMiddleware.check_permission(request.user, 'products', 'view'):
+        return Response({'error': 'Sin permisos'}, status=403)
+
+    try:
+        since = CatalogSync.decode_version(request.GET.get('since', ''))
+    except (ValueError, OverflowError):
+        return Response({'error': 'Parámetro since inválido'}, status=400)
+
+    if CatalogSync.is_expired(since):
+        return Response({
+            'error': 'Versión demasiado antigua, descargue el catálogo completo'
+        }, status=410)
+
+    return Response(CatalogSync.delta(request.user.company, since))
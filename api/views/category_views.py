@@ -5,6 +5,7 @@ from rest_framework.response import Response
 from api.models import Category, Department, Product
 from api.serializers.category_serializers import CategorySerializer, CategoryDetailSerializer
 from api.middleware.permission_middleware import PermissionMiddleware
+from api.utils.category_tree import CategoryTree
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,7 +26,9 @@ def list_categories(request):
     if department_id:
         categories = categories.filter(department_id=department_id)
     
-    categories = categories.order_by('department__name', 'name')
+    categories = categories.annotate(
+        active_products=CategoryTree.active_products()
+    ).order_by('department__name', 'name')
     serializer = CategorySerializer(categories, many=True)
     return Response(serializer.data)
 
@@ -6,11 +6,13 @@ from rest_framework import status
 from api.models import Client
 from api.serializers.client_serializers import (
     ClientSerializer, 
+    ClientStatsSerializer,
     ClientDetailSerializer,
     ClientCreateSerializer
 )
 from api.middleware.permission_middleware import PermissionMiddleware
 from api.utils.excel_handler import ExcelExporter
+from api.utils.background_jobs import JobQueue
 from api.utils.validators import RutValidator
 from django.db.models import Q
 import logging
@@ -28,6 +30,7 @@ def list_clients(request):
         page_size (int): Items por página (default: 50, max: 500)
         has_credit (bool): Filtrar por clientes con crédito
         has_debt (bool): Filtrar por clientes con deuda
+        with_stats (bool): Incluir el resumen de compras de cada cliente
     """
     if not PermissionMiddleware.check_permission(request.user, 'clients', 'view'):
         return Response({'error': 'Sin permisos'}, status=403)
@@ -55,18 +58,25 @@ def list_clients(request):
     
     clients = clients.order_by('first_name', 'last_name')
     
+    # Resumen de compras en la misma consulta (tabla client_totals)
+    serializer_class = ClientSerializer
+    with_stats = request.GET.get('with_stats')
+    if with_stats and with_stats.lower() == 'true':
+        clients = clients.select_related('totals')
+        serializer_class = ClientStatsSerializer
+    
     # Verificar si se solicita paginación
     if 'page' in request.GET:
         return Paginator.paginate_response(
             clients, 
             request, 
-            ClientSerializer,
+            serializer_class,
             default_page_size=50,
             max_page_size=500
         )
     
     # Sin paginación
-    serializer = ClientSerializer(clients, many=True)
+    serializer = serializer_class(clients, many=True)
     return Response(serializer.data)
 
 
@@ -77,7 +87,7 @@ def get_client(request, client_id):
         return Response({'error': 'Sin permisos'}, status=403)
     
     try:
-        client = Client.objects.get(
+        client = Client.objects.select_related('totals').get(
             id=client_id,
             company=request.user.company
         )
@@ -98,7 +108,7 @@ def get_client_by_rut(request, rut):
         # Formatear RUT para búsqueda
         formatted_rut = RutValidator.format_rut(rut)
         
-        client = Client.objects.get(
+        client = Client.objects.select_related('totals').get(
             rut=formatted_rut,
             company=request.user.company,
             is_active=True
@@ -204,6 +214,10 @@ def export_clients(request):
     if not PermissionMiddleware.check_permission(request.user, 'clients', 'view'):
         return Response({'error': 'Sin permisos'}, status=403)
     
+    # Ejecutar en segundo plano (?async=true)
+    if JobQueue.wants_async(request):
+        return JobQueue.accepted_response(JobQueue.enqueue(request.user, 'client_export'))
+    
     # Master Admin exporta de todas las companies
     if request.user.role.name == 'master_admin':
         clients = Client.objects.filter(is_active=True)
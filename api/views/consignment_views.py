@@ -7,6 +7,7 @@ from api.models import Consignment, ConsignmentItem, Client, Product
 from api.serializers.consignment_serializer import ConsignmentSerializer, ConsignmentItemSerializer
 from api.middleware.permission_middleware import PermissionMiddleware
 from api.utils.pagination import Paginator
+from api.utils.sequences import SequenceAllocator
 from django.db.models import Sum, Q, F
 from django.db import transaction
 from django.utils import timezone
@@ -185,24 +186,10 @@ def create_consignment(request):
                 'unit_price': unit_price
             })
         
-        # Generar número de consignación
-        last_consignment = Consignment.objects.filter(
-            company=request.user.company
-        ).order_by('-created_at').first()
-        
-        if last_consignment and last_consignment.consignment_number:
-            try:
-                last_number = int(last_consignment.consignment_number.split('-')[-1])
-                new_number = last_number + 1
-            except:
-                new_number = 1
-        else:
-            new_number = 1
-        
         # Crear consignación
         consignment = Consignment.objects.create(
             company=request.user.company,
-            consignment_number=f"CONS-{new_number:06d}",
+            consignment_number=SequenceAllocator.next_number(request.user.company, 'consignment'),
             client=client,
             event_name=data.get('event_name'),
             event_location=data.get('event_location', ''),
@@ -225,7 +212,7 @@ def create_consignment(request):
             
             # Reducir stock
             item['product'].stock_units -= item['delivered_quantity']
-            item['product'].save()
+            item['product'].save(update_fields=['stock_units', 'updated_at'])
         
         logger.info(
             f"Consignación creada: {consignment.consignment_number} "
@@ -336,7 +323,7 @@ def settle_consignment(request, consignment_id):
             # Restaurar stock con productos devueltos
             if returned_qty > 0:
                 item.product.stock_units += returned_qty
-                item.product.save()
+                item.product.save(update_fields=['stock_units', 'updated_at'])
             
             # Calcular valores
             total_sold_value += sold_qty * item.unit_price
@@ -405,7 +392,7 @@ def cancel_consignment(request, consignment_id):
             pending_qty = item.pending_quantity
             if pending_qty > 0:
                 item.product.stock_units += pending_qty
-                item.product.save()
+                item.product.save(update_fields=['stock_units', 'updated_at'])
         
         # Cancelar consignación
         consignment.status = 'cancelled'
@@ -4,6 +4,8 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from api.models import Credit, CreditPayment, Client, Shift
+from api.models.shift import ShiftTotals
+from api.models.client import ClientTotals
 from api.serializers.credit_serializers import (
     CreditSerializer,
     CreditDetailSerializer,
@@ -13,6 +15,7 @@ from api.serializers.credit_serializers import (
 )
 from api.middleware.permission_middleware import PermissionMiddleware
 from api.utils.excel_handler import ExcelExporter
+from api.utils.background_jobs import JobQueue
 from api.utils.pagination import Paginator
 from django.db.models import Sum, Q, F
 from django.db import transaction
@@ -31,6 +34,8 @@ def list_credits(request):
     Query Parameters:
         page (int): Número de página
         page_size (int): Items por página (default: 50)
+        cursor (str): Paginación por cursor (vacío = primera página), usar next_cursor
+        count (bool): Incluir el total en modo cursor
         status (str): Filtrar por estado (pending, partial, paid, cancelled)
         client_id (uuid): Filtrar por cliente
         overdue (bool): Solo créditos vencidos
@@ -71,14 +76,15 @@ def list_credits(request):
     if end_date:
         credits = credits.filter(created_at__lte=end_date)
     
-    credits = credits.order_by('-created_at')
+    credits = credits.order_by('-created_at', '-id')
     
     return Paginator.paginate_response(
         credits,
         request,
         CreditListSerializer,
         default_page_size=50,
-        max_page_size=200
+        max_page_size=200,
+        cursor_ordering=['-created_at', '-id']
     )
 
 
@@ -214,6 +220,9 @@ def pay_credit(request):
             notes=validated_data.get('notes', '')
         )
         
+        # Acumular en los totales del turno
+        ShiftTotals.record_credit_payment(payment)
+        
         # Actualizar crédito
         credit.paid_amount += amount
         credit.remaining_amount -= amount
@@ -222,6 +231,7 @@ def pay_credit(request):
         if credit.remaining_amount <= Decimal('0.01'):  # Tolerancia de 1 centavo
             credit.status = 'paid'
             credit.remaining_amount = Decimal('0')
+            ClientTotals.record_credit_closed(credit)
         else:
             credit.status = 'partial'
         
@@ -258,6 +268,7 @@ def list_credit_payments(request):
     
     Query Parameters:
         page (int): Número de página
+        cursor (str): Paginación por cursor (vacío = primera página), usar next_cursor
         credit_id (uuid): Filtrar por crédito
         client_id (uuid): Filtrar por cliente
         start_date (date): Desde fecha
@@ -293,14 +304,15 @@ def list_credit_payments(request):
     if payment_method:
         payments = payments.filter(payment_method=payment_method)
     
-    payments = payments.order_by('-created_at')
+    payments = payments.order_by('-created_at', '-id')
     
     return Paginator.paginate_response(
         payments,
         request,
         CreditPaymentSerializer,
         default_page_size=50,
-        max_page_size=200
+        max_page_size=200,
+        cursor_ordering=['-created_at', '-id']
     )
 
 
@@ -384,6 +396,11 @@ def export_credits(request):
     if not PermissionMiddleware.check_permission(request.user, 'credits', 'export'):
         return Response({'error': 'Sin permisos'}, status=403)
     
+    # Ejecutar en segundo plano (?async=true)
+    if JobQueue.wants_async(request):
+        params = {key: request.GET.get(key) for key in ('status', 'client_id', 'overdue')}
+        return JobQueue.accepted_response(JobQueue.enqueue(request.user, 'credit_export', params))
+    
     # Aplicar mismos filtros que en list
     credits = Credit.objects.filter(
         client__company=request.user.company
@@ -407,53 +424,8 @@ def export_credits(request):
     
     credits = credits.order_by('-created_at')
     
-    # Preparar datos
-    data = []
-    for credit in credits:
-        client = credit.client
-        
-        # Calcular días de atraso
-        days_overdue = 0
-        if credit.status in ['pending', 'partial'] and credit.due_date:
-            today = timezone.now().date()
-            if today > credit.due_date:
-                days_overdue = (today - credit.due_date).days
-        
-        data.append({
-            'Cliente': f"{client.first_name} {client.last_name}",
-            'RUT': client.rut,
-            'Teléfono': client.phone or '',
-            'Dirección': client.address or '',
-            'Monto Total': float(credit.total_amount),
-            'Monto Pagado': float(credit.paid_amount),
-            'Saldo Pendiente': float(credit.remaining_amount),
-            'Estado': credit.get_status_display(),
-            'Fecha Crédito': credit.created_at.strftime('%Y-%m-%d'),
-            'Fecha Vencimiento': credit.due_date.strftime('%Y-%m-%d') if credit.due_date else '',
-            'Días Atraso': days_overdue,
-            'Número Venta': credit.sale.sale_number if credit.sale else ''
-        })
-    
-    filename = f'creditos_{request.user.company.name}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    try:
-        file_path = ExcelExporter.export_to_excel(
-            data=data,
-            filename=filename,
-            sheet_name='Créditos'
-        )
-        
-        with open(file_path, 'rb') as f:
-            response = Response(
-                f.read(),
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            return response
-    
-    except Exception as e:
-        logger.error(f"Error exportando créditos: {str(e)}")
-        return Response({'error': 'Error al exportar'}, status=500)
+    logger.info(f"Exportando {credits.count()} créditos por {request.user.email}")
+    return ExcelExporter.export_credits(credits, request.user.company.name)
 
 
 @api_view(['GET'])
@@ -7,6 +7,8 @@ from api.models import Department
 from api.serializers.department_serializers import DepartmentSerializer, DepartmentDetailSerializer
 from api.middleware.permission_middleware import PermissionMiddleware
 from api.utils.excel_handler import ExcelExporter
+from api.utils.background_jobs import JobQueue
+from api.utils.category_tree import CategoryTree
 from django.db.models import Q
 import logging
 from api.utils.pagination import Paginator
@@ -34,7 +36,9 @@ def list_departments(request):
             is_active=True
         )
     
-    departments = departments.order_by('name')
+    departments = departments.annotate(
+        active_products=CategoryTree.active_products()
+    ).order_by('name')
     
     # Verificar si se solicita paginación
     if 'page' in request.GET:
@@ -154,6 +158,10 @@ def export_departments(request):
     if not PermissionMiddleware.check_permission(request.user, 'products', 'export'):
         return Response({'error': 'Sin permisos'}, status=403)
     
+    # Ejecutar en segundo plano (?async=true)
+    if JobQueue.wants_async(request):
+        return JobQueue.accepted_response(JobQueue.enqueue(request.user, 'department_export'))
+    
     # Master Admin exporta de todas las companies
     if request.user.role.name == 'master_admin':
         departments = Department.objects.filter(is_active=True)
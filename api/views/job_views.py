@@ -0,0 +1,112 @@
+# api/views/job_views.py
+
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework import status
+from api.models.configuration import BackgroundJob
+from api.serializers.job_serializers import BackgroundJobSerializer
+from api.utils.background_jobs import JobQueue
+from api.utils.pagination import Paginator
+from django.core.files.storage import default_storage
+from django.http import FileResponse
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Roles que ven las tareas de toda la empresa
+ADMIN_ROLES = ['master_admin', 'super_admin', 'admin']
+
+
+def _visible_jobs(user):
+    """Tareas visibles: propias, o de toda la empresa para administradores"""
+    jobs = BackgroundJob.objects.filter(company=user.company).select_related('created_by')
+    
+    if user.role.name not in ADMIN_ROLES:
+        jobs = jobs.filter(created_by=user)
+    
+    return jobs
+
+
+@api_view(['GET'])
+def list_jobs(request):
+    """
+    Listar tareas en segundo plano
+    
+    Query Parameters:
+        status (str): Filtrar por estado
+        job_type (str): Filtrar por tipo
+    """
+    jobs = _visible_jobs(request.user)
+    
+    job_status = request.GET.get('status')
+    if job_status:
+        jobs = jobs.filter(status=job_status)
+    
+    job_type = request.GET.get('job_type')
+    if job_type:
+        jobs = jobs.filter(job_type=job_type)
+    
+    jobs = jobs.order_by('-created_at')
+    
+    if 'page' in request.GET:
+        return Paginator.paginate_response(
+            jobs,
+            request,
+            BackgroundJobSerializer,
+            default_page_size=20
+        )
+    
+    serializer = BackgroundJobSerializer(jobs[:50], many=True)
+    return Response(serializer.data)
+
+
+@api_view(['GET'])
+def get_job(request, job_id):
+    """Estado y progreso de una tarea (para polling)"""
+    try:
+        job = _visible_jobs(request.user).get(id=job_id)
+    except BackgroundJob.DoesNotExist:
+        return Response({'error': 'Tarea no encontrada'}, status=404)
+    
+    serializer = BackgroundJobSerializer(job)
+    return Response(serializer.data)
+
+
+@api_view(['GET'])
+def download_job_file(request, job_id):
+    """Descargar el archivo generado por una tarea completada"""
+    try:
+        job = _visible_jobs(request.user).get(id=job_id)
+    except BackgroundJob.DoesNotExist:
+        return Response({'error': 'Tarea no encontrada'}, status=404)
+    
+    if job.status != 'completed' or not job.result_file:
+        return Response({'error': 'La tarea no tiene archivo disponible'}, status=400)
+    
+    if not default_storage.exists(job.result_file):
+        return Response({'error': 'El archivo ya no está disponible'}, status=410)
+    
+    return FileResponse(
+        default_storage.open(job.result_file, 'rb'),
+        as_attachment=True,
+        filename=os.path.basename(job.result_file)
+    )
+
+
+@api_view(['POST'])
+def cancel_job(request, job_id):
+    """Cancelar una tarea pendiente o en ejecución"""
+    try:
+        job = _visible_jobs(request.user).get(id=job_id)
+    except BackgroundJob.DoesNotExist:
+        return Response({'error': 'Tarea no encontrada'}, status=404)
+    
+    if not JobQueue.cancel(job):
+        return Response({'error': 'La tarea ya terminó'}, status=400)
+    
+    logger.info(f"[JOBS] Tarea cancelada: {job.job_type} ({job.id}) por {request.user.email}")
+    
+    job.refresh_from_db()
+    serializer = BackgroundJobSerializer(job)
+    return Response(serializer.data)
@@ -3,17 +3,24 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from api.models import Product, Department, DefectiveProduct
+from api.models import Product, Department, DefectiveProduct, StockAudit
 from api.serializers.product_serializers import (
     ProductSerializer,
     ProductListSerializer,
+    ProductListRows,
     DefectiveProductSerializer,
     ProductImportSerializer
 )
 from api.middleware.permission_middleware import PermissionMiddleware
 from api.utils.excel_handler import ExcelExporter, ExcelImporter
-from django.db.models import Q
+from api.utils.background_jobs import JobQueue
+from api.utils.barcode_index import BarcodeIndex
+from api.utils.catalog_sync import CatalogSync
+from api.utils.category_tree import CategoryTree
+from api.utils.inventory_valuation import InventoryValuation
+from django.db.models import Q, Count
 from django.db import transaction
+from django.utils import timezone
 import logging
 from django.db.models import F
 from api.utils.pagination import Paginator
@@ -55,7 +62,7 @@ def list_products(request):
     if low_stock and low_stock.lower() == 'true':
         products = products.filter(stock_units__lte=F('min_stock'))
     
-    products = products.select_related('department').order_by('name')
+    products = products.select_related('department', 'category').order_by('name')
     
     # Verificar si se solicita paginación
     if 'page' in request.GET:
@@ -68,9 +75,8 @@ def list_products(request):
             max_page_size=500
         )
     
-    # Sin paginación: devolver todos los items
-    serializer = ProductListSerializer(products, many=True)
-    return Response(serializer.data)
+    # Sin paginación: devolver todos los items (values(), sin instanciar productos)
+    return Response(ProductListRows.serialize(products))
 
 
 @api_view(['GET'])
@@ -98,15 +104,8 @@ def get_product_by_barcode(request, barcode):
         return Response({'error': 'Sin permisos'}, status=403)
     
     try:
-        # Buscar por barcode o barcode_package
-        product = Product.objects.select_related('department').get(
-            Q(barcode=barcode) | Q(barcode_package=barcode),
-            company=request.user.company,
-            is_active=True
-        )
-        
-        serializer = ProductSerializer(product)
-        return Response(serializer.data)
+        # Buscar por barcode o barcode_package (índice de códigos + cache)
+        return Response(BarcodeIndex.find(request.user.company, barcode))
         
     except Product.DoesNotExist:
         return Response({'error': 'Producto no encontrado'}, status=404)
@@ -203,7 +202,8 @@ def reset_stock(request):
         updated = Product.objects.filter(
             company=company,
             is_active=True
-        ).update(stock_units=0)
+        ).update(stock_units=0, updated_at=timezone.now())
+        InventoryValuation.invalidate_company(company.id)
     
     logger.warning(f"Stock reiniciado: {updated} productos por {request.user.email}")
     return Response({
@@ -218,6 +218,10 @@ def export_products(request):
     if not PermissionMiddleware.check_permission(request.user, 'products', 'view'):
         return Response({'error': 'Sin permisos'}, status=403)
     
+    # Ejecutar en segundo plano (?async=true)
+    if JobQueue.wants_async(request):
+        return JobQueue.accepted_response(JobQueue.enqueue(request.user, 'product_export'))
+    
     # Master Admin exporta de todas las companies
     if request.user.role.name == 'master_admin':
         products = Product.objects.filter(is_active=True)
@@ -229,7 +233,7 @@ def export_products(request):
         )
         company_name = request.user.company.name
     
-    products = products.select_related('department').order_by('name')
+    products = products.select_related('department', 'category').order_by('name')
     
     logger.info(f"Exportando {products.count()} productos por {request.user.email}")
     return ExcelExporter.export_products(products, company_name)
@@ -249,36 +253,30 @@ def import_products(request):
     file = serializer.validated_data['file']
     company = request.user.company
     
+    # Ejecutar en segundo plano (async=true)
+    if JobQueue.wants_async(request):
+        job = JobQueue.enqueue(request.user, 'product_import', upload=file)
+        return JobQueue.accepted_response(job)
+    
     # Crear mapa de departamentos
     departments = Department.objects.filter(company=company, is_active=True)
     department_map = {dept.name.lower(): dept for dept in departments}
     
-    # Importar
+    # Importar (crea o actualiza por código de barras, en bloques)
     result = ExcelImporter.import_products(file, company, department_map)
+    imported = result['created'] + result['updated'] + result['unchanged']
     
-    if result['success'] > 0:
-        # Crear productos
-        created_count = 0
-        with transaction.atomic():
-            for product_data in result['products']:
-                # Buscar o crear departamento
-                dept_name = product_data.pop('department_name', None)
-                if dept_name:
-                    dept = department_map.get(dept_name.lower())
-                    if dept:
-                        product_data['department'] = dept
-                
-                try:
-                    Product.objects.create(**product_data)
-                    created_count += 1
-                except Exception as e:
-                    result['errors'].append(f"Error creando producto: {str(e)}")
-        
-        logger.info(f"Productos importados: {created_count} por {request.user.email}")
+    if imported > 0:
+        logger.info(
+            f"Productos importados: {result['created']} creados, "
+            f"{result['updated']} actualizados por {request.user.email}"
+        )
         
         return Response({
-            'message': f'{created_count} productos importados exitosamente',
-            'created': created_count,
+            'message': f'{imported} productos importados exitosamente',
+            'created': result['created'],
+            'updated': result['updated'],
+            'unchanged': result['unchanged'],
             'errors': result['errors']
         })
     
@@ -420,7 +418,7 @@ def resolve_defective_product(request, defective_id):
         if resolution == 'changed':
             product = defective.product
             product.stock_units += defective.quantity
-            product.save()
+            product.save(update_fields=['stock_units', 'updated_at'])
     
     logger.info(f"Producto defectuoso resuelto: {defective.product.name} - {resolution} por {request.user.email}")
     
@@ -453,6 +451,8 @@ def products_by_navigation(request, department_slug=None, category_slug=None):
         departments = Department.objects.filter(
             company=company,
             is_active=True
+        ).annotate(
+            active_products=CategoryTree.active_products()
         ).order_by('name')
         
         response_data['departments'] = DepartmentSerializer(departments, many=True).data
@@ -467,7 +467,7 @@ def products_by_navigation(request, department_slug=None, category_slug=None):
                 extra_data=response_data
             )
        
-        response_data['products'] = ProductListSerializer(products, many=True).data
+        response_data['products'] = ProductListRows.serialize(products)
         return Response(response_data)
     
     # Caso 2: Con departamento - SOLO mostrar categorías (sin departamento ni productos)
@@ -491,15 +491,19 @@ def products_by_navigation(request, department_slug=None, category_slug=None):
             company=company,
             department=department,
             is_active=True
+        ).select_related('department').annotate(
+            active_products=CategoryTree.active_products()
         ).order_by('name')
         
-        # Contar productos del departamento sin categoría
-        products_without_category_count = Product.objects.filter(
-            company=company,
-            department=department,
-            category__isnull=True,
-            is_active=True
-        ).count()
+        # Contar productos del departamento sin categoría (árbol cacheado)
+        products_without_category_count = next(
+            (
+                node['no_category']['product_count']
+                for node in CategoryTree.get(company.id)['departments']
+                if node['id'] == str(department.id)
+            ),
+            0
+        )
         
         # SOLO retornar las categorías, sin department ni products
         response_data['categories'] = CategorySerializer(categories, many=True).data
@@ -576,13 +580,9 @@ def products_by_navigation(request, department_slug=None, category_slug=None):
                     }
                 )
             
-            # Convertir a lista para evitar paginación automática
-            products_list = list(products)
-            
-            # Serializar
+            # Serializar (values(), una sola consulta)
             try:
-                serializer = ProductListSerializer(products_list, many=True)
-                serialized_data = serializer.data
+                serialized_data = ProductListRows.serialize(products)
             except Exception as e:
                 return Response({
                     'error': f'Error en serialización: {str(e)}',
@@ -651,13 +651,9 @@ def products_by_navigation(request, department_slug=None, category_slug=None):
                 default_page_size=50
             )
         
-        # Convertir a lista para evitar paginación automática
-        products_list = list(products)
-        
-        # Serializar
+        # Serializar (values(), una sola consulta)
         try:
-            serializer = ProductListSerializer(products_list, many=True)
-            serialized_data = serializer.data
+            serialized_data = ProductListRows.serialize(products)
         except Exception as e:
             return Response({
                 'error': f'Error en serialización: {str(e)}',
@@ -692,6 +688,21 @@ def products_by_navigation(request, department_slug=None, category_slug=None):
         
         return Response(response_data, status=status.HTTP_200_OK)
     
+@api_view(['GET'])
+def navigation_tree(request):
+    """
+    Árbol completo de navegación: departamentos activos, sus categorías y
+    la opción "Sin Categoría", cada uno con su conteo de productos activos
+
+    Un solo documento cacheado por empresa; las páginas de navegación lo
+    usan en lugar de pedir los conteos nivel por nivel.
+    """
+    if not PermissionMiddleware.check_permission(request.user, 'products', 'view'):
+        return Response({'error': 'Sin permisos'}, status=status.HTTP_403_FORBIDDEN)
+    
+    return Response(CategoryTree.get(request.user.company.id))
+
+
 @api_view(['GET'])
 def products_not_associated(request):
     """
@@ -825,6 +836,19 @@ def bulk_update_products(request):
         "department": "uuid_department",  // opcional
         "category": "uuid_category"       // opcional o null
     }
+    
+    Para selecciones grandes se puede enviar "filters" en lugar de "products":
+    {
+        "filters": {
+            "department": "uuid" | null,  // productos del departamento (null = sin departamento)
+            "category": "uuid" | null,
+            "search": "texto"             // nombre o código de barras
+        },
+        "category": "uuid_category"
+    }
+    
+    La actualización se hace con un solo UPDATE sobre la selección y queda
+    registrada en la auditoría de stock (action_type='bulk_update').
     """
     if not PermissionMiddleware.check_permission(request.user, 'products', 'edit'):
         return Response({'error': 'Sin permisos'}, status=403)
@@ -833,11 +857,25 @@ def bulk_update_products(request):
         company = request.user.company
         data = request.data
         
-        # Validar que se envió la lista de productos
-        product_ids = data.get('products', [])
-        if not product_ids or not isinstance(product_ids, list):
+        product_ids = data.get('products')
+        filters = data.get('filters')
+        
+        # Validar la selección: lista de IDs o filtros
+        if product_ids:
+            if not isinstance(product_ids, list):
+                return Response(
+                    {'error': 'Debe proporcionar una lista de IDs de productos'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        elif filters:
+            if not isinstance(filters, dict) or not set(filters) & {'department', 'category', 'search'}:
+                return Response(
+                    {'error': 'Los filtros deben incluir department, category o search'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
             return Response(
-                {'error': 'Debe proporcionar una lista de IDs de productos'},
+                {'error': 'Debe proporcionar una lista de IDs de productos o filtros'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
@@ -847,72 +885,110 @@ def bulk_update_products(request):
                 {'error': 'Debe proporcionar al menos un campo para actualizar (department o category)'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-
-        department_id = data.get('department')
-        category_id = data.get('category')
-        
-        # Obtener los productos de la empresa
-        products = Product.objects.filter(
-            id__in=product_ids,
-            company=company
-        )
-        
-        if not products.exists():
-            return Response(
-                {'error': 'No se encontraron productos válidos'},
-                status=status.HTTP_404_NOT_FOUND
-            )
         
         # Preparar los campos a actualizar
         update_fields = {}
-
+        
         # Validar departamento si se proporcionó la clave en el request
         if 'department' in data:
             department_id = data.get('department')
-    
+            
             if department_id:  # Si tiene un valor (no es null ni "")
-                try:
-                    department = Department.objects.get(id=department_id, company=company)
-                    update_fields['department'] = department
-                except Department.DoesNotExist:
+                if not Department.objects.filter(id=department_id, company=company).exists():
                     return Response(
                         {'error': 'Departamento no encontrado'},
                         status=status.HTTP_404_NOT_FOUND
                     )
+                update_fields['department_id'] = department_id
             else:
                 # Si department_id es null o "", establecer el departamento como null
-                update_fields['department'] = None
-
+                update_fields['department_id'] = None
+        
         # Validar categoría si se proporcionó la clave en el request
         if 'category' in data:
             category_id = data.get('category')
-    
+            
             if category_id:  # Si tiene un valor (no es null ni "")
-                try:
-                    category = Category.objects.get(id=category_id, company=company)
-                    update_fields['category'] = category
-                except Category.DoesNotExist:
+                if not Category.objects.filter(id=category_id, company=company).exists():
                     return Response(
                         {'error': 'Categoría no encontrada'},
                         status=status.HTTP_404_NOT_FOUND
                     )
+                update_fields['category_id'] = category_id
             else:
                 # Si category_id es null o "", establecer la categoría como null
-                update_fields['category'] = None
+                update_fields['category_id'] = None
         
-        # Realizar la actualización masiva
-        updated_count = 0
-        for product in products:
-            for field, value in update_fields.items():
-                setattr(product, field, value)
-            product.save()
-            updated_count += 1
+        # Selección de productos de la empresa
+        products = Product.objects.filter(company=company)
         
-        return Response({
+        if product_ids:
+            products = products.filter(id__in=product_ids)
+        else:
+            if 'department' in filters:
+                products = products.filter(department_id=filters['department'] or None)
+            if 'category' in filters:
+                products = products.filter(category_id=filters['category'] or None)
+            if filters.get('search'):
+                search = filters['search']
+                products = products.filter(
+                    Q(name__icontains=search) |
+                    Q(barcode__icontains=search)
+                )
+        
+        with transaction.atomic():
+            # Resumen del estado anterior (conteos por departamento/categoría)
+            before = list(
+                products.values(*update_fields).annotate(count=Count('id')).order_by()
+            )
+            matched_count = sum(row['count'] for row in before)
+            
+            if not matched_count:
+                return Response(
+                    {'error': 'No se encontraron productos válidos'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            
+            # Un solo UPDATE para toda la selección (sin cargar los productos)
+            now = timezone.now()
+            updated_count = products.update(**update_fields, updated_at=now, catalog_updated_at=now)
+            BarcodeIndex.invalidate_company(company.id)
+            CategoryTree.invalidate_company(company.id)
+            CatalogSync.invalidate_company(company.id)
+            InventoryValuation.invalidate_company(company.id)
+            
+            audit = StockAudit.objects.create(
+                company=company,
+                action_type='bulk_update',
+                description=f"Actualización masiva de productos: {', '.join(update_fields)}",
+                affected_products_count=updated_count,
+                before_data={
+                    'selection': {'products': len(product_ids)} if product_ids else {'filters': filters},
+                    'groups': [
+                        {**{key: str(value) if value else None for key, value in row.items()}, 'count': row['count']}
+                        for row in before
+                    ]
+                },
+                after_data={key: str(value) if value else None for key, value in update_fields.items()},
+                performed_by=request.user,
+                ip_address=request.META.get('REMOTE_ADDR'),
+                user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
+                requires_approval=False,
+                approved=True,
+                approved_by=request.user
+            )
+        
+        logger.info(f"Actualización masiva: {updated_count} productos por {request.user.email}")
+        
+        response_data = {
             'message': f'Se actualizaron {updated_count} productos exitosamente',
             'updated_count': updated_count,
-            'total_requested': len(product_ids)
-        }, status=status.HTTP_200_OK)
+            'audit_id': str(audit.id)
+        }
+        if product_ids:
+            response_data['total_requested'] = len(product_ids)
+        
+        return Response(response_data, status=status.HTTP_200_OK)
         
     except Exception as e:
         return Response(
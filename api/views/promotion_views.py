@@ -8,11 +8,13 @@ from api.serializers.product_serializers import PromotionSerializer
 from api.middleware.permission_middleware import PermissionMiddleware
 from api.utils.excel_handler import ExcelExporter
 from api.utils.pagination import Paginator
+from api.utils.promotion_engine import PromotionEngine
 from django.db.models import Q
 from django.db import transaction
 from django.utils import timezone
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -424,18 +426,15 @@ def calculate_promotion_price(request):
             )
         except Promotion.DoesNotExist:
             return Response({'error': 'Promoción no encontrada'}, status=404)
+        
+        rule = PromotionEngine.rule_from_promotion(promotion)
+        discount, free_units = PromotionEngine.evaluate(rule, product.unit_price, quantity)
     else:
-        # Buscar mejor promoción activa para el producto
-        now = timezone.now()
-        promotion = Promotion.objects.filter(
-            company=request.user.company,
-            is_active=True,
-            start_date__lte=now,
-            end_date__gte=now,
-            products__product=product
-        ).first()
+        # Mejor promoción vigente para el producto (índice compilado)
+        rules = PromotionEngine.get_index(request.user.company.id).get(str(product.id), [])
+        rule, discount, free_units = PromotionEngine.best(rules, product.unit_price, quantity)
     
-    if not promotion:
+    if not rule:
         return Response({
             'product_id': str(product.id),
             'quantity': float(quantity),
@@ -445,49 +444,108 @@ def calculate_promotion_price(request):
             'has_promotion': False
         })
     
-    # Calcular precio según tipo de promoción
-    final_price = original_price
-    discount = Decimal('0')
-    free_units = 0
-    
-    if promotion.promotion_type == 'quantity_discount':
-        if quantity >= promotion.min_quantity:
-            discount = original_price * (promotion.discount_percentage / 100)
-            final_price = original_price - discount
-    
-    elif promotion.promotion_type == 'free_units':
-        # Ejemplo: 2x1 (buy_quantity=2, free_quantity=1)
-        sets = int(quantity // promotion.buy_quantity)
-        free_units = sets * promotion.free_quantity
-        charged_units = quantity - free_units
-        final_price = product.unit_price * charged_units
-        discount = original_price - final_price
-    
-    elif promotion.promotion_type == 'percentage':
-        discount = original_price * (promotion.discount_percentage / 100)
-        final_price = original_price - discount
-    
-    elif promotion.promotion_type == 'fixed_price':
-        final_price = promotion.fixed_price * quantity
-        discount = original_price - final_price
-    
     return Response({
         'product_id': str(product.id),
         'quantity': float(quantity),
         'original_price': float(original_price),
-        'final_price': float(final_price),
+        'final_price': float(original_price - discount),
         'discount': float(discount),
         'free_units': free_units,
         'has_promotion': True,
         'promotion': {
-            'id': str(promotion.id),
-            'name': promotion.name,
-            'type': promotion.promotion_type,
-            'description': promotion.description
+            'id': str(rule['id']),
+            'name': rule['name'],
+            'type': rule['promotion_type'],
+            'description': rule['description']
         }
     })
 
 
+@api_view(['POST'])
+def price_basket(request):
+    """
+    Precio de una canasta completa con las promociones vigentes (usado por la caja)
+    
+    Body:
+        items (list): Líneas de la canasta
+            - product_id (uuid): ID del producto
+            - quantity (decimal): Cantidad
+            - unit_price (decimal): Precio unitario (opcional, usa precio del producto)
+    
+    Cada línea recibe la promoción con mayor descuento; las líneas del
+    mismo producto se evalúan juntas.
+    """
+    items_data = request.data.get('items', [])
+    
+    if not items_data:
+        return Response({'error': 'Debe agregar al menos un producto'}, status=400)
+    
+    try:
+        product_ids = [uuid.UUID(str(item.get('product_id'))) for item in items_data]
+        quantities = [Decimal(str(item.get('quantity', 0))) for item in items_data]
+    except (ValueError, InvalidOperation, AttributeError):
+        return Response({'error': 'Producto o cantidad inválidos'}, status=400)
+    
+    if any(quantity <= 0 for quantity in quantities):
+        return Response({'error': 'Cantidad inválida'}, status=400)
+    
+    # Todos los productos en una sola consulta
+    products = Product.objects.filter(
+        company=request.user.company,
+        is_active=True,
+        id__in=set(product_ids)
+    ).in_bulk()
+    
+    lines = []
+    for item, product_id, quantity in zip(items_data, product_ids, quantities):
+        product = products.get(product_id)
+        
+        if not product:
+            return Response({
+                'error': f"Producto no encontrado: {item.get('product_id')}"
+            }, status=404)
+        
+        lines.append({
+            'product_id': product.id,
+            'quantity': quantity,
+            'unit_price': Decimal(str(item.get('unit_price', product.unit_price))),
+        })
+    
+    pricing = PromotionEngine.price_basket(request.user.company.id, lines)
+    
+    result = []
+    original_total = Decimal('0')
+    discount_total = Decimal('0')
+    
+    for line, price in zip(lines, pricing):
+        original = line['quantity'] * line['unit_price']
+        original_total += original
+        discount_total += price['discount']
+        
+        promotion = price['promotion']
+        result.append({
+            'product_id': str(line['product_id']),
+            'quantity': float(line['quantity']),
+            'unit_price': float(line['unit_price']),
+            'original_price': float(original),
+            'discount': float(price['discount']),
+            'final_price': float(original - price['discount']),
+            'free_units': price['free_units'],
+            'promotion': {
+                'id': str(promotion['id']),
+                'name': promotion['name'],
+                'type': promotion['promotion_type']
+            } if promotion else None
+        })
+    
+    return Response({
+        'items': result,
+        'original_total': float(original_total),
+        'discount_total': float(discount_total),
+        'final_total': float(original_total - discount_total)
+    })
+
+
 @api_view(['GET'])
 def export_promotions(request):
     """Exportar promociones a Excel"""
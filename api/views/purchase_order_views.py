@@ -14,6 +14,7 @@ from api.serializers.payment_serializers import (
 )
 from api.middleware.permission_middleware import PermissionMiddleware
 from api.utils.excel_handler import ExcelExporter
+from api.utils.background_jobs import JobQueue
 from api.utils.pagination import Paginator
 from django.db.models import Q
 from django.db import transaction
@@ -315,6 +316,11 @@ def export_purchase_orders(request):
     if not PermissionMiddleware.check_permission(request.user, 'suppliers', 'export'):
         return Response({'error': 'Sin permisos'}, status=403)
     
+    # Ejecutar en segundo plano (?async=true)
+    if JobQueue.wants_async(request):
+        params = {key: request.GET.get(key) for key in ('supplier_id', 'status')}
+        return JobQueue.accepted_response(JobQueue.enqueue(request.user, 'purchase_order_export', params))
+    
     # Aplicar mismos filtros que en list
     orders = PurchaseOrder.objects.filter(
         company=request.user.company
@@ -330,41 +336,5 @@ def export_purchase_orders(request):
     
     orders = orders.order_by('-created_at')
     
-    # Preparar datos
-    data = []
-    for order in orders:
-        data.append({
-            'Número Orden': order.order_number,
-            'Proveedor': order.supplier.name,
-            'Fecha Orden': order.order_date.strftime('%Y-%m-%d'),
-            'Fecha Entrega Esperada': order.expected_delivery_date.strftime('%Y-%m-%d') if order.expected_delivery_date else '',
-            'Subtotal': float(order.subtotal),
-            'IVA': float(order.tax_amount),
-            'Total': float(order.total),
-            'Pagado': float(order.paid_amount),
-            'Pendiente': float(order.total - order.paid_amount),
-            'Estado': order.get_status_display(),
-            'Creado Por': order.created_by.username,
-            'Fecha Creación': order.created_at.strftime('%Y-%m-%d %H:%M')
-        })
-    
-    filename = f'ordenes_compra_{request.user.company.name}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    try:
-        file_path = ExcelExporter.export_to_excel(
-            data=data,
-            filename=filename,
-            sheet_name='Órdenes de Compra'
-        )
-        
-        with open(file_path, 'rb') as f:
-            response = Response(
-                f.read(),
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            return response
-    
-    except Exception as e:
-        logger.error(f"Error exportando órdenes: {str(e)}")
-        return Response({'error': 'Error al exportar'}, status=500)
\ No newline at end of file
+    logger.info(f"Exportando {orders.count()} órdenes de compra por {request.user.email}")
+    return ExcelExporter.export_purchase_orders(orders, request.user.company.name)
\ No newline at end of file
@@ -8,8 +8,13 @@ from api.models import (
     CashMovement, Shift, Credit, CreditPayment,
     PurchaseOrder, PurchaseOrderItem, Client
 )
+from api.models.shift import ShiftTotals
 from api.middleware.permission_middleware import PermissionMiddleware
+from api.utils.background_jobs import JobQueue
 from api.utils.excel_handler import ExcelExporter
+from api.utils.sales_rollup import SalesRollup
+from api.utils.report_utils import AggregationHelper
+from api.utils.inventory_valuation import InventoryValuation
 from django.db.models import Sum, Count, Q, F, DecimalField
 from django.db.models.functions import Coalesce, TruncDate, TruncMonth
 from django.utils import timezone
@@ -28,6 +33,10 @@ def inventory_report(request):
     """
     Reporte completo de inventario
     
+    Reemplaza en reports/inventory/ al formato anterior (summary,
+    by_department y products), que sigue disponible en
+    reports/inventory/legacy/ mientras los clientes migran.
+    
     Query Parameters:
         department_id (uuid): Filtrar por departamento
         low_stock (bool): Solo productos con stock bajo
@@ -36,10 +45,15 @@ def inventory_report(request):
     if not PermissionMiddleware.check_permission(request.user, 'reports', 'view'):
         return Response({'error': 'Sin permisos'}, status=403)
     
+    # Ejecutar en segundo plano (?async=true)
+    if JobQueue.wants_async(request):
+        params = {'report': 'inventory', 'query': request.GET.dict()}
+        return JobQueue.accepted_response(JobQueue.enqueue(request.user, 'report', params))
+    
     products = Product.objects.filter(
         company=request.user.company,
         is_active=True
-    ).select_related('department')
+    )
     
     # Filtros
     department_id = request.GET.get('department_id')
@@ -52,32 +66,11 @@ def inventory_report(request):
     
     products = products.order_by('department__name', 'name')
     
-    # Calcular totales
-    total_products = products.count()
-    total_stock_value = sum(
-        float(p.stock_units * p.cost_price) for p in products
-    )
-    products_with_low_stock = products.filter(stock_units__lte=F('min_stock')).count()
+    # Calcular totales en la base de datos (una consulta)
+    summary = InventoryValuation.summary(products)
     
-    # Preparar datos
-    inventory_data = []
-    for product in products:
-        stock_value = float(product.stock_units * product.cost_price)
-        stock_status = 'BAJO' if product.stock_units <= product.min_stock else 'OK'
-        
-        inventory_data.append({
-            'department': product.department.name,
-            'barcode': product.barcode,
-            'name': product.name,
-            'stock_units': float(product.stock_units),
-            'min_stock': float(product.min_stock),
-            'unit_price': float(product.unit_price),
-            'cost_price': float(product.cost_price),
-            'stock_value': stock_value,
-            'status': stock_status,
-            'is_package': product.is_package,
-            'units_per_package': product.units_per_package
-        })
+    # Preparar datos (sin instanciar productos)
+    inventory_data = list(InventoryValuation.rows(products))
     
     # Formato de respuesta
     response_format = request.GET.get('format', 'json')
@@ -106,11 +99,7 @@ def inventory_report(request):
     
     # Respuesta JSON
     return Response({
-        'summary': {
-            'total_products': total_products,
-            'total_stock_value': total_stock_value,
-            'products_with_low_stock': products_with_low_stock
-        },
+        'summary': summary,
         'inventory': inventory_data
     })
 
@@ -121,29 +110,9 @@ def inventory_by_department(request):
     if not PermissionMiddleware.check_permission(request.user, 'reports', 'view'):
         return Response({'error': 'Sin permisos'}, status=403)
     
-    departments = Department.objects.filter(
-        company=request.user.company,
-        is_active=True
-    ).prefetch_related('products')
-    
-    report_data = []
-    
-    for dept in departments:
-        products = dept.products.filter(is_active=True)
-        
-        total_products = products.count()
-        total_stock_value = sum(
-            float(p.stock_units * p.cost_price) for p in products
-        )
-        low_stock_count = products.filter(stock_units__lte=F('min_stock')).count()
-        
-        report_data.append({
-            'department_id': str(dept.id),
-            'department_name': dept.name,
-            'total_products': total_products,
-            'total_stock_value': total_stock_value,
-            'low_stock_products': low_stock_count
-        })
+    # Una consulta agrupada, cacheada hasta el próximo cambio de stock
+    snapshot = InventoryValuation.snapshot(request.user.company)
+    report_data = snapshot['departments']
     
     return Response({
         'report_date': timezone.now().isoformat(),
@@ -199,13 +168,13 @@ def cash_movements_report(request):
     movements = movements.order_by('-created_at')
     
     # Calcular totales
-    total_income = movements.filter(movement_type='income').aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
-    
-    total_expense = movements.filter(movement_type='expense').aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
+    totals = AggregationHelper.aggregate(
+        movements,
+        income=AggregationHelper.sum('amount', movement_type='income'),
+        expense=AggregationHelper.sum('amount', movement_type='expense')
+    )
+    total_income = totals['income']
+    total_expense = totals['expense']
     
     net_movement = total_income - total_expense
     
@@ -252,6 +221,11 @@ def financial_projection_report(request):
     if not PermissionMiddleware.check_permission(request.user, 'reports', 'view'):
         return Response({'error': 'Sin permisos'}, status=403)
     
+    # Ejecutar en segundo plano (?async=true)
+    if JobQueue.wants_async(request):
+        params = {'report': 'financial_projection', 'query': request.GET.dict()}
+        return JobQueue.accepted_response(JobQueue.enqueue(request.user, 'report', params))
+    
     # Fechas
     today = timezone.now().date()
     start_date = request.GET.get('start_date')
@@ -266,32 +240,47 @@ def financial_projection_report(request):
     sales = Sale.objects.filter(
         company=company,
         status='completed',
-        sale_date__gte=start_date,
-        sale_date__lte=end_date
+        **SalesRollup.sale_date_filters(start_date, end_date)
     )
     
-    total_sales = sales.aggregate(total=Sum('total'))['total'] or Decimal('0')
-    sales_subtotal = sales.aggregate(total=Sum('subtotal'))['total'] or Decimal('0')
-    sales_tax = sales.aggregate(total=Sum('tax_amount'))['total'] or Decimal('0')
-    
-    # Ventas por método de pago
-    payments = SalePayment.objects.filter(sale__in=sales)
+    # Usar rollups diarios si cubren el rango solicitado
+    rollup = SalesRollup.reader(company, start_date, end_date)
     
-    cash_sales = payments.filter(payment_method='cash').aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
-    
-    card_sales = payments.filter(payment_method__in=['debit', 'credit_card']).aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
-    
-    transfer_sales = payments.filter(payment_method='transfer').aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
-    
-    credit_sales = payments.filter(payment_method='internal_credit').aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
+    if rollup:
+        sales_totals = rollup.totals()
+        total_sales = sales_totals['total']
+        sales_subtotal = sales_totals['subtotal']
+        sales_tax = sales_totals['tax_amount']
+        
+        # Ventas por método de pago
+        payment_totals = rollup.payment_totals()
+        cash_sales = payment_totals.get('cash', Decimal('0'))
+        card_sales = payment_totals.get('debit', Decimal('0')) + payment_totals.get('credit_card', Decimal('0'))
+        transfer_sales = payment_totals.get('transfer', Decimal('0'))
+        credit_sales = payment_totals.get('internal_credit', Decimal('0'))
+    else:
+        sales_totals = AggregationHelper.aggregate(
+            sales,
+            total=AggregationHelper.sum('total'),
+            subtotal=AggregationHelper.sum('subtotal'),
+            tax_amount=AggregationHelper.sum('tax_amount')
+        )
+        total_sales = sales_totals['total']
+        sales_subtotal = sales_totals['subtotal']
+        sales_tax = sales_totals['tax_amount']
+        
+        # Ventas por método de pago
+        payment_totals = AggregationHelper.aggregate(
+            SalePayment.objects.filter(sale__in=sales),
+            cash=AggregationHelper.sum('amount', payment_method='cash'),
+            card=AggregationHelper.sum('amount', payment_method__in=['debit', 'credit_card']),
+            transfer=AggregationHelper.sum('amount', payment_method='transfer'),
+            internal_credit=AggregationHelper.sum('amount', payment_method='internal_credit')
+        )
+        cash_sales = payment_totals['cash']
+        card_sales = payment_totals['card']
+        transfer_sales = payment_totals['transfer']
+        credit_sales = payment_totals['internal_credit']
     
     # Entradas y salidas de efectivo
     movements = CashMovement.objects.filter(
@@ -300,13 +289,16 @@ def financial_projection_report(request):
         created_at__lte=end_date
     )
     
-    cash_income = movements.filter(movement_type='income').aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
-    
-    cash_expense = movements.filter(movement_type='expense').aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
+    movement_totals = AggregationHelper.aggregate(
+        movements,
+        income=AggregationHelper.sum('amount', movement_type='income'),
+        expense=AggregationHelper.sum('amount', movement_type='expense'),
+        # Devoluciones en efectivo
+        returns=AggregationHelper.sum('amount', movement_type='expense', reason__icontains='devolución')
+    )
+    cash_income = movement_totals['income']
+    cash_expense = movement_totals['expense']
+    cash_returns = movement_totals['returns']
     
     # Pagos de créditos
     credit_payments = CreditPayment.objects.filter(
@@ -319,12 +311,6 @@ def financial_projection_report(request):
         total=Sum('amount')
     )['total'] or Decimal('0')
     
-    # Devoluciones en efectivo
-    cash_returns = movements.filter(
-        movement_type='expense',
-        reason__icontains='devolución'
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-    
     # EGRESOS
     # Compras a proveedores (con IVA)
     purchases = PurchaseOrder.objects.filter(
@@ -334,23 +320,32 @@ def financial_projection_report(request):
         status__in=['completed', 'paid']
     )
     
-    total_purchases = purchases.aggregate(total=Sum('total'))['total'] or Decimal('0')
-    purchases_subtotal = purchases.aggregate(total=Sum('subtotal'))['total'] or Decimal('0')
-    purchases_tax = purchases.aggregate(total=Sum('tax_amount'))['total'] or Decimal('0')
+    purchase_totals = AggregationHelper.aggregate(
+        purchases,
+        total=AggregationHelper.sum('total'),
+        subtotal=AggregationHelper.sum('subtotal'),
+        tax_amount=AggregationHelper.sum('tax_amount')
+    )
+    total_purchases = purchase_totals['total']
+    purchases_subtotal = purchase_totals['subtotal']
+    purchases_tax = purchase_totals['tax_amount']
     
     # Ventas por departamento
-    sales_by_dept = SaleItem.objects.filter(
-        sale__in=sales,
-        product__isnull=False
-    ).values(
-        'product__department__name'
-    ).annotate(
-        total=Sum(F('quantity') * F('unit_price'))
-    ).order_by('-total')
+    if rollup:
+        sales_by_dept = rollup.departments()
+    else:
+        sales_by_dept = SaleItem.objects.filter(
+            sale__in=sales,
+            product__isnull=False
+        ).values(
+            department_name=F('product__department__name')
+        ).annotate(
+            total=Sum(F('quantity') * F('unit_price'))
+        ).order_by('-total')
     
     dept_breakdown = [
         {
-            'department': item['product__department__name'],
+            'department': item['department_name'],
             'total': float(item['total'])
         }
         for item in sales_by_dept
@@ -445,12 +440,19 @@ def purchase_orders_report(request):
     orders = orders.order_by('-created_at')
     
     # Calcular totales
-    total_orders = orders.count()
-    
-    total_subtotal = orders.aggregate(total=Sum('subtotal'))['total'] or Decimal('0')
-    total_tax = orders.aggregate(total=Sum('tax_amount'))['total'] or Decimal('0')
-    total_amount = orders.aggregate(total=Sum('total'))['total'] or Decimal('0')
-    total_paid = orders.aggregate(total=Sum('paid_amount'))['total'] or Decimal('0')
+    totals = AggregationHelper.aggregate(
+        orders,
+        count=AggregationHelper.count(),
+        subtotal=AggregationHelper.sum('subtotal'),
+        tax_amount=AggregationHelper.sum('tax_amount'),
+        total=AggregationHelper.sum('total'),
+        paid_amount=AggregationHelper.sum('paid_amount')
+    )
+    total_orders = totals['count']
+    total_subtotal = totals['subtotal']
+    total_tax = totals['tax_amount']
+    total_amount = totals['total']
+    total_paid = totals['paid_amount']
     total_pending = total_amount - total_paid
     
     # Preparar datos detallados
@@ -517,42 +519,26 @@ def shift_closing_report(request, shift_id):
     except Shift.DoesNotExist:
         return Response({'error': 'Turno no encontrado'}, status=404)
     
-    # Ventas
-    sales = Sale.objects.filter(shift=shift, status='completed')
-    total_sales = sales.count()
-    sales_amount = sales.aggregate(total=Sum('total'))['total'] or Decimal('0')
+    # Totales acumulados del turno
+    totals = ShiftTotals.for_shift(shift)
     
     # Por método de pago
-    payments = SalePayment.objects.filter(sale__in=sales)
-    
     payment_breakdown = {}
-    for method, display in SalePayment.PAYMENT_METHOD_CHOICES:
-        amount = payments.filter(payment_method=method).aggregate(
-            total=Sum('amount')
-        )['total'] or Decimal('0')
+    for method, display in SalePayment.PAYMENT_METHODS:
+        amount = getattr(totals, ShiftTotals.SALE_PAYMENT_FIELDS[method])
         payment_breakdown[method] = {
             'display': display,
             'amount': float(amount)
         }
     
     # Movimientos de caja
-    movements = CashMovement.objects.filter(shift=shift)
-    income = movements.filter(movement_type='income').aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
-    expense = movements.filter(movement_type='expense').aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
-    
-    # Pagos de créditos
-    credit_payments = CreditPayment.objects.filter(shift=shift)
-    credit_total = credit_payments.aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
+    income = totals.cash_income
+    expense = totals.cash_expense
     
     # Ventas por departamento
     sales_by_dept = SaleItem.objects.filter(
-        sale__in=sales,
+        sale__shift=shift,
+        sale__status='completed',
         product__isnull=False
     ).values(
         'product__department__name'
@@ -569,8 +555,8 @@ def shift_closing_report(request, shift_id):
             'status': shift.get_status_display()
         },
         'sales': {
-            'count': total_sales,
-            'total': float(sales_amount)
+            'count': totals.sales_count,
+            'total': float(totals.sales_amount)
         },
         'payment_methods': payment_breakdown,
         'cash_movements': {
@@ -578,7 +564,7 @@ def shift_closing_report(request, shift_id):
             'expense': float(expense),
             'net': float(income - expense)
         },
-        'credit_payments': float(credit_total),
+        'credit_payments': float(totals.credit_payments),
         'cash_summary': {
             'opening': float(shift.opening_cash),
             'expected': float(shift.expected_cash),
@@ -9,6 +9,9 @@ from api.models import (
     PurchaseOrder, PurchaseOrderItem, Department
 )
 from api.middleware.permission_middleware import PermissionMiddleware
+from api.utils.background_jobs import JobQueue
+from api.utils.report_utils import IVACalculator, AggregationHelper
+from api.utils.sales_rollup import SalesRollup
 from django.db.models import Sum, Count, Q, F, DecimalField
 from django.db.models.functions import Coalesce
 from decimal import Decimal
@@ -33,76 +36,95 @@ def sales_report(request):
     if not PermissionMiddleware.check_permission(request.user, 'reports', 'view'):
         return Response({'error': 'Sin permisos'}, status=403)
     
+    # Ejecutar en segundo plano (?async=true)
+    if JobQueue.wants_async(request):
+        params = {'report': 'sales', 'query': request.GET.dict()}
+        return JobQueue.accepted_response(JobQueue.enqueue(request.user, 'report', params))
+    
     # Filtros de fecha
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
     
-    # Base query
-    sales = Sale.objects.filter(
-        company=request.user.company,
-        status='completed'
-    )
-    
-    if start_date:
-        sales = sales.filter(sale_date__gte=start_date)
-    if end_date:
-        sales = sales.filter(sale_date__lte=end_date)
-    
-    # Filtro por cajero
     cashier_id = request.GET.get('cashier_id')
-    if cashier_id:
-        sales = sales.filter(created_by_id=cashier_id)
-    
-    # Totales generales
-    total_sales = sales.count()
-    total_revenue = sales.aggregate(
-        total=Coalesce(Sum('total'), Decimal('0'))
-    )['total']
+    include_iva = request.GET.get('include_iva', 'true').lower() == 'true'
     
-    # Ventas por método de pago
-    payment_methods = SalePayment.objects.filter(
-        sale__in=sales
-    ).values('payment_method').annotate(
-        count=Count('id'),
-        total=Sum('amount')
-    ).order_by('-total')
+    # Usar rollups diarios si cubren el rango solicitado
+    rollup = SalesRollup.reader(request.user.company, start_date, end_date, cashier_id=cashier_id)
     
-    # Cálculo de IVA
-    include_iva = request.GET.get('include_iva', 'true').lower() == 'true'
-    iva_breakdown = None
-    
-    if include_iva:
-        iva_breakdown = calculate_iva_breakdown(sales)
-    
-    # Ventas por departamento
-    sales_by_department = SaleItem.objects.filter(
-        sale__in=sales
-    ).values(
-        department_name=F('product__department__name')
-    ).annotate(
-        count=Count('id'),
-        total=Sum(F('quantity') * F('unit_price'), output_field=DecimalField())
-    ).order_by('-total')
-    
-    # Top productos vendidos
-    top_products = SaleItem.objects.filter(
-        sale__in=sales
-    ).values(
-        'product__name', 'product__barcode'
-    ).annotate(
-        quantity_sold=Sum('quantity'),
-        revenue=Sum(F('quantity') * F('unit_price'), output_field=DecimalField())
-    ).order_by('-quantity_sold')[:20]
-    
-    # Ventas por cajero (si no se filtró por uno específico)
-    sales_by_cashier = None
-    if not cashier_id:
-        sales_by_cashier = sales.values(
-            cashier_name=F('created_by__username')
+    if rollup:
+        totals = rollup.totals()
+        total_sales = totals['sales_count']
+        total_revenue = totals['total']
+        
+        payment_methods = rollup.payment_methods()
+        iva_breakdown = rollup.iva_breakdown() if include_iva else None
+        sales_by_department = rollup.departments()
+        top_products = rollup.products('-quantity_sold', 20)
+        sales_by_cashier = rollup.cashiers() if not cashier_id else None
+    else:
+        # Base query
+        sales = Sale.objects.filter(
+            company=request.user.company,
+            status='completed',
+            **SalesRollup.sale_date_filters(start_date, end_date)
+        )
+        
+        # Filtro por cajero
+        if cashier_id:
+            sales = sales.filter(created_by_id=cashier_id)
+        
+        # Totales generales
+        totals = AggregationHelper.aggregate(
+            sales,
+            count=AggregationHelper.count(),
+            total=AggregationHelper.sum('total')
+        )
+        total_sales = totals['count']
+        total_revenue = totals['total']
+        
+        # Ventas por método de pago
+        payment_methods = SalePayment.objects.filter(
+            sale__in=sales
+        ).values('payment_method').annotate(
+            count=Count('id'),
+            total=Sum('amount')
+        ).order_by('-total')
+        
+        # Cálculo de IVA
+        iva_breakdown = None
+        
+        if include_iva:
+            iva_breakdown = calculate_iva_breakdown(sales)
+        
+        # Ventas por departamento
+        sales_by_department = SaleItem.objects.filter(
+            sale__in=sales
+        ).values(
+            department_name=F('product__department__name')
         ).annotate(
-            sales_count=Count('id'),
-            total_revenue=Sum('total')
-        ).order_by('-total_revenue')
+            count=Count('id'),
+            total=Sum(F('quantity') * F('unit_price'), output_field=DecimalField())
+        ).order_by('-total')
+        
+        # Top productos vendidos
+        top_products = SaleItem.objects.filter(
+            sale__in=sales
+        ).values(
+            'product__name', 'product__barcode'
+        ).annotate(
+            quantity_sold=Sum('quantity'),
+            revenue=Sum(F('quantity') * F('unit_price'), output_field=DecimalField())
+        ).order_by('-quantity_sold')[:20]
+        
+        # Ventas por cajero (si no se filtró por uno específico)
+        sales_by_cashier = None
+        if not cashier_id:
+            sales_by_cashier = sales.values(
+                cashier_name=F('created_by__username')
+            ).annotate(
+                sales_count=Count('id'),
+                total_revenue=Sum('total')
+            ).order_by('-total_revenue')
     
     return Response({
         'period': {
@@ -150,48 +172,9 @@ def sales_report(request):
 def calculate_iva_breakdown(sales):
     """
     Calcular desglose detallado de IVA
-    Considera productos con IVA variable y exentos
+    Considera productos con IVA variable y exentos (una sola consulta agrupada)
     """
-    total_with_iva = Decimal('0')
-    total_exempt = Decimal('0')
-    iva_19_total = Decimal('0')
-    iva_variable_total = Decimal('0')
-    
-    for sale in sales:
-        for item in sale.items.all():
-            item_total = item.quantity * item.unit_price
-            
-            if item.product:
-                if item.product.is_tax_exempt:
-                    total_exempt += item_total
-                else:
-                    # Calcular base imponible
-                    tax_rate = item.product.variable_tax_rate or Decimal('19')
-                    base = item_total / (1 + (tax_rate / 100))
-                    iva_amount = item_total - base
-                    
-                    if tax_rate == Decimal('19'):
-                        iva_19_total += iva_amount
-                    else:
-                        iva_variable_total += iva_amount
-                    
-                    total_with_iva += item_total
-            else:
-                # Producto no registrado - asumir 19%
-                base = item_total / Decimal('1.19')
-                iva_19_total += (item_total - base)
-                total_with_iva += item_total
-    
-    total_base = total_with_iva - (iva_19_total + iva_variable_total)
-    
-    return {
-        'total_with_iva': float(total_with_iva),
-        'total_exempt': float(total_exempt),
-        'total_base_imponible': float(total_base),
-        'iva_19_percent': float(iva_19_total),
-        'iva_variable': float(iva_variable_total),
-        'total_iva': float(iva_19_total + iva_variable_total)
-    }
+    return IVACalculator.breakdown_for_sales(sales)
 
 
 @api_view(['GET'])
@@ -203,41 +186,47 @@ def cash_flow_report(request):
     if not PermissionMiddleware.check_permission(request.user, 'reports', 'view'):
         return Response({'error': 'Sin permisos'}, status=403)
     
+    # Ejecutar en segundo plano (?async=true)
+    if JobQueue.wants_async(request):
+        params = {'report': 'cash_flow', 'query': request.GET.dict()}
+        return JobQueue.accepted_response(JobQueue.enqueue(request.user, 'report', params))
+    
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
     
     # Ventas completadas
     sales = Sale.objects.filter(
         company=request.user.company,
-        status='completed'
+        status='completed',
+        **SalesRollup.sale_date_filters(start_date, end_date)
     )
     
-    if start_date:
-        sales = sales.filter(sale_date__gte=start_date)
-    if end_date:
-        sales = sales.filter(sale_date__lte=end_date)
+    # Usar rollups diarios si cubren el rango solicitado
+    rollup = SalesRollup.reader(request.user.company, start_date, end_date)
     
     # Ingresos
-    sales_cash = SalePayment.objects.filter(
-        sale__in=sales,
-        payment_method='cash'
-    ).aggregate(total=Coalesce(Sum('amount'), Decimal('0')))['total']
-    
-    sales_card = SalePayment.objects.filter(
-        sale__in=sales,
-        payment_method__in=['debit', 'credit_card']
-    ).aggregate(total=Coalesce(Sum('amount'), Decimal('0')))['total']
-    
-    sales_transfer = SalePayment.objects.filter(
-        sale__in=sales,
-        payment_method='transfer'
-    ).aggregate(total=Coalesce(Sum('amount'), Decimal('0')))['total']
-    
-    # Créditos internos (no es efectivo inmediato)
-    sales_credit = SalePayment.objects.filter(
-        sale__in=sales,
-        payment_method='internal_credit'
-    ).aggregate(total=Coalesce(Sum('amount'), Decimal('0')))['total']
+    if rollup:
+        payment_totals = rollup.payment_totals()
+        sales_cash = payment_totals.get('cash', Decimal('0'))
+        sales_card = payment_totals.get('debit', Decimal('0')) + payment_totals.get('credit_card', Decimal('0'))
+        sales_transfer = payment_totals.get('transfer', Decimal('0'))
+        
+        # Créditos internos (no es efectivo inmediato)
+        sales_credit = payment_totals.get('internal_credit', Decimal('0'))
+    else:
+        payment_totals = AggregationHelper.aggregate(
+            SalePayment.objects.filter(sale__in=sales),
+            cash=AggregationHelper.sum('amount', payment_method='cash'),
+            card=AggregationHelper.sum('amount', payment_method__in=['debit', 'credit_card']),
+            transfer=AggregationHelper.sum('amount', payment_method='transfer'),
+            internal_credit=AggregationHelper.sum('amount', payment_method='internal_credit')
+        )
+        sales_cash = payment_totals['cash']
+        sales_card = payment_totals['card']
+        sales_transfer = payment_totals['transfer']
+        
+        # Créditos internos (no es efectivo inmediato)
+        sales_credit = payment_totals['internal_credit']
     
     # Pagos de créditos recibidos
     credit_payments = CreditPayment.objects.filter(
@@ -253,25 +242,21 @@ def cash_flow_report(request):
         created_at__lte=end_date if end_date else timezone.now()
     )
     
-    cash_income = cash_movements.filter(
-        movement_type='income'
-    ).aggregate(total=Coalesce(Sum('amount'), Decimal('0')))['total']
-    
-    cash_expenses = cash_movements.filter(
-        movement_type='expense'
-    ).aggregate(total=Coalesce(Sum('amount'), Decimal('0')))['total']
+    movement_totals = AggregationHelper.aggregate(
+        cash_movements,
+        income=AggregationHelper.sum('amount', movement_type='income'),
+        expense=AggregationHelper.sum('amount', movement_type='expense')
+    )
+    cash_income = movement_totals['income']
+    cash_expenses = movement_totals['expense']
     
     # Devoluciones en efectivo
     refunded_sales = Sale.objects.filter(
         company=request.user.company,
-        status='refunded'
+        status='refunded',
+        **SalesRollup.sale_date_filters(start_date, end_date)
     )
     
-    if start_date:
-        refunded_sales = refunded_sales.filter(sale_date__gte=start_date)
-    if end_date:
-        refunded_sales = refunded_sales.filter(sale_date__lte=end_date)
-    
     refunds_amount = refunded_sales.aggregate(
         total=Coalesce(Sum('total'), Decimal('0'))
     )['total']
@@ -286,7 +271,7 @@ def cash_flow_report(request):
     net_flow = total_income - total_expenses
     
     # Cálculo de IVA para proyecciones
-    iva_breakdown = calculate_iva_breakdown(sales)
+    iva_breakdown = rollup.iva_breakdown() if rollup else calculate_iva_breakdown(sales)
     
     # IVA a pagar (aproximado)
     iva_to_pay = Decimal(str(iva_breakdown['total_iva']))
@@ -325,7 +310,15 @@ def cash_flow_report(request):
 @api_view(['GET'])
 def inventory_report(request):
     """
-    Reporte de inventario
+    Reporte de inventario (formato anterior, obsoleto)
+
+    Hasta ahora reports/inventory/ resolvía a esta vista porque estaba
+    registrada antes que reports_complete_views.inventory_report. Esa ruta
+    ahora entrega el reporte completo ('summary' e 'inventory', valorizado
+    a costo); este formato ('summary', 'by_department' y 'products',
+    valorizado a precio de venta) queda en reports/inventory/legacy/
+    mientras los clientes migran.
+
     Query params:
         - department_id: filtrar por departamento
         - low_stock: solo productos con stock bajo (true/false)
@@ -379,7 +372,7 @@ def inventory_report(request):
         by_department[dept]['products_count'] += 1
         by_department[dept]['total_value'] += item['total_value']
     
-    return Response({
+    response = Response({
         'summary': {
             'total_products': len(inventory_data),
             'total_inventory_value': float(total_value)
@@ -387,6 +380,9 @@ def inventory_report(request):
         'by_department': by_department,
         'products': inventory_data
     })
+    response['Deprecation'] = 'true'
+    response['Link'] = '</api/reports/inventory/>; rel="successor-version"'
+    return response
 
 
 @api_view(['GET'])
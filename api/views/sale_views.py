@@ -7,9 +7,19 @@ from api.models import (
     Sale, SaleItem, SalePayment, Product, Client, 
     Shift, Credit, Promotion, Ticket
 )
+from api.models.shift import ShiftTotals
+from api.models.client import ClientTotals
 from api.serializers.sale_serializer import SaleSerializer
 from api.middleware.permission_middleware import PermissionMiddleware
 from api.utils.pagination import Paginator
+from api.utils.checkout import CheckoutEngine
+from api.utils.promotion_engine import PromotionEngine
+from api.utils.stock_alerts import LowStockAlerts
+from api.utils.sequences import SequenceAllocator
+from api.utils.sales_rollup import SalesRollup
+from api.utils.report_utils import AggregationHelper
+from api.utils.barcode_index import BarcodeIndex
+from api.utils.inventory_valuation import InventoryValuation
 from django.db.models import Sum, Q, F
 from django.db import transaction
 from django.utils import timezone
@@ -27,6 +37,8 @@ def list_sales(request):
     Query Parameters:
         page (int): Número de página
         page_size (int): Items por página (default: 50)
+        cursor (str): Paginación por cursor (vacío = primera página), usar next_cursor
+        count (bool): Incluir el total en modo cursor
         status (str): Filtrar por estado
         sale_type (str): Filtrar por tipo
         client_id (uuid): Filtrar por cliente
@@ -70,14 +82,15 @@ def list_sales(request):
     
     sales = sales.select_related(
         'client', 'created_by', 'shift'
-    ).order_by('-created_at')
+    ).order_by('-sale_date', '-id')
     
     return Paginator.paginate_response(
         sales,
         request,
         SaleSerializer,
         default_page_size=50,
-        max_page_size=200
+        max_page_size=200,
+        cursor_ordering=['-sale_date', '-id']
     )
 
 
@@ -99,6 +112,14 @@ def get_sale(request, sale_id):
     return Response(serializer.data)
 
 
+def _create_low_stock_alerts(company, product_ids):
+    """Alertas de stock bajo tras confirmar la venta (un error no afecta la venta)"""
+    try:
+        LowStockAlerts.generate(company, product_ids)
+    except Exception as e:
+        logger.error(f"Error creando alertas de stock bajo: {str(e)}")
+
+
 @api_view(['POST'])
 def create_sale(request):
     """
@@ -118,6 +139,7 @@ def create_sale(request):
             - amount (decimal): Monto
         notes (str): Notas adicionales (opcional)
         apply_client_discount (bool): Aplicar descuento del cliente (default: true)
+        apply_promotions (bool): Aplicar promociones vigentes (default: true)
     """
     user = request.user
     
@@ -164,59 +186,63 @@ def create_sale(request):
                 'error': 'El cliente no tiene crédito habilitado'
             }, status=400)
     
+    # Validar cantidades y acumular por producto
+    requested = {}
+    for item_data in items_data:
+        quantity = Decimal(str(item_data.get('quantity', 0)))
+        
+        if quantity <= 0:
+            return Response({
+                'error': f'Cantidad inválida para producto'
+            }, status=400)
+        
+        product_id = item_data.get('product_id')
+        if product_id:
+            requested[str(product_id)] = requested.get(str(product_id), Decimal('0')) + quantity
+    
+    # Reservar el número fuera de la transacción (no bloquea el correlativo durante la venta)
+    SequenceAllocator.prefetch(user.company, 'sale', register=shift.id)
+    
     with transaction.atomic():
+        # Bloquear todos los productos en una sola consulta (orden por id)
+        products = CheckoutEngine.lock_products(user.company, requested.keys())
+        
+        for product_id, quantity in requested.items():
+            product = products.get(product_id)
+            
+            if not product:
+                return Response({
+                    'error': f'Producto no encontrado: {product_id}'
+                }, status=404)
+            
+            # Validar stock
+            if product.stock_units < quantity:
+                return Response({
+                    'error': f'Stock insuficiente para {product.name}. Disponible: {product.stock_units}'
+                }, status=400)
+        
         # Calcular totales
         subtotal = Decimal('0')
         tax_amount = Decimal('0')
         discount_amount = Decimal('0')
         
-        # Validar items y calcular subtotal
+        # Validar items
         validated_items = []
         
         for item_data in items_data:
             product_id = item_data.get('product_id')
             quantity = Decimal(str(item_data.get('quantity', 0)))
             
-            if quantity <= 0:
-                return Response({
-                    'error': f'Cantidad inválida para producto'
-                }, status=400)
-            
             # Producto registrado
             if product_id:
-                try:
-                    product = Product.objects.select_for_update().get(
-                        id=product_id,
-                        company=user.company
-                    )
-                except Product.DoesNotExist:
-                    return Response({
-                        'error': f'Producto no encontrado: {product_id}'
-                    }, status=404)
-                
-                # Validar stock
-                if product.stock_units < quantity:
-                    return Response({
-                        'error': f'Stock insuficiente para {product.name}. Disponible: {product.stock_units}'
-                    }, status=400)
+                product = products[str(product_id)]
                 
                 # Usar precio del producto o el especificado
                 unit_price = Decimal(str(item_data.get('unit_price', product.unit_price)))
                 
-                # Aplicar promociones activas
-                # TODO: Implementar lógica de promociones
-                
-                validated_items.append({
-                    'product': product,
-                    'product_name': product.name,
-                    'barcode': product.barcode,
-                    'quantity': quantity,
-                    'unit_price': unit_price,
-                    'is_registered': True
-                })
-                
             # Producto no registrado
             else:
+                product = None
                 product_name = item_data.get('product_name')
                 unit_price = Decimal(str(item_data.get('unit_price', 0)))
                 
@@ -224,32 +250,41 @@ def create_sale(request):
                     return Response({
                         'error': 'Productos no registrados deben tener nombre y precio'
                     }, status=400)
-                
-                validated_items.append({
-                    'product': None,
-                    'product_name': product_name,
-                    'barcode': None,
-                    'quantity': quantity,
-                    'unit_price': unit_price,
-                    'is_registered': False
-                })
             
-            # Calcular subtotal del item
-            item_subtotal = quantity * unit_price
-            subtotal += item_subtotal
+            validated_items.append({
+                'product': product,
+                'product_id': product.id if product else None,
+                'quantity': quantity,
+                'unit_price': unit_price,
+            })
+        
+        # Aplicar promociones vigentes a toda la canasta (una pasada)
+        if data.get('apply_promotions', True):
+            pricing = PromotionEngine.price_basket(user.company.id, validated_items)
+        else:
+            pricing = [{'discount': Decimal('0'), 'promotion': None}] * len(validated_items)
+        
+        # Calcular subtotal e impuesto de cada item
+        promotion_discount = Decimal('0')
+        
+        for item, price in zip(validated_items, pricing):
+            line = CheckoutEngine.calculate_line(
+                item['product'], item['quantity'], item['unit_price'], price['discount']
+            )
+            item.update(line)
+            item['promotion_id'] = price['promotion']['id'] if price['promotion'] else None
             
-            # Calcular impuesto del item
-            if product_id:
-                if not product.is_tax_exempt:
-                    tax_rate = product.variable_tax_rate or Decimal('19.00')
-                    item_tax = item_subtotal * (tax_rate / 100)
-                    tax_amount += item_tax
+            subtotal += line['subtotal']
+            promotion_discount += line['discount_amount']
+            tax_amount += line['tax_amount']
         
-        # Aplicar descuento del cliente
+        # Aplicar descuento del cliente (sobre el subtotal con promociones)
         apply_discount = data.get('apply_client_discount', True)
         if client and client.has_discount and apply_discount:
             discount_percentage = client.discount_percentage or Decimal('0')
-            discount_amount = subtotal * (discount_percentage / 100)
+            discount_amount = (subtotal - promotion_discount) * (discount_percentage / 100)
+        
+        discount_amount += promotion_discount
         
         # Total final
         total = subtotal - discount_amount + tax_amount
@@ -271,22 +306,10 @@ def create_sale(request):
                         'error': f'Crédito insuficiente. Disponible: ${available_credit:,.0f}'
                     }, status=400)
         
-        # Generar número de venta
-        last_sale = Sale.objects.filter(company=user.company).order_by('-created_at').first()
-        
-        if last_sale and last_sale.sale_number:
-            try:
-                last_number = int(last_sale.sale_number.split('-')[-1])
-                new_number = last_number + 1
-            except:
-                new_number = 1
-        else:
-            new_number = 1
-        
         # Crear venta
         sale = Sale.objects.create(
             company=user.company,
-            sale_number=f"VTA-{new_number:08d}",
+            sale_number=SequenceAllocator.next_number(user.company, 'sale', register=shift.id),
             client=client,
             shift=shift,
             sale_type=sale_type,
@@ -301,29 +324,36 @@ def create_sale(request):
             notes=data.get('notes', '')
         )
         
-        # Crear items
-        for item in validated_items:
-            sale_item = SaleItem.objects.create(
-                sale=sale,
-                product=item['product'],
-                product_name=item['product_name'],
-                barcode=item['barcode'],
-                quantity=item['quantity'],
-                unit_price=item['unit_price']
-            )
-            
-            # Reducir stock si es producto registrado
-            if item['is_registered'] and item['product']:
-                item['product'].stock_units -= item['quantity']
-                item['product'].save()
-        
-        # Crear pagos
-        for payment_data in payments_data:
-            SalePayment.objects.create(
-                sale=sale,
-                payment_method=payment_data['payment_method'],
-                amount=Decimal(str(payment_data['amount']))
-            )
+        # Crear items y pagos (un INSERT cada uno)
+        CheckoutEngine.create_items(sale, validated_items)
+        CheckoutEngine.create_payments(sale, payments_data)
+        
+        # Reducir stock de productos registrados (un solo UPDATE)
+        if not CheckoutEngine.decrement_stock(requested):
+            transaction.set_rollback(True)
+            return Response({
+                'error': 'Stock insuficiente para completar la venta'
+            }, status=409)
+        
+        # Alertas solo para los productos que acaban de cruzar el mínimo
+        crossed = LowStockAlerts.crossed_min_stock(products, requested)
+        if crossed:
+            transaction.on_commit(lambda: _create_low_stock_alerts(user.company, crossed))
+        
+        # Acumular en los totales del turno
+        ShiftTotals.record_sale(sale, [
+            (payment_data['payment_method'], payment_data['amount'])
+            for payment_data in payments_data
+        ])
+        
+        # Marcar el día para recalcular los rollups de ventas
+        SalesRollup.mark_sale(sale)
+        
+        # El UPDATE de stock no emite post_save: invalidar la valorización
+        InventoryValuation.invalidate_company(user.company.id)
+        
+        # Acumular en el resumen de compras del cliente
+        ClientTotals.record_sale(sale, open_credit=(sale_type == 'credit'))
         
         # Si es venta a crédito, crear registro de crédito
         if sale_type == 'credit':
@@ -331,6 +361,7 @@ def create_sale(request):
                 client=client,
                 sale=sale,
                 total_amount=total,
+                remaining_amount=total,
                 due_date=data.get('due_date')  # Fecha de vencimiento opcional
             )
             
@@ -343,6 +374,13 @@ def create_sale(request):
         
         logger.info(f"Venta creada: {sale.sale_number} - ${total} por {user.email}")
         
+        # Releer con relaciones precargadas (evita una consulta por item)
+        sale = Sale.objects.select_related(
+            'client', 'shift', 'created_by'
+        ).prefetch_related(
+            'items__product', 'items__promotion', 'payments'
+        ).get(id=sale.id)
+        
         serializer = SaleSerializer(sale)
         return Response(serializer.data, status=201)
 
@@ -374,11 +412,27 @@ def cancel_sale(request, sale_id):
         }, status=400)
     
     with transaction.atomic():
+        # Descontar de los totales del turno
+        if sale.status == 'completed':
+            ShiftTotals.record_sale(
+                sale,
+                sale.payments.values_list('payment_method', 'amount'),
+                sign=-1
+            )
+            SalesRollup.mark_sale(sale)
+            ClientTotals.record_cancellation(
+                sale,
+                closed_credit=Credit.objects.filter(
+                    sale=sale,
+                    status__in=ClientTotals.OPEN_CREDIT_STATUSES
+                ).exists()
+            )
+        
         # Restaurar stock de productos
         for item in sale.items.all():
             if item.product:
                 item.product.stock_units += item.quantity
-                item.product.save()
+                item.product.save(update_fields=['stock_units', 'updated_at'])
         
         # Si era venta a crédito, ajustar deuda del cliente
         if sale.sale_type == 'credit' and sale.client:
@@ -425,17 +479,18 @@ def price_checker(request):
     
     try:
         if barcode:
-            product = Product.objects.get(
-                Q(barcode=barcode) | Q(barcode_package=barcode),
-                company=request.user.company,
-                is_active=True
-            )
+            # Camino de escaneo: índice de códigos + cache
+            product = BarcodeIndex.find(request.user.company, barcode)
         else:
             # Búsqueda por nombre (primer coincidencia)
             product = Product.objects.filter(
                 name__icontains=name,
                 company=request.user.company,
                 is_active=True
+            ).values(
+                'id', 'barcode', 'name', 'stock_units', 'unit_price', 'package_price',
+                'is_tax_exempt', 'variable_tax_rate', 'is_package', 'units_per_package',
+                department_name=F('department__name')
             ).first()
             
             if not product:
@@ -443,27 +498,33 @@ def price_checker(request):
                     'error': 'Producto no encontrado'
                 }, status=404)
         
+        unit_price = Decimal(str(product['unit_price']))
+        tax_rate = product['variable_tax_rate']
+        package_price = product['package_price']
+        
         # Calcular precio con IVA
-        price_with_tax = product.unit_price
-        if not product.is_tax_exempt:
-            tax_rate = product.variable_tax_rate or Decimal('19.00')
-            price_with_tax = product.unit_price * (1 + tax_rate / 100)
+        price_with_tax = unit_price
+        if not product['is_tax_exempt']:
+            rate = Decimal(str(tax_rate)) if tax_rate else Decimal('19.00')
+            price_with_tax = unit_price * (1 + rate / 100)
         
         return Response({
-            'product_id': str(product.id),
-            'barcode': product.barcode,
-            'name': product.name,
-            'department': product.department.name,
-            'stock': float(product.stock_units),
-            'unit_price': float(product.unit_price),
+            'product_id': str(product['id']),
+            'barcode': product['barcode'],
+            'name': product['name'],
+            'department': product['department_name'],
+            'stock': float(product['stock_units']),
+            'unit_price': float(unit_price),
             'price_with_tax': float(price_with_tax),
-            'is_tax_exempt': product.is_tax_exempt,
-            'tax_rate': float(product.variable_tax_rate) if product.variable_tax_rate else 19.0,
-            'is_package': product.is_package,
-            'units_per_package': product.units_per_package,
-            'package_price': float(product.package_price) if product.package_price else None
+            'is_tax_exempt': product['is_tax_exempt'],
+            'tax_rate': float(tax_rate) if tax_rate else 19.0,
+            'is_package': product['is_package'],
+            'units_per_package': product['units_per_package'],
+            'package_price': float(package_price) if package_price else None
         })
         
+    except Product.MultipleObjectsReturned:
+        return Response({'error': 'Código de barras duplicado'}, status=400)
     except Product.DoesNotExist:
         return Response({'error': 'Producto no encontrado'}, status=404)
 
@@ -483,49 +544,73 @@ def daily_sales_report(request):
         return Response({'error': 'Sin permisos'}, status=403)
     
     # Ventas del día
-    today = timezone.now().date()
+    today = timezone.localdate()
+    is_cashier = request.user.role.name == 'cashier'
+    
+    # Usar rollups diarios si ya cubren el día
+    rollup = SalesRollup.reader(
+        request.user.company,
+        today,
+        today,
+        cashier_id=request.user.id if is_cashier else None
+    )
     
-    if request.user.role.name == 'cashier':
-        sales = Sale.objects.filter(
-            created_by=request.user,
-            sale_date__date=today,
-            status='completed'
-        )
+    if rollup:
+        totals = rollup.totals()
+        total_sales = totals['sales_count']
+        total_amount = totals['total']
+        payment_totals = rollup.payment_totals()
+        top_products = rollup.products('-revenue', 10)
     else:
-        sales = Sale.objects.filter(
-            company=request.user.company,
-            sale_date__date=today,
-            status='completed'
+        if is_cashier:
+            sales = Sale.objects.filter(
+                created_by=request.user,
+                sale_date__date=today,
+                status='completed'
+            )
+        else:
+            sales = Sale.objects.filter(
+                company=request.user.company,
+                sale_date__date=today,
+                status='completed'
+            )
+        
+        # Totales
+        totals = AggregationHelper.aggregate(
+            sales,
+            count=AggregationHelper.count(),
+            total=AggregationHelper.sum('total')
         )
-    
-    # Totales
-    total_sales = sales.count()
-    total_amount = sales.aggregate(total=Sum('total'))['total'] or Decimal('0')
-    
-    # Por método de pago
-    payments = SalePayment.objects.filter(sale__in=sales)
+        total_sales = totals['count']
+        total_amount = totals['total']
+        
+        # Por método de pago
+        payment_totals = dict(
+            SalePayment.objects.filter(sale__in=sales).values(
+                'payment_method'
+            ).annotate(
+                total=Sum('amount')
+            ).values_list('payment_method', 'total')
+        )
+        
+        # Productos más vendidos
+        top_products = SaleItem.objects.filter(
+            sale__in=sales,
+            product__isnull=False
+        ).values(
+            'product__name'
+        ).annotate(
+            quantity_sold=Sum('quantity'),
+            revenue=Sum(F('quantity') * F('unit_price'))
+        ).order_by('-revenue')[:10]
     
     payment_summary = {}
-    for method, display in SalePayment.PAYMENT_METHOD_CHOICES:
-        amount = payments.filter(payment_method=method).aggregate(
-            total=Sum('amount')
-        )['total'] or Decimal('0')
+    for method, display in SalePayment.PAYMENT_METHODS:
         payment_summary[method] = {
             'display': display,
-            'amount': float(amount)
+            'amount': float(payment_totals.get(method) or Decimal('0'))
         }
     
-    # Productos más vendidos
-    top_products = SaleItem.objects.filter(
-        sale__in=sales,
-        product__isnull=False
-    ).values(
-        'product__name'
-    ).annotate(
-        total_quantity=Sum('quantity'),
-        total_amount=Sum(F('quantity') * F('unit_price'))
-    ).order_by('-total_amount')[:10]
-    
     return Response({
         'date': today.isoformat(),
         'total_sales': total_sales,
@@ -534,8 +619,8 @@ def daily_sales_report(request):
         'top_products': [
             {
                 'product': item['product__name'],
-                'quantity': float(item['total_quantity']),
-                'amount': float(item['total_amount'])
+                'quantity': float(item['quantity_sold']),
+                'amount': float(item['revenue'])
             }
             for item in top_products
         ]
@@ -4,6 +4,7 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from api.models import Shift, CashMovement, CashCount
+from api.models.shift import ShiftTotals
 from api.serializers.shift_serializer import (
     ShiftSerializer,
     ShiftListSerializer,
@@ -15,6 +16,7 @@ from api.serializers.shift_serializer import (
 )
 from api.middleware.permission_middleware import PermissionMiddleware
 from api.utils.pagination import Paginator
+from api.utils.sequences import SequenceAllocator
 from django.db.models import Sum, Q, F
 from django.db import transaction
 from django.utils import timezone
@@ -65,7 +67,7 @@ def list_shifts(request):
     if end_date:
         shifts = shifts.filter(opened_at__lte=end_date)
     
-    shifts = shifts.select_related('user', 'closed_by').order_by('-opened_at')
+    shifts = shifts.select_related('user', 'closed_by', 'totals').order_by('-opened_at')
     
     # Paginación
     return Paginator.paginate_response(
@@ -141,27 +143,17 @@ def open_shift(request):
     
     # Crear turno
     with transaction.atomic():
-        # Generar número de turno
         company = user.company
-        last_shift = Shift.objects.filter(company=company).order_by('-created_at').first()
-        
-        if last_shift and last_shift.shift_number:
-            try:
-                last_number = int(last_shift.shift_number.split('-')[-1])
-                new_number = last_number + 1
-            except:
-                new_number = 1
-        else:
-            new_number = 1
         
         shift = Shift.objects.create(
             company=company,
             user=user,
-            shift_number=f"TUR-{new_number:06d}",
+            shift_number=SequenceAllocator.next_number(company, 'shift'),
             opening_cash=validated_data['opening_cash'],
             opening_notes=validated_data.get('opening_notes', ''),
             status='open'
         )
+        ShiftTotals.objects.create(shift=shift)
         
         logger.info(f"Turno abierto: {shift.shift_number} por {user.email}")
         
@@ -297,7 +289,10 @@ def register_cash_movement(request):
     )
     
     if serializer.is_valid():
-        movement = serializer.save()
+        with transaction.atomic():
+            movement = serializer.save()
+            ShiftTotals.record_movement(movement)
+        
         logger.info(
             f"Movimiento de caja: {movement.get_movement_type_display()} "
             f"${movement.amount} en {shift.shift_number}"
@@ -363,49 +358,14 @@ def get_shift_summary(request, shift_id):
     except Shift.DoesNotExist:
         return Response({'error': 'Turno no encontrado'}, status=404)
     
-    # Calcular estadísticas
-    from api.models import Sale, SalePayment, CreditPayment
-    
-    # Ventas del turno
-    sales = Sale.objects.filter(shift=shift, status='completed')
-    total_sales = sales.count()
-    sales_amount = sales.aggregate(total=Sum('total'))['total'] or Decimal('0')
-    
-    # Ventas por método de pago
-    payments = SalePayment.objects.filter(sale__in=sales)
-    
-    cash_sales = payments.filter(payment_method='cash').aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
-    
-    card_sales = payments.filter(payment_method__in=['debit', 'credit_card']).aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
-    
-    transfer_sales = payments.filter(payment_method='transfer').aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
-    
-    # Movimientos de caja
-    movements = CashMovement.objects.filter(shift=shift)
-    cash_income = movements.filter(movement_type='income').aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
-    
-    cash_expense = movements.filter(movement_type='expense').aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
-    
-    # Pagos de créditos en el turno
-    credit_payments = CreditPayment.objects.filter(shift=shift)
-    credit_payments_total = credit_payments.aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
+    # Totales acumulados del turno (ventas, pagos, movimientos y créditos)
+    totals = ShiftTotals.for_shift(shift)
     
     # Ventas por departamento
     from api.models import SaleItem
     sales_by_dept = SaleItem.objects.filter(
-        sale__in=sales
+        sale__shift=shift,
+        sale__status='completed'
     ).values(
         'product__department__name'
     ).annotate(
@@ -419,20 +379,20 @@ def get_shift_summary(request, shift_id):
         'closed_at': shift.closed_at,
         
         # Ventas
-        'total_sales': total_sales,
-        'sales_amount': float(sales_amount),
+        'total_sales': totals.sales_count,
+        'sales_amount': float(totals.sales_amount),
         
         # Por método de pago
-        'cash_sales': float(cash_sales),
-        'card_sales': float(card_sales),
-        'transfer_sales': float(transfer_sales),
+        'cash_sales': float(totals.cash_sales),
+        'card_sales': float(totals.card_sales),
+        'transfer_sales': float(totals.transfer_sales),
         
         # Movimientos
-        'cash_income': float(cash_income),
-        'cash_expense': float(cash_expense),
+        'cash_income': float(totals.cash_income),
+        'cash_expense': float(totals.cash_expense),
         
         # Pagos de créditos
-        'credit_payments': float(credit_payments_total),
+        'credit_payments': float(totals.credit_payments),
         
         # Esperado vs Real
         'expected_cash': float(shift.expected_cash),
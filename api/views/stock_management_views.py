@@ -10,9 +10,12 @@ from api.serializers.ticket_serializers import (
     BulkStockUpdateSerializer
 )
 from api.serializers.product_serializers import ProductListSerializer
-from django.db import transaction
+from api.utils.background_jobs import JobQueue
+from api.utils.job_handlers import JobHandlers
+from api.utils.stock_updates import StockUpdater
+from api.utils.stock_audit import StockAuditLog
+from api.utils.pagination import Paginator
 from django.db.models import F, Q
-from decimal import Decimal
 import logging
 
 logger = logging.getLogger(__name__)
@@ -40,58 +43,34 @@ def reset_stock(request):
         return Response(serializer.errors, status=400)
     
     reason = serializer.validated_data['reason']
+    ip_address = request.META.get('REMOTE_ADDR')
+    user_agent = request.META.get('HTTP_USER_AGENT', '')
+    
+    # Ejecutar en segundo plano (async=true)
+    if JobQueue.wants_async(request):
+        job = JobQueue.enqueue(request.user, 'stock_reset', {
+            'reason': reason,
+            'ip_address': ip_address,
+            'user_agent': user_agent[:500]
+        })
+        return JobQueue.accepted_response(job)
     
     try:
-        with transaction.atomic():
-            company = request.user.company
-            
-            # Obtener todos los productos activos
-            products = Product.objects.filter(
-                company=company,
-                is_active=True
-            )
-            
-            # Guardar estado antes del cambio
-            before_data = []
-            for product in products:
-                before_data.append({
-                    'product_id': str(product.id),
-                    'barcode': product.barcode,
-                    'name': product.name,
-                    'stock_units': float(product.stock_units)
-                })
-            
-            # Reiniciar stock
-            affected_count = products.update(stock_units=0)
-            
-            # Crear auditoría
-            audit = StockAudit.objects.create(
-                company=company,
-                action_type='reset',
-                description=f"Reinicio completo de stock. Razón: {reason}",
-                affected_products_count=affected_count,
-                before_data={'products': before_data},
-                after_data={'stock_units': 0},
-                performed_by=request.user,
-                ip_address=request.META.get('REMOTE_ADDR'),
-                user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
-                requires_approval=False,
-                approved=True,
-                approved_by=request.user
-            )
-            
-            logger.warning(
-                f"⚠️ STOCK REINICIADO: {affected_count} productos afectados. "
-                f"Realizado por: {request.user.email}. Razón: {reason}"
-            )
-            
-            return Response({
-                'success': True,
-                'message': f'Stock reiniciado exitosamente. {affected_count} productos afectados',
-                'audit_id': str(audit.id),
-                'affected_products': affected_count
-            })
-            
+        result = JobHandlers.reset_company_stock(
+            request.user.company,
+            request.user,
+            reason,
+            ip_address=ip_address,
+            user_agent=user_agent
+        )
+        
+        return Response({
+            'success': True,
+            'message': f"Stock reiniciado exitosamente. {result['affected_products']} productos afectados",
+            'audit_id': result['audit_id'],
+            'affected_products': result['affected_products']
+        })
+        
     except Exception as e:
         logger.error(f"Error al reiniciar stock: {str(e)}")
         return Response({
@@ -104,6 +83,10 @@ def bulk_update_stock(request):
     """
     Actualización masiva de stock
     Requiere permisos de edición de productos
+    
+    Body JSON: {"updates": [{"product_id", "new_stock"}], "reason"}
+    o multipart con "file" (.csv con encabezado o .jsonl; cada línea con
+    product_id o barcode y new_stock) y "reason" para conteos grandes
     """
     if not request.user.role.name in ['master_admin', 'super_admin', 'admin']:
         return Response({'error': 'Sin permisos'}, status=403)
@@ -113,78 +96,37 @@ def bulk_update_stock(request):
     if not serializer.is_valid():
         return Response(serializer.errors, status=400)
     
-    updates = serializer.validated_data['updates']
     reason = serializer.validated_data['reason']
+    upload = serializer.validated_data.get('file')
+    
+    if upload:
+        # Conteo de inventario físico: se lee el archivo por líneas
+        try:
+            entries = StockUpdater.read_file(upload)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+    else:
+        entries = enumerate(serializer.validated_data['updates'], start=1)
     
     try:
-        with transaction.atomic():
-            company = request.user.company
-            
-            before_data = []
-            after_data = []
-            updated_count = 0
-            
-            for update in updates:
-                product_id = update['product_id']
-                new_stock = Decimal(str(update['new_stock']))
-                
-                try:
-                    product = Product.objects.select_for_update().get(
-                        id=product_id,
-                        company=company
-                    )
-                    
-                    # Guardar estado anterior
-                    before_data.append({
-                        'product_id': str(product.id),
-                        'barcode': product.barcode,
-                        'name': product.name,
-                        'old_stock': float(product.stock_units)
-                    })
-                    
-                    # Actualizar stock
-                    product.stock_units = new_stock
-                    product.save()
-                    
-                    # Guardar estado después
-                    after_data.append({
-                        'product_id': str(product.id),
-                        'barcode': product.barcode,
-                        'name': product.name,
-                        'new_stock': float(new_stock)
-                    })
-                    
-                    updated_count += 1
-                    
-                except Product.DoesNotExist:
-                    logger.warning(f"Producto {product_id} no encontrado en actualización masiva")
-                    continue
-            
-            # Crear auditoría
-            audit = StockAudit.objects.create(
-                company=company,
-                action_type='bulk_update',
-                description=f"Actualización masiva de stock. Razón: {reason}",
-                affected_products_count=updated_count,
-                before_data={'products': before_data},
-                after_data={'products': after_data},
-                performed_by=request.user,
-                ip_address=request.META.get('REMOTE_ADDR'),
-                user_agent=request.META.get('HTTP_USER_AGENT', '')[:500]
-            )
-            
-            logger.info(
-                f"Actualización masiva de stock: {updated_count} productos. "
-                f"Realizado por: {request.user.email}"
-            )
-            
-            return Response({
-                'success': True,
-                'message': f'Stock actualizado exitosamente para {updated_count} productos',
-                'audit_id': str(audit.id),
-                'updated_products': updated_count
-            })
-            
+        result = StockUpdater.apply(
+            request.user.company,
+            entries,
+            request.user,
+            reason,
+            ip_address=request.META.get('REMOTE_ADDR'),
+            user_agent=request.META.get('HTTP_USER_AGENT', '')
+        )
+        
+        return Response({
+            'success': True,
+            'message': f"Stock actualizado exitosamente para {result['updated']} productos",
+            'audit_id': result['audit_id'],
+            'updated_products': result['updated'],
+            'unchanged_products': result['unchanged'],
+            'errors': result['errors']
+        })
+        
     except Exception as e:
         logger.error(f"Error en actualización masiva: {str(e)}")
         return Response({
@@ -306,18 +248,20 @@ def suggested_purchases(request):
 @api_view(['GET'])
 def stock_audit_history(request):
     """
-    Historial de auditorías de stock
+    Historial de auditorías de stock (sin el detalle por producto)
     Query params:
         - action_type: reset, adjustment, bulk_update, import
         - start_date, end_date: filtros de fecha
         - limit: cantidad de resultados (default: 50)
+        - page, page_size: paginación (reemplaza a limit)
+        - cursor: paginación por cursor (vacío = primera página)
     """
     if request.user.role.name not in ['master_admin', 'super_admin']:
         return Response({'error': 'Sin permisos'}, status=403)
     
     audits = StockAudit.objects.filter(
         company=request.user.company
-    ).select_related('performed_by', 'approved_by').order_by('-performed_at')
+    ).select_related('performed_by', 'approved_by').defer('lines_archive').order_by('-performed_at', '-id')
     
     # Filtros
     action_type = request.GET.get('action_type')
@@ -332,18 +276,53 @@ def stock_audit_history(request):
     if end_date:
         audits = audits.filter(performed_at__lte=end_date)
     
+    if 'page' in request.GET or 'cursor' in request.GET:
+        return Paginator.paginate_response(
+            audits,
+            request,
+            StockAuditSerializer,
+            cursor_ordering=['-performed_at', '-id']
+        )
+    
     # Limitar resultados
-    limit = int(request.GET.get('limit', 50))
+    limit = Paginator.page_size(request, 50, 500, param='limit')
     audits = audits[:limit]
     
     serializer = StockAuditSerializer(audits, many=True)
     
     return Response({
-        'count': audits.count(),
+        'count': len(serializer.data),
         'audits': serializer.data
     })
 
 
+@api_view(['GET'])
+def stock_audit_lines(request, audit_id):
+    """
+    Detalle paginado de una auditoría de stock (un cambio por producto)
+    Query params: page, page_size (default: 100, max: 1000)
+    """
+    if request.user.role.name not in ['master_admin', 'super_admin']:
+        return Response({'error': 'Sin permisos'}, status=403)
+    
+    try:
+        audit = StockAudit.objects.get(id=audit_id, company=request.user.company)
+    except StockAudit.DoesNotExist:
+        return Response({'error': 'Auditoría no encontrada'}, status=404)
+    
+    page = Paginator.paginate(
+        StockAuditLog.lines(audit),
+        request,
+        default_page_size=100,
+        max_page_size=1000
+    )
+    page['results'] = StockAuditLog.with_products(page['results'])
+    page['audit_id'] = str(audit.id)
+    page['archived'] = audit.archived_at is not None
+    
+    return Response(page)
+
+
 @api_view(['GET'])
 def stock_summary(request):
     """
@@ -12,6 +12,7 @@ from api.serializers.supplier_serializers import (
 from api.middleware.permission_middleware import PermissionMiddleware
 from api.utils.excel_handler import ExcelExporter
 from api.utils.pagination import Paginator
+from api.utils.supplier_aggregates import SupplierAggregates
 from django.db.models import Q, F
 import logging
 
@@ -49,12 +50,13 @@ def list_suppliers(request):
             Q(representative__icontains=search)
         )
     
-    # Filtro por órdenes pendientes
+    # Órdenes pendientes y deuda en la misma consulta
+    suppliers = SupplierAggregates.annotate(suppliers)
+    
+    # Filtro por órdenes pendientes (sobre la anotación, sin otra unión)
     has_pending = request.GET.get('has_pending_orders')
     if has_pending and has_pending.lower() == 'true':
-        suppliers = suppliers.filter(
-            purchase_orders__status='pending'
-        ).distinct()
+        suppliers = suppliers.filter(pending_count__gt=0)
     
     suppliers = suppliers.order_by('name')
     
@@ -80,7 +82,7 @@ def get_supplier(request, supplier_id):
         return Response({'error': 'Sin permisos'}, status=403)
     
     try:
-        supplier = Supplier.objects.get(
+        supplier = SupplierAggregates.annotate(Supplier.objects).get(
             id=supplier_id,
             company=request.user.company
         )
@@ -173,52 +175,13 @@ def export_suppliers(request):
     if not PermissionMiddleware.check_permission(request.user, 'suppliers', 'export'):
         return Response({'error': 'Sin permisos'}, status=403)
     
-    suppliers = Supplier.objects.filter(
+    suppliers = SupplierAggregates.annotate(Supplier.objects.filter(
         company=request.user.company,
         is_active=True
-    ).order_by('name')
-    
-    # Preparar datos
-    data = []
-    for supplier in suppliers:
-        pending_orders = supplier.purchase_orders.filter(status='pending').count()
-        total_debt = sum(
-            order.total - order.paid_amount 
-            for order in supplier.purchase_orders.filter(status__in=['pending', 'completed'])
-        )
-        
-        data.append({
-            'Nombre': supplier.name,
-            'Representante': supplier.representative or '',
-            'Teléfono 1': supplier.phone_1 or '',
-            'Teléfono 2': supplier.phone_2 or '',
-            'Email 1': supplier.email_1 or '',
-            'Email 2': supplier.email_2 or '',
-            'Sitio Web': supplier.website or '',
-            'Dirección': supplier.address or '',
-            'Órdenes Pendientes': pending_orders,
-            'Deuda Total': float(total_debt),
-            'Fecha Creación': supplier.created_at.strftime('%Y-%m-%d %H:%M')
-        })
-    
-    # Exportar
-    filename = f'proveedores_{request.user.company.name}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+    )).order_by('name')
     
     try:
-        file_path = ExcelExporter.export_to_excel(
-            data=data,
-            filename=filename,
-            sheet_name='Proveedores'
-        )
-        
-        with open(file_path, 'rb') as f:
-            response = Response(
-                f.read(),
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            return response
-    
+        return ExcelExporter.export_suppliers(suppliers, request.user.company.name)
     except Exception as e:
         logger.error(f"Error exportando proveedores: {str(e)}")
         return Response({'error': 'Error al exportar'}, status=500)
@@ -109,6 +109,33 @@ DATABASES = {
     }
 }
 
+# Cache compartido entre procesos
+# Los caches de permisos, páginas, usuarios y promociones se invalidan
+# incrementando versiones en este cache: debe ser el mismo para todos los
+# workers (con LocMem cada proceso vería solo sus propias invalidaciones).
+# En producción se asume Redis (REDIS_URL): así los requests no consultan
+# la base de datos para permisos ni usuarios. Sin REDIS_URL se usa una
+# tabla de MySQL (la crea la migración 0012_cache_table o `python manage.py
+# createcachetable`), pensada para desarrollo o instalaciones de un solo
+# servidor: cada lectura del cache es una consulta, aunque las versiones se
+# reutilizan por proceso unos segundos (VersionedCache.VERSION_TTL).
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+            # El límite por defecto (300) descarta llaves de uso frecuente
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        }
+    }
+
 # Usuario personalizado
 AUTH_USER_MODEL = 'api.User'
 